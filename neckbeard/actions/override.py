@@ -98,7 +98,7 @@ def _override_node(node, deployment, aws_type, node_name):
     aws_id = prompt(
         "Enter the %s id for <%s>-%s:" % (aws_type, aws_type, node_name))
     if not node:
-        node = deployment.get_blank_node(aws_type)
+        node = deployment.get_blank_node(aws_type, node_name)
 
     node.aws_id = aws_id
 
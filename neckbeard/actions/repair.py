@@ -3,7 +3,10 @@ import logging
 from fabric.api import env, task, require
 
 from neckbeard.actions.contrib_hooks import notifies_hipchat
-from neckbeard.environment_manager import Deployment
+from neckbeard.environment_manager import (
+    REPAIR_MADE_OPERATIONAL,
+    Deployment,
+)
 
 REPAIR_START_MSG = (
     '%(deployer)s <strong>Repairing</strong> '
@@ -20,15 +23,18 @@ logger = logging.getLogger('actions.repair')
 
 @task
 @notifies_hipchat(start_msg=REPAIR_START_MSG, end_msg=REPAIR_END_MSG)
-def repair(force='n'):
+def repair(force='n', parallel='n'):
     """
     Ensure that all healthy active-generation nodes are operational.
+
+    With ``parallel=y``, all of the nodes are repaired at the same time.
     """
     require('_deployment_name')
     require('_deployment_confs')
     require('_active_gen')
 
     force = force == 'y'
+    parallel = parallel == 'y'
 
     assert env._active_gen
     deployment = Deployment(
@@ -39,8 +45,19 @@ def repair(force='n'):
     )
     deployment.verify_deployment_state()
 
-    activated_nodes = deployment.repair_active_generation(
-        force_operational=force)
+    if parallel:
+        outcomes = deployment.repair_active_generation_concurrently(
+            force_operational=force)
+        for node, outcome in outcomes.items():
+            logger.info("%s: %s", node, outcome)
+        activated_nodes = [
+            node
+            for node, outcome in outcomes.items()
+            if outcome == REPAIR_MADE_OPERATIONAL
+        ]
+    else:
+        activated_nodes = deployment.repair_active_generation(
+            force_operational=force)
 
     if len(activated_nodes):
         logger.info("Succesfully made %s node(s) operational",
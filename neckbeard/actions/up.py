@@ -3,8 +3,9 @@ import time
 from datetime import datetime
 
 from decorator import contextmanager
-from fabric.api import env, task, prompt
+from fabric.api import env, task
 
+from neckbeard import ssh
 from neckbeard.actions.contrib_hooks import (
     notifies_hipchat,
     _get_git_repo,
@@ -21,11 +22,17 @@ from neckbeard.actions.utils import (
     logs_duration,
     prompt_on_exception,
 )
-from neckbeard.environment_manager import Deployment
+from neckbeard.cloud_resource import check_node_health
+from neckbeard.concurrency import DEFAULT_MAX_WORKERS
+from neckbeard.environment_manager import Deployment, RollingBudget
+from neckbeard.host_scope import host_scope, prompt
 from neckbeard.cloud_provisioners.aws import (
     Ec2NodeDeployment,
     RdsNodeDeployment,
+    launch_instances,
+    take_seed_snapshots,
 )
+from neckbeard.scheduler import DeployScheduler
 
 UP_START_MSG = (
     '%(deployer)s <strong>Deploying</strong> '
@@ -38,6 +45,12 @@ UP_END_MSG = (
     "<br />Took: <strong>%(duration)s</strong>s"
 )
 
+# We don't actually want to do deployments until `up` has end-to-end tests.
+# Until then, `up` stops once it has built the node deployers, so the seed
+# snapshots, instance launches and the scheduled rolling deploy after that
+# point are unreachable.
+DEPLOYS_ENABLED = False
+
 logger = logging.getLogger('actions.up')
 time_logger = logging.getLogger('timer')
 
@@ -52,12 +65,31 @@ def up(
     configuration_manager,
     resource_tracker,
     generation=ACTIVE,
+    verify_generation=False,
+    max_workers=DEFAULT_MAX_WORKERS,
+    max_unavailable=1,
+    min_healthy=1,
 ):
     """
     Make sure that the instances for the specified generation are running and
     have current code. Will update code and deploy new EC2 and RDS instances as
     needed.
+
+    ``verify_generation`` If True, check the tracked active generation
+    against a full scan of the node records before deploying.
+    ``max_workers`` The most nodes to provision and deploy at once. Nodes
+    only start once the nodes they depend on are finished.
+    ``max_unavailable`` The most operational EC2 nodes to take out of
+    operation at once while deploying to them.
+    ``min_healthy`` The fewest other operational nodes to leave for each
+    role while a node is out of operation.
+
+    Deploying is disabled (see ``DEPLOYS_ENABLED``), so for now this only
+    verifies the deployment's state and then aborts.
     """
+    max_workers = int(max_workers)
+    max_unavailable = int(max_unavailable)
+    min_healthy = int(min_healthy)
     env._active_gen = True
 
     if generation == ACTIVE:
@@ -111,10 +143,16 @@ def up(
             environment_config.get('ec2', {}),
             environment_config.get('rds', {}),
             environment_config.get('elb', {}),
+            resource_tracker=resource_tracker,
         )
         # up never deals with old nodes, so just verify pending and active to
         # save HTTP round trips
         deployment.verify_deployment_state(verify_old=False)
+        if verify_generation:
+            deployment.verify_generation_pointer()
+        # Record the active generation if it had to be scanned for, so that
+        # later runs can read it directly
+        deployment.record_generation_pointer()
 
     # Gather all of the configurations for each node, including their
     # seed deployment information
@@ -135,6 +173,7 @@ def up(
                 seed_config.get('ec2', {}),
                 seed_config.get('rds', {}),
                 seed_config.get('elb', {}),
+                resource_tracker=resource_tracker,
             )
             logger.info("Verifying seed deployment state")
             seed_deployment.verify_deployment_state(verify_old=False)
@@ -149,11 +188,11 @@ def up(
         dep_confs = [
             (
                 'rds',
-                environment_config.get('ec2', {}),
+                environment_config.get('rds', {}),
             ),
             (
                 'ec2',
-                environment_config.get('rds', {}),
+                environment_config.get('ec2', {}),
             ),
         ]
 
@@ -191,47 +230,67 @@ def up(
                 elif aws_type == 'rds':
                     rds_deployers.append(deployer)
 
-    # We don't actually want to do deployments until we have tests
-    assert False
-
-    # Provision the RDS nodes
-    with logs_duration(timer, timer_name='initial provision'):
-        logger.info("Provisioning RDS nodes")
-        for deployer in rds_deployers:
-            if deployer.seed_verification and deployer.get_node() is None:
-                _prompt_for_seed_verification(deployer)
-
-            deployer.ensure_node_created()
+    if not DEPLOYS_ENABLED:
+        logger.critical(
+            "Deploying is disabled until up has end-to-end tests. Aborting "
+            "before any nodes are launched or modified."
+        )
+        exit(1)
 
-        # Provision the EC2 nodes
-        logger.info("Provisioning EC2 nodes")
-        for deployer in ec2_deployers:
-            if deployer.seed_verification and deployer.get_node() is None:
-                _prompt_for_seed_verification(deployer)
+    # Seed verification prompts for confirmation, so do it before any of the
+    # deploys start running concurrently
+    for deployer in rds_deployers + ec2_deployers:
+        if deployer.seed_verification and deployer.get_node() is None:
+            _prompt_for_seed_verification(deployer)
 
-            deployer.ensure_node_created()
+    # Take the seed snapshots for all of the new EC2 nodes up front, so that
+    # nodes seeded from the same volumes share them
+    logger.info("Taking seed EBS snapshots")
+    with logs_duration(timer, timer_name='seed ebs snapshots'):
+        take_seed_snapshots(ec2_deployers)
 
-    # Configure the RDS nodes
-    logger.info("Configuring RDS nodes")
-    with logs_duration(timer, timer_name='deploy rds'):
-        for deployer in rds_deployers:
-            deployer.run()
+    # Launch all of the new EC2 instances up front, so that nodes sharing an
+    # AMI, instance type and so on are launched in one request
+    logger.info("Launching new EC2 instances")
+    with logs_duration(timer, timer_name='launch ec2 instances'):
+        launch_instances(ec2_deployers)
 
     logger.info("Determining EC2 node deploy priority")
     ec2_deployers = _order_ec2_deployers_by_priority(ec2_deployers)
 
-    # Configure the EC2 nodes
-    logger.info("Deploying to EC2 nodes")
-    for deployer in ec2_deployers:
+    rolling_budget = RollingBudget(
+        deployment,
+        max_unavailable=max_unavailable,
+        min_healthy=min_healthy,
+    )
+
+    def deploy_node(deployer):
+        # Each node gets its own copy of Fabric's env, so that nodes can run
+        # remote commands concurrently. Their output is printed per node.
+        with host_scope(buffer_output=True, label=deployer.node_name):
+            _deploy_node(deployer)
+
+    def _deploy_node(deployer):
         timer_name = '%s deploy' % deployer.node_name
         with logs_duration(timer, timer_name='full %s' % timer_name):
-            node = deployer.get_node()
+            with logs_duration(
+                timer,
+                timer_name='%s provision' % deployer.node_name,
+            ):
+                deployer.ensure_node_created()
+
+            if deployer.aws_type == 'rds':
+                with logs_duration(timer, timer_name=timer_name):
+                    deployer.run()
+                return
 
+            node = deployer.get_node()
             with seamless_modification(
                 node,
                 deployer.deployment,
                 force_seamless=env._active_gen,
                 make_operational_if_not_already=make_operational,
+                rolling_budget=rolling_budget,
             ):
                 pre_deploy_time = datetime.now()
                 with logs_duration(
@@ -246,7 +305,23 @@ def up(
                     deployer,
                 )
 
+    # Provision and deploy every node as soon as the nodes it depends on are
+    # done, RDS nodes first when nothing else is waiting
+    logger.info("Deploying to %s node(s)", len(rds_deployers + ec2_deployers))
+    with logs_duration(timer, timer_name='deploy'):
+        scheduler = DeployScheduler(
+            rds_deployers + ec2_deployers,
+            max_workers=max_workers,
+        )
+        scheduler.run(deploy_node)
+
     _announce_deployment()
+    resource_tracker.log_stats()
+    ssh.default_manager.log_stats()
+    timer['ssh connection setup'] = int(
+        ssh.default_manager.get_total_setup_time(),
+    )
+    ssh.default_manager.disconnect_all()
 
     time_logger.info("Timing Breakdown:")
     sorted_timers = sorted(
@@ -267,22 +342,28 @@ def _order_ec2_deployers_by_priority(ec2_deployers):
      2. Inoperative, healthy nodes
      3. Operational, unhealthy nodes
      4. Operational, healthy nodes
+
+    Nodes that haven't been created yet count as inoperative and unhealthy.
     """
     io_unhealthy = []
     io_healthy = []
     o_unhealthy = []
     o_healthy = []
 
-    for ec2_deployer in ec2_deployers:
-        deployer = ec2_deployer
-        node = deployer.get_node()
-        if node.is_operational:
-            if node.is_healthy:
+    nodes = [deployer.get_node() for deployer in ec2_deployers]
+    # Health checks are the slow part, so do them all at once
+    node_health = check_node_health([node for node in nodes if node])
+
+    for ec2_deployer, node in zip(ec2_deployers, nodes):
+        if node is None:
+            io_unhealthy.append(ec2_deployer)
+        elif node.is_operational:
+            if node_health[node]:
                 o_healthy.append(ec2_deployer)
             else:
                 o_unhealthy.append(ec2_deployer)
         else:
-            if node.is_healthy:
+            if node_health[node]:
                 io_healthy.append(ec2_deployer)
             else:
                 io_unhealthy.append(ec2_deployer)
@@ -296,6 +377,7 @@ def seamless_modification(
     deployment,
     force_seamless=True,
     make_operational_if_not_already=False,
+    rolling_budget=None,
 ):
     """
     Rotates the ``node`` in the ``deployment`` in and out of operation if
@@ -305,12 +387,23 @@ def seamless_modification(
 
     Understands that only active, operational nodes need to be rotated out and
     that only healthy nodes should be rotated back in.
+
+    ``rolling_budget`` Optionally, the `RollingBudget` shared by the nodes
+    being modified at the same time. The node waits until it can be taken out
+    of operation without going over the budget.
     """
     # should we make this node operational as the last step
     make_operational = make_operational_if_not_already
 
+    # Whether the node was counted against the ``rolling_budget``
+    in_budget = False
     if node and force_seamless:
-        if not deployment.has_required_redundancy(node):
+        if rolling_budget is not None:
+            has_redundancy = rolling_budget.acquire(node)
+            in_budget = True
+        else:
+            has_redundancy = deployment.has_required_redundancy(node)
+        if not has_redundancy:
             if env.get('interactive', True):
                 continue_anyway = prompt(
                     "\n\nNot possible to avoid service interruption to node "
@@ -321,8 +414,12 @@ def seamless_modification(
                         "Node %s doesn't have required redundancy. "
                         "Aborting" % node
                     )
+                    if in_budget:
+                        rolling_budget.release(node)
                     exit(1)
             else:
+                if in_budget:
+                    rolling_budget.release(node)
                 logger.critical(
                     "Not possible to avoid service interruption to node %s",
                     node,
@@ -340,90 +437,104 @@ def seamless_modification(
         node.make_temporarily_inoperative()
         logger.info("Node %s now inoperative", node)
 
-    yield
+    try:
+        yield
 
-    if make_operational:
-        logger.info("Restoring operation: %s", node)
+        if make_operational:
+            _restore_operation(node, deployment, make_operational)
+    finally:
+        if in_budget:
+            rolling_budget.release(node)
 
-        if node:
-            opts = ['I', 'R', 'F']
-            prompt_str = (
-                "Node %s not made operational. Ignore/Retry/Fail (I/R/F)?"
-            )
-            auto_retries = 10
-            count = 0
-            while True:
-                try:
-                    node.make_operational()
-                except Exception:
-                    logger.warning(
-                        "Failed to make node %s operational",
-                        node,
-                    )
-                if node.is_operational:
-                    logger.info("Node %s now operational", node)
-                    return
-                # It can take a few seconds for the load balancer to pick up
-                # the instance
-                logger.info("Waiting 1s for node to become operational")
-                time.sleep(1)
-
-                # Try one more time
-                if node.is_operational:
-                    logger.info("Node %s now operational", node)
-                    return
-
-                if count < auto_retries:
-                    count += 1
-                    logger.info("Still not operational. Trying again.")
-                    continue
-
-                logger.info("Node %s not operational.", node)
-                logger.info(
-                    "Health check URL: %s",
-                    node.get_health_check_url(),
+
+def _restore_operation(node, deployment, make_operational):
+    """
+    Put ``node`` back in to operation after `seamless_modification`. If there's
+    no ``node``, because a new one was just created, repair the whole active
+    generation instead.
+    """
+    logger.info("Restoring operation: %s", node)
+
+    if node:
+        opts = ['I', 'R', 'F']
+        prompt_str = (
+            "Node %s not made operational. Ignore/Retry/Fail (I/R/F)?"
+        )
+        auto_retries = 10
+        count = 0
+        while True:
+            try:
+                node.make_operational()
+            except Exception:
+                logger.warning(
+                    "Failed to make node %s operational",
+                    node,
                 )
+            if node.is_operational:
+                logger.info("Node %s now operational", node)
+                return
+            # It can take a few seconds for the load balancer to pick up
+            # the instance
+            logger.info("Waiting 1s for node to become operational")
+            time.sleep(1)
+            deployment.invalidate_operational_state()
+
+            # Try one more time
+            if node.is_operational:
+                logger.info("Node %s now operational", node)
+                return
+
+            if count < auto_retries:
+                count += 1
+                logger.info("Still not operational. Trying again.")
+                continue
+
+            logger.info("Node %s not operational.", node)
+            logger.info(
+                "Health check URL: %s",
+                node.get_health_check_url(),
+            )
 
-                user_opt = None
-                while not user_opt in opts:
-                    user_opt = prompt(prompt_str % node)
-                if user_opt == 'R':
-                    continue
-                elif user_opt == 'I':
-                    return
-                elif user_opt == 'F':
-                    logger.critical(
-                        "Node %s not healthy. Aborting deployment",
-                        node,
-                    )
-                    exit(1)
-            logger.info("Node %s now operational", node)
-        else:
-            # We made a new node with this step and we don't know which
-            opts = ['I', 'R', 'F']
-            prompt_str = "Active generation not fully operational. "
-            prompt_str += "Ignore/Retry/Fail (I/R/F)?"
-
-            while True:
-                deployment.repair_active_generation(
-                    force_operational=make_operational,
-                    wait_until_operational=False)
-
-                if deployment.active_is_fully_operational():
-                    logger.info("Active generation is fully operational")
-                    return
-
-                user_opt = None
-                while not user_opt in opts:
-                    user_opt = prompt(prompt_str % node)
-                if user_opt == 'R':
-                    continue
-                elif user_opt == 'I':
-                    return
-                elif user_opt == 'F':
-                    logger.critical(
-                        "Active generation not fully operational. Aborting")
-                    exit(1)
+            user_opt = None
+            while not user_opt in opts:
+                user_opt = prompt(prompt_str % node)
+            if user_opt == 'R':
+                continue
+            elif user_opt == 'I':
+                return
+            elif user_opt == 'F':
+                logger.critical(
+                    "Node %s not healthy. Aborting deployment",
+                    node,
+                )
+                exit(1)
+        logger.info("Node %s now operational", node)
+    else:
+        # We made a new node with this step and we don't know which
+        opts = ['I', 'R', 'F']
+        prompt_str = "Active generation not fully operational. "
+        prompt_str += "Ignore/Retry/Fail (I/R/F)?"
+
+        while True:
+            deployment.repair_active_generation(
+                force_operational=make_operational,
+                wait_until_operational=False)
+
+            if deployment.active_is_fully_operational():
+                logger.info("Active generation is fully operational")
+                return
+
+            user_opt = None
+            while not user_opt in opts:
+                user_opt = prompt(prompt_str % node)
+            if user_opt == 'R':
+                continue
+            elif user_opt == 'I':
+                return
+            elif user_opt == 'F':
+                logger.critical(
+                    "Active generation not fully operational. Aborting")
+                exit(1)
 
 
 def _prompt_for_seed_verification(deployer):
@@ -3,7 +3,9 @@ import os
 from datetime import datetime
 
 from decorator import contextmanager
-from fabric.api import env, prompt
+from fabric.api import env
+
+from neckbeard.host_scope import prompt
 
 logger = logging.getLogger('actions.utils')
 time_logger = logging.getLogger('timer')
@@ -1,22 +1,68 @@
+import json
 import logging
 
 from fabric.api import env
 
 from neckbeard.actions.utils import _get_gen_target, ACTIVE
+from neckbeard.cloud_resource import check_node_health
 from neckbeard.environment_manager import Deployment
+from neckbeard.snapshot import gather_snapshot
 
 logger = logging.getLogger('actions.view')
 
+TEXT_FORMAT = 'text'
+JSON_FORMAT = 'json'
+OUTPUT_FORMATS = [TEXT_FORMAT, JSON_FORMAT]
+
+
+def _get_generation_nodes(deployment, nodes, generation_target):
+    """
+    Pick the nodes belonging to ``generation_target`` out of ``nodes``, in
+    the same way as the ``Deployment.get_all_*_nodes`` methods would.
+    """
+    if generation_target == 'ACTIVE':
+        if not deployment.active_gen_id:
+            return []
+        return [
+            node for node in nodes
+            if node.generation_id == deployment.active_gen_id
+        ]
+    elif generation_target == 'PENDING':
+        return [
+            node for node in nodes
+            if node.generation_id == deployment.pending_gen_id
+        ]
+
+    new_generations = [deployment.active_gen_id, deployment.pending_gen_id]
+    old_nodes = [
+        node for node in nodes
+        if node.generation_id not in new_generations and node.is_running == 1
+    ]
+    old_nodes.sort(key=lambda n: n.generation_id)
+
+    return old_nodes
+
 
 def view(
     environment_name,
     configuration_manager,
     resource_tracker,
     generation=ACTIVE,
+    verify_generation=False,
+    output_format=TEXT_FORMAT,
+    fast=False,
 ):
     """
     The view task output status information about all of the cloud resources
     associated with a specific generation of a specific deployment.
+
+    ``verify_generation`` If True, check the tracked active generation
+    against a full scan of the node records.
+    ``output_format`` With ``JSON_FORMAT``, output a snapshot of all of the
+    running nodes, as gathered by `neckbeard.snapshot.gather_snapshot`,
+    instead.
+    ``fast`` If True, skip the node health checks, which are by far the
+    slowest part.
     """
     # Hard-coding everything to work on active for now
     env._active_gen = True
@@ -31,16 +77,40 @@ def view(
         environment_config.get('ec2', {}),
         environment_config.get('rds', {}),
         environment_config.get('elb', {}),
+        resource_tracker=resource_tracker,
     )
-    deployment.verify_deployment_state()
+    # Verification describes every node's instance, so the nodes it returns
+    # are all that's needed for rendering without going back to AWS
+    verified_nodes = deployment.verify_deployment_state()
+    if verify_generation:
+        deployment.verify_generation_pointer()
+
+    if output_format == JSON_FORMAT:
+        snapshot = gather_snapshot(
+            deployment,
+            nodes=[node for node in verified_nodes if node.is_running == 1],
+        )
+        print json.dumps(snapshot, indent=2, sort_keys=True)
+        resource_tracker.log_stats()
+        return
 
     logger.info("Gathering nodes")
-    if generation_target == 'ACTIVE':
-        nodes = deployment.get_all_active_nodes()
-    elif generation_target == 'PENDING':
-        nodes = deployment.get_all_pending_nodes()
-    else:
-        nodes = deployment.get_all_old_nodes(is_running=1)
+    nodes = _get_generation_nodes(
+        deployment,
+        verified_nodes,
+        generation_target,
+    )
+    node_health = {}
+    if not fast:
+        node_health = check_node_health(
+            [node for node in nodes if node.is_running],
+        )
+
+    def render(node):
+        return node.get_status_output(
+            is_healthy=node_health.get(node),
+            check_health=not fast,
+        )
 
     ec2_nodes = []
     rds_nodes = []
@@ -75,7 +145,7 @@ def view(
         print "No configured nodes"
     else:
         for node in ec2_nodes:
-            print "%s" % node.get_status_output()
+            print "%s" % render(node)
     print ""
 
     # RDS output
@@ -85,4 +155,6 @@ def view(
         print "No configured nodes"
     else:
         for node in rds_nodes:
-            print "%s" % node.get_status_output()
+            print "%s" % render(node)
+
+    resource_tracker.log_stats()
@@ -0,0 +1,306 @@
+"""
+Benchmark the work that neckbeard's actions do against `neckbeard.fake_aws`.
+
+For each environment size, a fresh fake AWS account is populated with an
+active generation of EC2 nodes behind a loadbalancer, an RDS node and an older,
+still-running generation. Each action's `Deployment` work is then run against
+it and the number of API calls and the wall time are reported.
+
+Run it with::
+
+    python -m neckbeard.benchmark --nodes 10 100 1000 --latency 0.01
+
+`up` stops short of actually deploying, so there's no `up` row. Instead,
+``up-verify`` measures just its state-gathering and deploy-ordering phase.
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from neckbeard.cloud_resource import check_node_health
+from neckbeard.environment_manager import Deployment, InfrastructureNode
+from neckbeard.fake_aws import FakeAWS
+from neckbeard.resource_tracker import SimpleDBResourceTracker
+
+DEPLOYMENT_NAME = 'benchmark'
+TRACKER_DOMAIN = 'neckbeard-benchmark'
+LOADBALANCER_NAME = 'benchmark-lb'
+KEYPAIR = 'benchmark'
+ELASTIC_IP_TPL = '10.%s.%s.1'
+# Every this many EC2 nodes has an elastic IP
+ELASTIC_IP_EVERY = 10
+DEFAULT_NODE_COUNTS = [10, 100, 1000]
+# The fraction of active nodes that start out of the loadbalancer
+INOPERATIONAL_FRACTION = 0.1
+
+AWS_CONF = {
+    'access_key_id': 'fake-access-key-id',
+    'secret_access_key': 'fake-secret-access-key',
+    'keypair': KEYPAIR,
+}
+
+
+def _add_node_record(aws, aws_type, name, aws_id, generation_id, is_active):
+    record = {
+        'generation_id': generation_id,
+        'deployment_name': DEPLOYMENT_NAME,
+        'aws_type': aws_type,
+        'aws_id': aws_id,
+        'name': name,
+        'creation_date': datetime.now(),
+        'is_running': 1,
+        'is_active_generation': int(is_active),
+        'initial_deploy_complete': 1,
+    }
+    attributes = dict(
+        (field_name, InfrastructureNode.fields[field_name].encode(value))
+        for field_name, value in record.items()
+    )
+    item_name = '%s-%s-%s-%s' % (
+        DEPLOYMENT_NAME,
+        aws_type,
+        name,
+        generation_id,
+    )
+    aws.add_sdb_item(TRACKER_DOMAIN, item_name, attributes)
+
+
+def build_environment(aws, node_count):
+    """
+    Populate ``aws`` with an old and an active generation of ``node_count``
+    EC2 nodes, plus an RDS node per generation. Only the active generation's
+    EC2 nodes are in the loadbalancer, and some of them hold elastic IPs.
+
+    Returns the deployment configuration, keyed by aws type.
+    """
+    old_gen_id = 1
+    active_gen_id = 2
+
+    ec2_confs = {}
+    loadbalancer = aws.add_load_balancer(LOADBALANCER_NAME)
+    for i in range(node_count):
+        name = 'web%s' % i
+        ec2_confs[name] = {
+            'aws': dict(AWS_CONF),
+            'loadbalancer': LOADBALANCER_NAME,
+        }
+
+        old_instance = aws.add_instance(KEYPAIR)
+        _add_node_record(aws, 'ec2', name, old_instance.id, old_gen_id, False)
+
+        active_instance = aws.add_instance(KEYPAIR)
+        _add_node_record(
+            aws, 'ec2', name, active_instance.id, active_gen_id, True,
+        )
+        loadbalancer.instance_ids.append(active_instance.id)
+
+        if i % ELASTIC_IP_EVERY == 0:
+            elastic_ip = ELASTIC_IP_TPL % (i // 256, i % 256)
+            ec2_confs[name]['aws']['elastic_ip'] = elastic_ip
+            aws.add_address(elastic_ip, instance_id=active_instance.id)
+
+    rds_confs = {
+        'masterdb': {
+            'aws': dict(AWS_CONF),
+        },
+    }
+    for gen_id, is_active in [(old_gen_id, False), (active_gen_id, True)]:
+        db_instance_id = 'pstat%s-v-1-0-db-%s' % (DEPLOYMENT_NAME, gen_id)
+        aws.add_db_instance(db_instance_id)
+        _add_node_record(
+            aws, 'rds', 'masterdb', db_instance_id, gen_id, is_active,
+        )
+
+    return {
+        'ec2': ec2_confs,
+        'rds': rds_confs,
+        'elb': {},
+    }
+
+
+def build_deployment(aws, deployment_confs):
+    resource_tracker = SimpleDBResourceTracker(
+        domain=TRACKER_DOMAIN,
+        aws_access_key_id=AWS_CONF['access_key_id'],
+        aws_secret_access_key=AWS_CONF['secret_access_key'],
+        sdbconn=aws.sdb_connection(),
+    )
+
+    return Deployment(
+        DEPLOYMENT_NAME,
+        deployment_confs['ec2'],
+        deployment_confs['rds'],
+        deployment_confs['elb'],
+        resource_tracker=resource_tracker,
+        ec2conn=aws.ec2_connection(),
+        rdsconn=aws.rds_connection(),
+        elbconn=aws.elb_connection(),
+    )
+
+
+def _take_nodes_out_of_operation(aws, deployment_confs):
+    loadbalancer = aws.load_balancers[LOADBALANCER_NAME]
+    out_count = int(len(loadbalancer.instance_ids) * INOPERATIONAL_FRACTION)
+    del loadbalancer.instance_ids[:max(out_count, 1)]
+
+
+def run_view(deployment):
+    nodes = [
+        node for node in deployment.verify_deployment_state()
+        if node.generation_id == deployment.active_gen_id
+    ]
+    node_health = check_node_health(nodes)
+    for node in nodes:
+        node.get_status_output(is_healthy=node_health[node])
+
+
+# The work `up` does before it would start deploying: verifying the pending
+# and active generations and ordering the EC2 nodes by health
+def run_up_verify(deployment):
+    deployment.verify_deployment_state(verify_old=False)
+    nodes = [
+        deployment.get_active_node('ec2', node_name)
+        for node_name in deployment.deployment_confs['ec2']
+    ]
+    check_node_health(nodes)
+    for node in nodes:
+        node.is_operational
+
+
+def run_repair(deployment):
+    deployment.verify_deployment_state()
+    deployment.repair_active_generation()
+
+
+def run_repair_parallel(deployment):
+    deployment.verify_deployment_state()
+    deployment.repair_active_generation_concurrently()
+
+
+def run_terminate(deployment):
+    possible_nodes = deployment.get_all_old_nodes(is_running=1)
+    deployment.verify_running_state(possible_nodes)
+    running_nodes = [node for node in possible_nodes if node.is_running]
+    for node in running_nodes:
+        node.make_fully_inoperative()
+        node.terminate()
+
+
+# Action name, optional setup applied to the fresh environment, and the run
+ACTIONS = [
+    ('view', None, run_view),
+    ('up-verify', None, run_up_verify),
+    ('repair', _take_nodes_out_of_operation, run_repair),
+    ('repair-parallel', _take_nodes_out_of_operation, run_repair_parallel),
+    ('terminate', None, run_terminate),
+]
+
+
+def run_benchmark(
+    node_count, latency=0, service_latencies=None, actions=None,
+):
+    """
+    Run each action against a freshly-built environment with ``node_count``
+    EC2 nodes per generation.
+
+    Returns a list of result dictionaries with the action name, the total
+    number of API calls, the calls made per API action and the wall time in
+    seconds.
+    """
+    results = []
+    for action_name, setup, run in ACTIONS:
+        if actions and action_name not in actions:
+            continue
+
+        aws = FakeAWS(latency=latency, service_latencies=service_latencies)
+        deployment_confs = build_environment(aws, node_count)
+        if setup is not None:
+            setup(aws, deployment_confs)
+
+        deployment = build_deployment(aws, deployment_confs)
+        aws.reset_calls()
+
+        start = time.time()
+        run(deployment)
+        duration = time.time() - start
+
+        results.append({
+            'action': action_name,
+            'node_count': node_count,
+            'call_count': aws.get_call_count(),
+            'calls': dict(aws.calls),
+            'duration': duration,
+        })
+
+    return results
+
+
+def print_results(results, show_calls=False):
+    print "%-16s %6s %8s %10s" % ('action', 'nodes', 'calls', 'seconds')
+    for result in results:
+        print "%-16s %6s %8s %10.3f" % (
+            result['action'],
+            result['node_count'],
+            result['call_count'],
+            result['duration'],
+        )
+        if show_calls:
+            for call, count in sorted(result['calls'].items()):
+                print "    %-51s %8s" % (call, count)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark neckbeard actions against fake AWS services',
+    )
+    parser.add_argument(
+        '-n',
+        '--nodes',
+        nargs='+',
+        type=int,
+        default=DEFAULT_NODE_COUNTS,
+        dest='node_counts',
+        help='The environment sizes, in EC2 nodes per generation',
+    )
+    parser.add_argument(
+        '-l',
+        '--latency',
+        type=float,
+        default=0,
+        help='Seconds of latency added to every API call',
+    )
+    parser.add_argument(
+        '-a',
+        '--action',
+        action='append',
+        choices=[action_name for action_name, _, _ in ACTIONS],
+        dest='actions',
+        help='Only benchmark the given action(s)',
+    )
+    parser.add_argument(
+        '--show-calls',
+        action='store_true',
+        dest='show_calls',
+        help='Break the call counts down by API action',
+    )
+    args = parser.parse_args()
+
+    # Every simulated node change logs loudly, which isn't what we're
+    # measuring here
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for node_count in args.node_counts:
+        results.extend(
+            run_benchmark(
+                node_count,
+                latency=args.latency,
+                actions=args.actions,
+            )
+        )
+    print_results(results, show_calls=args.show_calls)
+
+
+if __name__ == '__main__':
+    main()
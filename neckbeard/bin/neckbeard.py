@@ -1,19 +1,23 @@
 from __future__ import absolute_import
 
 import argparse
+import json
 import logging
 import os.path
 
 from neckbeard.actions import up, view
+from neckbeard.actions.view import OUTPUT_FORMATS, TEXT_FORMAT
 from neckbeard.configuration import ConfigurationManager
 from neckbeard.loader import NeckbeardLoader
 from neckbeard.output import configure_logging
 from neckbeard.resource_tracker import build_tracker_from_config
+from neckbeard.snapshot import diff_snapshots, format_diff
 
 logger = logging.getLogger('cli')
 
 COMMANDS = [
     'check',
+    'diff',
     'up',
     'view',
 ]
@@ -21,6 +25,8 @@ COMMANDS = [
 COMMAND_ERROR_CODES = {
     'INVALID_COMMAND_OPTIONS': 2,
 }
+# Like diff(1), ``diff`` exits with this when the snapshots differ
+SNAPSHOTS_DIFFER_CODE = 1
 
 
 class VerboseAction(argparse.Action):
@@ -68,6 +74,11 @@ def main():
         default='check',
         help="The neckbeard action you'd like to take",
     )
+    parser.add_argument(
+        'snapshots',
+        nargs='*',
+        help="For diff, the two JSON snapshot files (from view) to compare",
+    )
     parser.add_argument(
         '-e',
         '--environment',
@@ -81,6 +92,29 @@ def main():
         default='.neckbeard/',
         help="Path to your '.neckbeard' configuration directory",
     )
+    parser.add_argument(
+        '--verify',
+        action='store_true',
+        dest='verify',
+        help=(
+            "Verify the tracked active generation against a full scan of the "
+            "resource tracker's node records"
+        ),
+    )
+    parser.add_argument(
+        '-f',
+        '--format',
+        choices=OUTPUT_FORMATS,
+        default=TEXT_FORMAT,
+        dest='output_format',
+        help="For view, output human-readable text or a JSON snapshot",
+    )
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        dest='fast',
+        help="For view, skip the node health checks",
+    )
 
     args = parser.parse_args()
 
@@ -90,11 +124,27 @@ def main():
         args.command,
         args.environment,
         args.configuration_directory,
+        verify=args.verify,
+        output_format=args.output_format,
+        snapshot_paths=args.snapshots,
+        fast=args.fast,
     )
     exit(return_code)
 
 
-def run_commands(command, environment, configuration_directory):
+def run_commands(
+    command,
+    environment,
+    configuration_directory,
+    verify=False,
+    output_format=TEXT_FORMAT,
+    snapshot_paths=None,
+    fast=False,
+):
+    if command == 'diff':
+        # Comparing snapshots doesn't need any configuration
+        return do_diff(snapshot_paths or [])
+
     configuration_directory = os.path.abspath(configuration_directory)
 
     loader = _get_and_test_loader(configuration_directory)
@@ -133,6 +183,7 @@ def run_commands(command, environment, configuration_directory):
             configuration_directory,
             environment,
             configuration,
+            verify=verify,
         )
         return 0
     elif command == 'view':
@@ -140,6 +191,9 @@ def run_commands(command, environment, configuration_directory):
             configuration_directory,
             environment,
             configuration,
+            verify=verify,
+            output_format=output_format,
+            fast=fast,
         )
         return 0
 
@@ -159,27 +213,59 @@ def do_configuration_check(
 
 
 def do_up(
-    configuration_directory, environment_name, configuration,
+    configuration_directory, environment_name, configuration, verify=False,
 ):
     logger.info("Running up on environment: %s", environment_name)
     up(
         environment_name=environment_name,
         configuration_manager=configuration,
         resource_tracker=build_tracker_from_config(configuration),
+        verify_generation=verify,
     )
 
 
 def do_view(
-    configuration_directory, environment_name, configuration,
+    configuration_directory,
+    environment_name,
+    configuration,
+    verify=False,
+    output_format=TEXT_FORMAT,
+    fast=False,
 ):
     logger.info("Running view on environment: %s", environment_name)
     view(
         environment_name=environment_name,
         configuration_manager=configuration,
         resource_tracker=build_tracker_from_config(configuration),
+        verify_generation=verify,
+        output_format=output_format,
+        fast=fast,
     )
 
 
+def do_diff(snapshot_paths):
+    if len(snapshot_paths) != 2:
+        logger.critical(
+            "diff requires exactly two snapshot files. Got: %s",
+            snapshot_paths,
+        )
+        return COMMAND_ERROR_CODES['INVALID_COMMAND_OPTIONS']
+
+    snapshots = []
+    for snapshot_path in snapshot_paths:
+        with open(snapshot_path) as snapshot_file:
+            snapshots.append(json.load(snapshot_file))
+
+    diff = diff_snapshots(*snapshots)
+    lines = format_diff(diff)
+    for line in lines:
+        print line
+    if lines:
+        return SNAPSHOTS_DIFFER_CODE
+
+    return 0
+
+
 def _get_and_test_loader(configuration_directory):
     loader = NeckbeardLoader(
         configuration_directory=configuration_directory,
@@ -1,4 +1,4 @@
 
-from neckbeard.brain_wrinkles.base import BaseProvisioner
+from neckbeard.brain_wrinkles.base import BaseProvisioner, CommandBatch
 
-__all__ = [BaseProvisioner]
+__all__ = [BaseProvisioner, CommandBatch]
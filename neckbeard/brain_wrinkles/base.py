@@ -2,13 +2,122 @@
 Base interface for a provisioner.
 """
 import logging
+import re
 import time
+import uuid
+from StringIO import StringIO
+from collections import namedtuple
+from contextlib import contextmanager
 
-from fabric.api import prompt, env
+from fabric.api import abort, prompt, env, put, sudo
 
 logger = logging.getLogger('prov:base')
 logger.setLevel(logging.INFO)
 
+# The outcome of one `CommandBatch` step. ``return_code`` is None if the
+# script stopped before the step ran.
+StepResult = namedtuple('StepResult', ['command', 'return_code', 'output'])
+
+
+class CommandBatch(object):
+    """
+    Collect shell steps to run together as one uploaded script, so that they
+    cost a single SSH round trip instead of one each.
+
+    The steps run in order and the script stops at the first one that fails,
+    so later steps can depend on earlier ones. Like a failed ``sudo``, a
+    failed step then aborts the deploy. Each step's exit code and output are
+    recorded separately.
+
+    ``upload`` and ``execute`` default to Fabric's ``put`` and ``sudo``.
+    """
+    def __init__(self, description, upload=put, execute=sudo):
+        self.description = description
+        self.commands = []
+        self._upload = upload
+        self._execute = execute
+
+    def add(self, command):
+        self.commands.append(command)
+
+    def build_script(self, marker, script_path):
+        lines = [
+            '#!/bin/bash',
+            '# %s' % self.description,
+            "trap 'rm -f %s' EXIT" % script_path,
+        ]
+        for i, command in enumerate(self.commands):
+            lines.append(command)
+            lines.append('step_code=$?')
+            lines.append('echo "%s %s $step_code"' % (marker, i))
+            # Exit cleanly so that `run` can report which step failed
+            lines.append('[ $step_code -eq 0 ] || exit 0')
+
+        return '\n'.join(lines) + '\n'
+
+    def parse_output(self, marker, output):
+        """
+        Split the script's ``output`` in to a `StepResult` per step, using
+        the exit codes echoed after each of them.
+        """
+        marker_re = re.compile(r'%s (\d+) (\d+)' % marker)
+        return_codes = {}
+        outputs = {}
+        step_lines = []
+        for line in output.splitlines():
+            match = marker_re.search(line)
+            if match is None:
+                step_lines.append(line.rstrip('\r'))
+                continue
+            step_lines.append(line[:match.start()])
+            i = int(match.group(1))
+            return_codes[i] = int(match.group(2))
+            outputs[i] = '\n'.join(step_lines).strip()
+            step_lines = []
+
+        return [
+            StepResult(command, return_codes.get(step), outputs.get(step, ''))
+            for step, command in enumerate(self.commands)
+        ]
+
+    def run(self):
+        """
+        Upload and run the script, returning a `StepResult` for each step in
+        the order they were added.
+
+        If any step fails, or the script stops before running them all, its
+        output is logged and the deploy is aborted.
+        """
+        if not self.commands:
+            return []
+
+        marker = 'neckbeard-step-%s' % uuid.uuid4().hex
+        script_path = '/tmp/%s.sh' % marker
+        logger.info(
+            "Running %s step(s) to %s",
+            len(self.commands),
+            self.description,
+        )
+        self._upload(
+            StringIO(self.build_script(marker, script_path)),
+            script_path,
+        )
+        output = self._execute('bash %s' % script_path)
+
+        results = self.parse_output(marker, output)
+        failed = [result for result in results if result.return_code != 0]
+        if failed:
+            logger.critical(
+                "Step failed with %s: %s",
+                failed[0].return_code,
+                failed[0].command,
+            )
+            if failed[0].output:
+                logger.critical("Output: %s", failed[0].output)
+            abort("Failed to %s" % self.description)
+
+        return results
+
 
 class BaseProvisioner(object):
     services = []
@@ -17,6 +126,16 @@ class BaseProvisioner(object):
         self.node = node
         self.conf = conf
 
+    @contextmanager
+    def command_batch(self, description):
+        """
+        Collect the shell steps added to the yielded `CommandBatch`, then run
+        them all in one go. If the block raises an exception, nothing is run.
+        """
+        batch = CommandBatch(description)
+        yield batch
+        batch.run()
+
     def start_services(self):
         """
         Start services that should be stopped during initial provisioning.
@@ -79,26 +79,29 @@ class AppServerProvisioner(BaseProvisioner):
         Fix folder permissions that can break while restoring.
         """
         logger.info("Fixing EBS volume folder permissions")
-        if self.is_local_db():
-            with hide(*fab_quiet):
-                sudo('chown -R mysql:mysql /var/lib/mysql')
-                sudo('chown -R mysql:adm /var/log/mysql')
-
         with hide(*fab_quiet):
-            sudo('chown -R %s /var/log/uwsgi' % F_CHOWN)
-            sudo('chown -R %s /var/log/celery' % F_CHOWN)
-            sudo('chown -R %s /var/log/pstat' % F_CHOWN)
-
-            # Ensure the pstat log dir is writable by root
-            sudo('chmod -R g+w /var/log/pstat')
-
-            # One-off fix for wrong permissions on /etc/cron.d/calabard_monitor
-            sudo('chown root:root /etc/cron.d/calabard_monitor')
-
-            # Ensure the media storage directory exists
-            sudo('mkdir %s --parents' % MEDIA_STORAGE_ROOT)
-            sudo('chown -R %s %s' % (F_CHOWN, MEDIA_STORAGE_ROOT))
-            sudo('chmod -R u+rw,g+rw,o+r,o-w %s' % MEDIA_STORAGE_ROOT)
+            with self.command_batch("fix folder permissions") as batch:
+                if self.is_local_db():
+                    batch.add('chown -R mysql:mysql /var/lib/mysql')
+                    batch.add('chown -R mysql:adm /var/log/mysql')
+
+                batch.add('chown -R %s /var/log/uwsgi' % F_CHOWN)
+                batch.add('chown -R %s /var/log/celery' % F_CHOWN)
+                batch.add('chown -R %s /var/log/pstat' % F_CHOWN)
+
+                # Ensure the pstat log dir is writable by root
+                batch.add('chmod -R g+w /var/log/pstat')
+
+                # One-off fix for wrong permissions on
+                # /etc/cron.d/calabard_monitor
+                batch.add('chown root:root /etc/cron.d/calabard_monitor')
+
+                # Ensure the media storage directory exists
+                batch.add('mkdir %s --parents' % MEDIA_STORAGE_ROOT)
+                batch.add('chown -R %s %s' % (F_CHOWN, MEDIA_STORAGE_ROOT))
+                batch.add(
+                    'chmod -R u+rw,g+rw,o+r,o-w %s' % MEDIA_STORAGE_ROOT,
+                )
 
     def do_first_launch_config(self):
         self._do_set_hostname()
@@ -491,13 +494,6 @@ class AppServerProvisioner(BaseProvisioner):
             if changed:
                 self.modified_services.append(SUPERVISORD)
 
-            # Give user policystat access to configuration files
-            files = [
-                '/etc/uwsgi/policystat.yaml',
-                '/etc/newrelic/policystat.ini',
-            ]
-            sudo('chown %s %s' % (F_CHOWN, ' '.join(files)))
-
             logger.info("Configuring nginx")
             # Configure the nginx host
             context = {
@@ -511,15 +507,23 @@ class AppServerProvisioner(BaseProvisioner):
                 use_sudo=True,
             )
 
-            # Make sure no other sites are enabled
-            sudo('rm -f /etc/nginx/sites-enabled/*')
+            with self.command_batch("configure webservers") as batch:
+                # Give user policystat access to configuration files
+                files = [
+                    '/etc/uwsgi/policystat.yaml',
+                    '/etc/newrelic/policystat.ini',
+                ]
+                batch.add('chown %s %s' % (F_CHOWN, ' '.join(files)))
 
-            # Enable our site
-            sudo(
-                'ln -s '
-                '/etc/nginx/sites-available/%(pstat_url)s '
-                '/etc/nginx/sites-enabled/%(pstat_url)s' % env
-            )
+                # Make sure no other sites are enabled
+                batch.add('rm -f /etc/nginx/sites-enabled/*')
+
+                # Enable our site
+                batch.add(
+                    'ln -s '
+                    '/etc/nginx/sites-available/%(pstat_url)s '
+                    '/etc/nginx/sites-enabled/%(pstat_url)s' % env
+                )
 
     def _make_media_readable(self, source_dir):
         """
@@ -759,14 +763,15 @@ class AppServerProvisioner(BaseProvisioner):
             for name in LINKED_DIRS
         ]
 
-        for name, link_name in dirs:
-            with hide(*fab_output_hides):
-                storage_dir = os.path.join(MEDIA_STORAGE_ROOT, name)
-                sudo('mkdir %s --parents' % storage_dir)
-                sudo('chown %s %s' % (F_CHOWN, storage_dir))
-                sudo('chmod u+rw,g+rw,o+r,o-w %s' % storage_dir)
+        with hide(*fab_output_hides):
+            with self.command_batch("link storage directories") as batch:
+                for name, link_name in dirs:
+                    storage_dir = os.path.join(MEDIA_STORAGE_ROOT, name)
+                    batch.add('mkdir %s --parents' % storage_dir)
+                    batch.add('chown %s %s' % (F_CHOWN, storage_dir))
+                    batch.add('chmod u+rw,g+rw,o+r,o-w %s' % storage_dir)
 
-                sudo('ln -s %s %s' % (storage_dir, link_name))
+                    batch.add('ln -s %s %s' % (storage_dir, link_name))
 
     def _build_search_index(self):
         """
@@ -1155,8 +1160,11 @@ class AppServerProvisioner(BaseProvisioner):
         logger.info("Fixing log file permissions")
         # Fix python log file permissions
         with hide(*fab_output_hides):
-            sudo('touch /var/log/pstat/ldap_logins.log')
-            sudo('chown %s /var/log/pstat/ldap_logins.log' % F_CHOWN)
+            with self.command_batch("fix log file permissions") as batch:
+                batch.add('touch /var/log/pstat/ldap_logins.log')
+                batch.add(
+                    'chown %s /var/log/pstat/ldap_logins.log' % F_CHOWN,
+                )
 
     def _enable_cron_tpl(self, cron_file):
         context = {
@@ -1,7 +1,13 @@
-from neckbeard.cloud_provisioners.aws.ec2 import Ec2NodeDeployment
+from neckbeard.cloud_provisioners.aws.ec2 import (
+    Ec2NodeDeployment,
+    launch_instances,
+    take_seed_snapshots,
+)
 from neckbeard.cloud_provisioners.aws.rds import RdsNodeDeployment
 
 __all__ = [
     Ec2NodeDeployment,
     RdsNodeDeployment,
+    launch_instances,
+    take_seed_snapshots,
 ]
@@ -6,22 +6,37 @@ and actions live here while generic actions/configurations live at
 import ConfigParser
 import logging
 import os.path
+import re
 import time
 from collections import namedtuple, defaultdict
 from tempfile import NamedTemporaryFile
 
-from boto import ec2
+from boto.exception import EC2ResponseError
 from fabric.api import sudo, env, require, put, hide, run
 from fabric.contrib.files import upload_template
 
+from neckbeard import ssh
 from neckbeard.cloud_provisioners import BaseNodeDeployment
+from neckbeard.concurrency import map_concurrently
 from neckbeard.output import fab_out_opts
+from neckbeard.waiters import Backoff, WaitTimedOut, wait_for_all, wait_until
 
 LOG_DIR = '/var/log/pstat'
 AWS_METADATA_SERVICE = 'http://169.254.169.254/latest/meta-data/'
-LAUNCH_REFRESH = 15  # seconds to wait before re-checking ec2 statuses
+LAUNCH_REFRESH = 15  # the most seconds to wait before re-checking statuses
+SSH_READY_TIMEOUT = 60  # seconds to wait for SSH on a running instance
+DETACH_TIMEOUT = 2 * 60  # seconds to wait before forcing volume detachment
+DELETE_TIMEOUT = 60  # seconds to keep retrying a volume deletion
+# Roles whose nodes other nodes are configured to use. Nodes with any of these
+# roles are deployed before the nodes without them.
+PROVIDER_ROLES = [
+    'memcached',
+    'celery_backend',
+    'sphinx_search_indexer',
+]
 
 logger = logging.getLogger('aws.ec2')
+time_logger = logging.getLogger('timer')
 
 fab_output_hides = fab_out_opts[logger.getEffectiveLevel()]
 fab_quiet = fab_output_hides + ['stderr']
@@ -69,6 +84,22 @@ EC2_FSTAB_DEFAULTS = [
         '0',
     ),
 ]
+# A snapshot we haven't described yet
+PendingSnapshot = namedtuple('PendingSnapshot', ['id'])
+SNAPSHOT_ID_RE = re.compile(r'\bsnap-[0-9a-f]+\b')
+# Everything about an instance that must match for it to be launched in the
+# same ``run_instances`` request as other instances
+LaunchSpec = namedtuple(
+    'LaunchSpec',
+    [
+        'aws_settings',
+        'image_id',
+        'key_name',
+        'placement',
+        'instance_type',
+        'security_groups',
+    ]
+)
 
 
 class Ec2NodeDeployment(BaseNodeDeployment):
@@ -77,7 +108,6 @@ class Ec2NodeDeployment(BaseNodeDeployment):
     AWS-specific configuration actions and delegates system-level configuration
     to the provisioner.
     """
-
     def __init__(self, *args, **kwargs):
         """
         ``conf[ebs]`` is a dictionary mapping out exactly where and how any EBS
@@ -118,6 +148,24 @@ class Ec2NodeDeployment(BaseNodeDeployment):
         # A volume-label keyed dictionary with the attached EBS volume id
         # eg. {'fs': 'vol-xxxxxxx'}
         self.attached_volumes = {}
+        # An instance launched along with other nodes' by `launch_instances`
+        self._launched_instance = None
+
+    def get_dependencies(self):
+        """
+        App nodes need the ``masterdb`` RDS node. Nodes without any of the
+        ``PROVIDER_ROLES`` also need every node that has one of them.
+        """
+        dependencies = [('rds', 'masterdb')]
+        if _has_provider_role(self._conf):
+            return dependencies
+
+        ec2_confs = self.deployment.deployment_confs['ec2']
+        for node_name, conf in sorted(ec2_confs.items()):
+            if _has_provider_role(conf):
+                dependencies.append(('ec2', node_name))
+
+        return dependencies
 
     def get_seed_data(self):
         """
@@ -125,45 +173,51 @@ class Ec2NodeDeployment(BaseNodeDeployment):
         """
         if not self.seed_deployment:
             return
+        if self.seed_ebs_snapshots:
+            # Already taken along with other nodes' by `take_seed_snapshots`
+            return
         require('aws_access_key_id')
         require('aws_secret_access_key')
 
         self.seed_ebs_snapshots = self._get_seed_ebs_snapshots()
 
     def wait_until_created(self, node):
-        while not self.creation_complete(node):
-            logging.info("Instance pending. Waiting %ss", LAUNCH_REFRESH)
-            time.sleep(LAUNCH_REFRESH)
+        wait_until(
+            lambda: self.creation_complete(node),
+            "ec2 instance %s to be created" % node.aws_id,
+            backoff=Backoff(initial_delay=5, max_delay=LAUNCH_REFRESH),
+        )
 
     def creation_complete(self, node):
-        start_host_string = env.host_string
-        start_host = env.host
         node.refresh_boto_instance()
         if node.boto_instance.state == 'running':
-            # Try to SSH in to test that it's actually available
-            timeout = 60  # 1 minute
-            tries = 0
-            step = LAUNCH_REFRESH
-            while tries * step <= timeout:
+            # Try to SSH in to test that it's actually available. The
+            # connection stays open for all of the node's remote commands.
+            def ssh_available():
                 node.refresh_boto_instance()
-                env.host_string = node.boto_instance.public_dns_name
-                env.host = node.boto_instance.public_dns_name
-                tries += 1
                 try:
-                    with hide('everything'):
-                        sudo('uptime', pty=True)
-                    env.host_string = start_host_string
-                    env.host = start_host
+                    ssh.default_manager.connect(
+                        node.boto_instance.public_dns_name,
+                    )
                     return True
-                except:
+                except (Exception, SystemExit):
                     logger.info(
-                        "%s not ready for SSH. Waiting %ss",
+                        "%s not ready for SSH",
                         node.boto_instance.public_dns_name,
-                        LAUNCH_REFRESH)
-                    time.sleep(LAUNCH_REFRESH)
+                    )
+                    return False
+
+            try:
+                wait_until(
+                    ssh_available,
+                    "SSH on %s" % node.aws_id,
+                    timeout=SSH_READY_TIMEOUT,
+                    backoff=Backoff(initial_delay=5, max_delay=LAUNCH_REFRESH),
+                )
+                return True
+            except WaitTimedOut:
+                pass
 
-        env.host_string = start_host_string
-        env.host = start_host
         return False
 
     def create_new_node(self):
@@ -176,10 +230,10 @@ class Ec2NodeDeployment(BaseNodeDeployment):
 
         if self.is_active:
             self.deployment.set_active_node(
-                'ec2', env.node_name, ec2_instance)
+                'ec2', self.node_name, ec2_instance)
         else:
             self.deployment.set_pending_node(
-                'ec2', env.node_name, ec2_instance)
+                'ec2', self.node_name, ec2_instance)
 
         # Build EBS volumes, unless explicitly told not to.
         ebs_debug = self.ebs_confs.get('debug', {})
@@ -206,6 +260,7 @@ class Ec2NodeDeployment(BaseNodeDeployment):
         # Ensure we're running commands against our spanking-new instance
         node.refresh_boto_instance()
         env.host_string = node.boto_instance.public_dns_name
+        ssh.default_manager.connect(env.host_string)
 
         self._ensure_ebs_vols_mounted(ec2_instance.id, vol_confs)
 
@@ -229,6 +284,7 @@ class Ec2NodeDeployment(BaseNodeDeployment):
         env.hosts = [node.boto_instance.public_dns_name]
         env.host_string = node.boto_instance.public_dns_name
         env.host = node.boto_instance.public_dns_name
+        ssh.default_manager.connect(env.host_string)
 
         env.hostname = '%s-%s' % (env.get('env'), env.get('node_name'))
         env.ec2_instance_id = node.boto_instance.id
@@ -239,7 +295,7 @@ class Ec2NodeDeployment(BaseNodeDeployment):
             if ebs_debug.get('attach_ebs_volumes', True):
                 # Create the .ec2tools configuration for snapshotting/backups
                 self._configure_ec2tools(
-                    self.deployment.ec2conn,
+                    self.get_connection('ec2'),
                     node.boto_instance.id,
                     self.ebs_confs['vols'])
                 if ebs_confs.get('do_snapshot_backups', False):
@@ -322,7 +378,8 @@ class Ec2NodeDeployment(BaseNodeDeployment):
     def _get_seed_ebs_snapshots(self):
         """
         Take snapshots of the seed EBS volumes to use as sources for new EBS
-        volumes.
+        volumes. All of the volumes are snapshotted with a single
+        ``ec2-consistent-snapshot`` run on the seed node.
 
         Returns a dictionary of volume names and their snapshot ids.
         """
@@ -330,22 +387,78 @@ class Ec2NodeDeployment(BaseNodeDeployment):
         # Perform EBS snapshots on the configured volumes
 
         seed_snapshots = {}
+        snapshot_vol_confs = {}
         for volume_name, volume_conf in self.ebs_confs['vols'].items():
             snapshot_id = self._get_debug_seed_snapshot(volume_name)
             if snapshot_id is None:
-                env.host_string = self.seed_node.boto_instance.public_dns_name
-                snapshot_id = self._get_ebs_snapshot(volume_name, volume_conf)
+                snapshot_vol_confs[volume_name] = volume_conf
             else:
                 logger.info(
                     "Using hard-coded debug snapshot_id %s for volume: %s",
                     snapshot_id,
                     volume_name
                 )
+                seed_snapshots[volume_name] = snapshot_id
 
-            seed_snapshots[volume_name] = snapshot_id
+        if snapshot_vol_confs:
+            cache_key = self._get_ebs_snapshots_cache_key(snapshot_vol_confs)
+            new_snapshots = self._get_cached_ebs_snapshots(cache_key)
+            if new_snapshots is None:
+                env.host_string = self.seed_node.boto_instance.public_dns_name
+                ssh.default_manager.connect(env.host_string)
+                new_snapshots = self._get_ebs_snapshots(snapshot_vol_confs)
+                self.cache_seed_snapshots(cache_key, new_snapshots)
+            seed_snapshots.update(new_snapshots)
 
         return seed_snapshots
 
+    def _get_ebs_snapshots_cache_key(self, vol_confs):
+        return 'ebs:%s:%s:%s' % (
+            self.seed_deployment.deployment_name,
+            self.seed_node_name,
+            ','.join(
+                '%s=%s' % (volume_name, vol_confs[volume_name]['device'])
+                for volume_name in sorted(vol_confs)
+            ),
+        )
+
+    def _get_cached_ebs_snapshots(self, cache_key):
+        """
+        Get the seed snapshots recently taken of the same volumes for another
+        deployment, if they're still usable.
+        """
+        snapshots = self.get_cached_seed_snapshots(cache_key)
+        if not snapshots:
+            return None
+        ec2conn = self.get_seed_connection('ec2')
+        if not _snapshots_usable(ec2conn, snapshots.values()):
+            logger.info("Cached seed snapshots unusable: %s", snapshots)
+            return None
+
+        logger.info("Re-using recent seed snapshots: %s", snapshots)
+        return snapshots
+
+    def get_seed_snapshot_key(self):
+        """
+        Identifies the seed volumes this node is created from. Nodes with the
+        same key can share the same seed snapshots.
+        """
+        return (
+            self.seed_deployment.deployment_name,
+            self.seed_node_name,
+            tuple(sorted(
+                (volume_name, volume_conf['device'])
+                for volume_name, volume_conf in self.ebs_confs['vols'].items()
+            )),
+        )
+
+    def set_seed_ebs_snapshots(self, seed_ebs_snapshots):
+        """
+        Use the given, already-taken, seed snapshots instead of taking them
+        when the node is created.
+        """
+        self.seed_ebs_snapshots = seed_ebs_snapshots
+
     def _install_ec2_consistent_snapshot(self):
         """
         Install the ec2-consistent-snapshot utility to handle xfs freezing and
@@ -363,52 +476,67 @@ class Ec2NodeDeployment(BaseNodeDeployment):
                 sudo('apt-get update')
                 sudo('apt-get install ec2-consistent-snapshot -y')
 
-    def _get_ebs_snapshot(self, volume_name, volume_conf):
+    def _get_ebs_snapshots(self, vol_confs):
         """
-        Take a snapshot on the current host of the EBS volume corresponding to
-        ``volume_name`` and return the snapshot id.
+        Take a snapshot on the current host of each of the EBS volumes in
+        ``vol_confs`` using one ``ec2-consistent-snapshot`` run, so every
+        filesystem is only frozen once.
+
+        Returns a dictionary of volume names and their snapshot ids.
         """
         self._install_ec2_consistent_snapshot()
 
         # Need to take a snapshot for use
         logger.info(u"Snapshotting EBS vols from %s", env.host_string)
 
-        if volume_conf['filesystem'] != 'xfs':
-            raise NotImplementedError("Only XFS EBS vols are supported")
-
-        # Find the volume id of the appropriate seed EBS volume
-        device = volume_conf['device']
-        seed_volume = _get_attached_volume(
-            self.seed_deployment.ec2conn,
-            self.seed_node.boto_instance.id,
-            device)
+        for volume_conf in vol_confs.values():
+            if volume_conf['filesystem'] != 'xfs':
+                raise NotImplementedError("Only XFS EBS vols are supported")
 
-        if seed_volume is None:
-            # No seed volume with matching device found
-            logger.critical("No seed volume on device %s found", device)
-            exit(1)
+        # Find the volume ids of the appropriate seed EBS volumes
+        seed_vols_by_device = dict(
+            (vol.attach_data.device, vol)
+            for vol in _get_attached_volumes(
+                self.get_seed_connection('ec2'),
+                self.seed_node.boto_instance.id,
+            )
+        )
+        volume_names = sorted(vol_confs)
+        seed_volume_ids = []
+        for volume_name in volume_names:
+            device = vol_confs[volume_name]['device']
+            seed_volume = seed_vols_by_device.get(device)
+            if seed_volume is None:
+                # No seed volume with matching device found
+                logger.critical("No seed volume on device %s found", device)
+                exit(1)
+            seed_volume_ids.append(seed_volume.id)
 
-        # Build the ec2-consistent-snapshot command to take the snapshot for
-        # the appropriate volume
-        mount_point = volume_conf['mount_point']
+        # Build the ec2-consistent-snapshot command to take the snapshots for
+        # the appropriate volumes
         cmd_tpl = (
             'ec2-consistent-snapshot '
-            '--freeze-filesystem %(mount_point)s '
+            '%(freeze_filesystems)s '
             '--description '
-            '"seed from %(seed_deploy)s-%(seed_node)s to %(deploy)s-%(node)s" '
+            '"seed from %(seed_deploy)s-%(seed_node)s to %(deploy)s" '
             '--aws-access-key-id %(aws_access_key_id)s '
             '--aws-secret-access-key %(aws_secret_access_key)s '
-            '%(volume_id)s '
+            '%(volume_ids)s '
         )
         context = {
-            'mount_point': mount_point,
+            'freeze_filesystems': ' '.join(
+                '--freeze-filesystem %s' % mount_point
+                for mount_point in sorted(set(
+                    vol_confs[volume_name]['mount_point']
+                    for volume_name in volume_names
+                ))
+            ),
             'seed_deploy': self.seed_deployment.deployment_name,
             'seed_node': self.seed_node_name,
             'deploy': self.deployment.deployment_name,
-            'node': self.node_name,
             'aws_access_key_id': env.aws_access_key_id,
             'aws_secret_access_key': env.aws_secret_access_key,
-            'volume_id': seed_volume.id,
+            'volume_ids': ' '.join(seed_volume_ids),
         }
         cmd = cmd_tpl % context
 
@@ -419,10 +547,14 @@ class Ec2NodeDeployment(BaseNodeDeployment):
                 logger.critical("Output: %s", snapshot_result)
                 exit(1)
 
-        # eg. snap-aaaabbbb
-        assert len(str(snapshot_result)) == 13
+        # One snapshot id per volume, in order. eg. snap-aaaabbbb
+        snapshot_ids = SNAPSHOT_ID_RE.findall(str(snapshot_result))
+        if len(snapshot_ids) != len(volume_names):
+            logger.critical("Expected %s snapshots", len(volume_names))
+            logger.critical("Output: %s", snapshot_result)
+            exit(1)
 
-        return str(snapshot_result)
+        return dict(zip(volume_names, snapshot_ids))
 
     def _get_masterdb(self):
         """
@@ -443,7 +575,7 @@ class Ec2NodeDeployment(BaseNodeDeployment):
         with hide(*fab_quiet):
             logger.info("Attaching EBS volumes from snapshots")
             attached_volumes = create_and_attach_ebs_vols(
-                ec2conn=self.deployment.ec2conn,
+                ec2conn=self.get_connection('ec2'),
                 availability_zone=env.aws_availability_zone,
                 instance_id=ec2_instance_id,
                 vol_confs=vol_confs,
@@ -735,35 +867,227 @@ class Ec2NodeDeployment(BaseNodeDeployment):
         sudo('rm /etc/cron.d/%s' % fname)
         sudo('echo "%s" > /etc/cron.d/%s' % (cron, fname))
 
+    def get_launch_spec(self):
+        """
+        Get the `LaunchSpec` describing the instance this node runs on. Nodes
+        with the same spec can be launched together.
+        """
+        require('ami_id')
+        require('aws_availability_zone')
+        require('ec2_instance_type')
+
+        return LaunchSpec(
+            aws_settings=self.deployment.get_aws_settings(
+                self.aws_type,
+                self.node_name,
+            ),
+            image_id=env.ami_id,
+            key_name=self._conf['aws']['keypair'],
+            placement=env.aws_availability_zone,
+            instance_type=env.ec2_instance_type,
+            security_groups=tuple(env.aws_security_groups),
+        )
+
+    def set_launched_instance(self, instance):
+        """
+        Use the already-launched boto ``instance`` (see `launch_instances`)
+        the next time a new node is needed, instead of launching one.
+        """
+        self._launched_instance = instance
+
     def launch(self):
         """
-        Launch a new EC2 instance
+        Launch a new EC2 instance, unless one was already launched for this
+        node along with others.
 
         Returns the boto ec2 instance.
         """
         require('aws_access_key_id')
         require('aws_secret_access_key')
-        require('ami_id')
-        require('aws_availability_zone')
         require('config_bucket')
-        require('ec2_instance_type')
 
-        ec2conn = self.deployment.ec2conn
+        if self._launched_instance is not None:
+            instance = self._launched_instance
+            self._launched_instance = None
+            logger.info("Using already-launched instance: %s", instance.id)
+            return instance
 
-        # Start a new ec2 instance and get its instance id
-        reservation = ec2conn.run_instances(
-            env.ami_id,
-            key_name=self.config['aws']['keypair'],
-            placement=env.aws_availability_zone,
-            instance_type=env.ec2_instance_type,
-            security_groups=env.aws_security_groups,
+        instance = _run_instances(
+            self.get_connection('ec2'),
+            self.get_launch_spec(),
+            1,
+        )[0]
+
+        logger.info("Instance launching with id: %s", instance.id)
+
+        return instance
+
+
+def _run_instances(ec2conn, launch_spec, count):
+    # Start the new ec2 instances. With min_count, we either get all of them
+    # or none.
+    reservation = ec2conn.run_instances(
+        launch_spec.image_id,
+        min_count=count,
+        max_count=count,
+        key_name=launch_spec.key_name,
+        placement=launch_spec.placement,
+        instance_type=launch_spec.instance_type,
+        security_groups=list(launch_spec.security_groups),
+    )
+
+    return reservation.instances
+
+
+def launch_instances(deployers):
+    """
+    Launch the instances for every one of ``deployers`` that needs a new node,
+    with one ``run_instances`` request per `LaunchSpec`, and hand each
+    deployer its instance. Waits for all of the instances to be running,
+    checking on them together.
+
+    Returns the launched instances.
+    """
+    deployers_by_spec = defaultdict(list)
+    for deployer in deployers:
+        if deployer.get_node() is None:
+            deployers_by_spec[deployer.get_launch_spec()].append(deployer)
+
+    launched = []
+    for launch_spec, spec_deployers in deployers_by_spec.items():
+        ec2conn = spec_deployers[0].get_connection('ec2')
+        instances = _run_instances(ec2conn, launch_spec, len(spec_deployers))
+        logger.info(
+            "Launched %s %s instance(s) of %s: %s",
+            len(instances),
+            launch_spec.instance_type,
+            launch_spec.image_id,
+            ', '.join(instance.id for instance in instances),
         )
+        for deployer, instance in zip(spec_deployers, instances):
+            deployer.set_launched_instance(instance)
+        launched.append((ec2conn, instances))
 
-        instance = reservation.instances[0]
+    for ec2conn, instances in launched:
+        _wait_for_instances_running(ec2conn, instances)
 
-        logging.info("Instance launching with id: %s", instance.id)
+    return [
+        instance
+        for ec2conn, instances in launched
+        for instance in instances
+    ]
 
-        return instance
+
+def _wait_for_instances_running(ec2conn, instances):
+    def poll_instances(pending_instances):
+        reservations = ec2conn.get_all_instances(
+            filters={
+                'instance-id': [instance.id for instance in pending_instances],
+            },
+        )
+        return [
+            instance
+            for reservation in reservations
+            for instance in reservation.instances
+        ]
+
+    wait_for_all(
+        instances,
+        poll=poll_instances,
+        is_ready=lambda instance: instance.state == 'running',
+        description="%s instance(s) to be running" % len(instances),
+        backoff=Backoff(initial_delay=5, max_delay=LAUNCH_REFRESH),
+    )
+
+
+def take_seed_snapshots(deployers):
+    """
+    Take the seed EBS snapshots for every one of ``deployers`` that needs a
+    new node. Nodes created from the same seed volumes share one set of
+    snapshots, taken with a single ``ec2-consistent-snapshot`` run on that
+    seed node. Waits for all of the snapshots to complete, checking on them
+    together.
+    """
+    deployers_by_key = defaultdict(list)
+    for deployer in deployers:
+        if not deployer.seed_deployment:
+            continue
+        if deployer.get_node() is not None:
+            continue
+        deployers_by_key[deployer.get_seed_snapshot_key()].append(deployer)
+
+    snapshot_ids_by_conn = defaultdict(list)
+    for key, key_deployers in sorted(deployers_by_key.items()):
+        seed_ebs_snapshots = key_deployers[0]._get_seed_ebs_snapshots()
+        logger.info(
+            "Seed snapshots from %s-%s for %s node(s): %s",
+            key[0],
+            key[1],
+            len(key_deployers),
+            seed_ebs_snapshots,
+        )
+        for deployer in key_deployers:
+            deployer.set_seed_ebs_snapshots(seed_ebs_snapshots)
+        ec2conn = key_deployers[0].get_seed_connection('ec2')
+        snapshot_ids_by_conn[ec2conn].extend(seed_ebs_snapshots.values())
+
+    for ec2conn, snapshot_ids in snapshot_ids_by_conn.items():
+        wait_for_snapshots(ec2conn, snapshot_ids)
+
+
+def wait_for_snapshots(ec2conn, snapshot_ids):
+    """
+    Wait until all of the given EBS snapshots are complete, describing all
+    of the pending ones with a single request each time.
+    """
+    snapshot_ids = sorted(set(snapshot_ids))
+    if not snapshot_ids:
+        return []
+
+    def poll_snapshots(pending_snapshots):
+        return ec2conn.get_all_snapshots(
+            snapshot_ids=[snapshot.id for snapshot in pending_snapshots],
+        )
+
+    def snapshot_complete(snapshot):
+        # Snapshots that weren't described yet have no progress
+        progress = getattr(snapshot, 'progress', None)
+        if progress != '100%':
+            logger.info(
+                "snapshot: [%s] only %s percent complete",
+                snapshot.id,
+                progress)
+            return False
+        return True
+
+    return wait_for_all(
+        [PendingSnapshot(snapshot_id) for snapshot_id in snapshot_ids],
+        poll=poll_snapshots,
+        is_ready=snapshot_complete,
+        description="%s snapshot(s) to complete" % len(snapshot_ids),
+    )
+
+
+def _snapshots_usable(ec2conn, snapshot_ids):
+    """
+    Do all of the given EBS snapshots still exist without having failed?
+    """
+    snapshot_ids = sorted(set(snapshot_ids))
+    try:
+        snapshots = ec2conn.get_all_snapshots(snapshot_ids=snapshot_ids)
+    except EC2ResponseError, e:
+        if e.error_code != 'InvalidSnapshot.NotFound':
+            raise
+        return False
+
+    if len(snapshots) != len(snapshot_ids):
+        return False
+    return all(snapshot.status != 'error' for snapshot in snapshots)
+
+
+def _has_provider_role(conf):
+    roles = conf.get('roles', [])
+    return any(role in roles for role in PROVIDER_ROLES)
 
 
 def _get_public_ip():
@@ -779,37 +1103,53 @@ def _delete_volumes(ec2conn, vols):
         except:
             pass
 
-    logger.info(u"Sleeping for 5 to finish attachment")
-    time.sleep(5)
-    vols = ec2conn.get_all_volumes(volume_ids=[v.id for v in vols])
+    def poll_volumes(pending_vols):
+        return ec2conn.get_all_volumes(volume_ids=[v.id for v in pending_vols])
 
-    retry_limit = 20
-    for vol in vols:
-        retry_count = 0
-        while not vol.status == 'available':
-            if retry_count > retry_limit:
-                logger.info(u"Retry limit reach. Detaching with --force")
-                ec2conn.detach_volume(vol.id, force=True)
-                retry_count = 0
+    def is_detached(vol):
+        return vol.status == 'available'
+
+    try:
+        vols = wait_for_all(
+            vols,
+            poll=poll_volumes,
+            is_ready=is_detached,
+            description="volumes to detach",
+            timeout=DETACH_TIMEOUT,
+        )
+    except WaitTimedOut, e:
+        for vol in e.pending:
             logger.info(
-                u"vol: [%s] still pending. Trying again in 5 seconds",
+                u"vol: [%s] not detached. Detaching with --force",
                 vol.id)
-            time.sleep(5)
-            updated_vols = ec2conn.get_all_volumes(volume_ids=[vol.id])
-            vol = updated_vols[0]
-            retry_count += 1
-
+            ec2conn.detach_volume(vol.id, force=True)
+        vols = wait_for_all(
+            vols,
+            poll=poll_volumes,
+            is_ready=is_detached,
+            description="volumes to force-detach",
+        )
+    for vol in vols:
         logger.info(u"vol: [%s] succesfully detached" % vol.id)
 
     logger.info(u"Deleting the volumes")
-    for vol in vols:
-        try:
-            vol.delete()
-        except:
-            # Give it one chance to wait 10 seconds and try again
-            logger.info("Deletion failed for [%s]. Waiting 10s" % vol.id)
-            time.sleep(10)
-            vol.delete()
+
+    def delete_volume(vol):
+        def try_delete():
+            try:
+                vol.delete()
+                return True
+            except Exception, e:
+                logger.info("Deletion failed for [%s]: %s", vol.id, e)
+                return False
+
+        wait_until(
+            try_delete,
+            "vol %s to be deleted" % vol.id,
+            timeout=DELETE_TIMEOUT,
+        )
+
+    map_concurrently(delete_volume, vols)
 
 
 def create_and_attach_ebs_vols(
@@ -827,129 +1167,161 @@ def create_and_attach_ebs_vols(
     ``seed_ebs_snapshots`` is the ``Ec2NodeDeployments.seed_ebs_snapshots``
     dictionary with volume labels and their starting snapshot.
 
+    All of the volumes are created at once, waited on together and then
+    attached at once.
+
     Returns a dictionary of {<vol_label>: <boto_ebs_volume>} pairs.
 
     The function **does not** wait until attachment is 100% complete.
     """
-    attached_ebs_vols = {}
-
-    for vol_label, vol_conf in vol_confs.items():
-        # First make sure we hadn't already attached this volume previously
+    # First make sure we hadn't already attached any of these volumes
+    # previously
+    attached_by_device = dict(
+        (vol.attach_data.device, vol)
+        for vol in _get_attached_volumes(ec2conn, instance_id)
+    )
+    vol_labels = []
+    for vol_label, vol_conf in sorted(vol_confs.items()):
         device = vol_conf['device']
-        attached_volume = _get_attached_volume(ec2conn, instance_id, device)
+        attached_volume = attached_by_device.get(device)
         if attached_volume:
             logger.warning(
-                "Volume %s with id already mounted on %s. Skipping",
+                "Volume %s with id %s already mounted on %s. Skipping",
                 vol_label,
                 attached_volume.id,
                 device,
             )
             continue
+        vol_labels.append(vol_label)
 
-        # Get the seed snapshot
-        seed_snapshot_id = seed_ebs_snapshots.get(vol_label)
-        seed_snapshot = None
-        if seed_snapshot_id:
-            seed_snapshot = ec2.snapshot.Snapshot(ec2conn)
-            seed_snapshot.id = seed_snapshot_id
+    if not vol_labels:
+        return {}
 
-        if seed_snapshot:
-            # Ensure the seed snapshot is 'completed' before trying to create
-            # a new EBS volume
-            logger.info(
-                u"Ensuring that the %s snapshot is complete", vol_label)
+    # Ensure the seed snapshots are 'completed' before trying to create new
+    # EBS volumes from them
+    seed_snapshot_ids = [
+        seed_ebs_snapshots[vol_label]
+        for vol_label in vol_labels
+        if seed_ebs_snapshots.get(vol_label)
+    ]
+    if seed_snapshot_ids:
+        logger.info(u"Ensuring that the seed snapshots are complete")
+        wait_for_snapshots(ec2conn, seed_snapshot_ids)
 
-            seed_snapshot.update()
-            while seed_snapshot.progress != '100%':
-                logger.info(
-                    "snapshot: [%s] only %s percent complete. Waiting 5s",
-                    seed_snapshot.id,
-                    seed_snapshot.progress)
-                time.sleep(5)
-                seed_snapshot.update()
-
-        # Create and attach the EBS volume based on the snapshot (if any)
-        logger.info(u"Creating and attaching the %s EBS volume", vol_label)
-        ebs_vol = create_and_attach_ebs_vol(
+    # Create the EBS volumes based on their snapshots (if any)
+    start_times = {}
+
+    def create_volume(vol_label):
+        start_times[vol_label] = time.time()
+        return _create_volume(
             ec2conn,
             availability_zone,
-            instance_id,
-            seed_snapshot_id,
-            vol_conf['size'],
-            vol_conf['device'],
+            seed_ebs_snapshots.get(vol_label),
+            vol_confs[vol_label]['size'],
+            vol_confs[vol_label]['device'],
         )
 
-        attached_ebs_vols[vol_label] = ebs_vol
+    logger.info(u"Creating the %s EBS volumes", ', '.join(vol_labels))
+    vols = map_concurrently(create_volume, vol_labels)
 
-    return attached_ebs_vols
+    # Wait until all of the volumes are available, checking on them together
+    def poll_volumes(pending_vols):
+        return ec2conn.get_all_volumes(volume_ids=[v.id for v in pending_vols])
 
+    vols = wait_for_all(
+        vols,
+        poll=poll_volumes,
+        is_ready=lambda vol: vol.status == 'available',
+        description="%s volume(s) to become available" % len(vols),
+        backoff=Backoff(max_delay=LAUNCH_REFRESH),
+    )
 
-def create_and_attach_ebs_vol(
-    ec2conn, availability_zone, instance_id, seed_snapshot_id, size, device,
-):
+    # The volumes can only be attached once the instance is running
+    # First Instance in the first Reservation
+    instance = ec2conn.get_all_instances(
+        instance_ids=[instance_id])[0].instances[0]
+
+    def instance_running():
+        instance.update()
+        return instance.state == 'running'
+
+    if instance.state != 'running':
+        wait_until(
+            instance_running,
+            "ec2 instance %s to be running for EBS attachment" % instance_id,
+            backoff=Backoff(max_delay=LAUNCH_REFRESH),
+        )
+
+    def attach_volume(labelled_vol):
+        vol_label, vol = labelled_vol
+        device = vol_confs[vol_label]['device']
+        _attach_volume(ec2conn, instance_id, vol, device)
+        time_logger.info(
+            "%.1fs- creating and attaching the %s volume %s",
+            time.time() - start_times[vol_label],
+            vol_label,
+            vol.id,
+        )
+
+    map_concurrently(attach_volume, zip(vol_labels, vols))
+
+    return dict(zip(vol_labels, vols))
+
+
+def _create_volume(ec2conn, availability_zone, seed_snapshot_id, size, device):
     """
-    Create and attach a volume to an instance, while tolerating some common ec2
-    errors.
+    Create a volume, using the seed snapshot if given, while tolerating some
+    common ec2 errors.
 
-    Doesn't wait for the attachment to complete.
+    Doesn't wait for the volume to become available.
 
     Returns the boto ebs volume object.
     """
-    # Make a volume using the seed snapshot if given
-    vol = None
-    while not vol:
+    def create_volume():
         try:
             if seed_snapshot_id:
                 logger.info(
                     u"Creating an EBS volume from snapshot [%s]",
                     seed_snapshot_id
                 )
-                vol = ec2conn.create_volume(
+                return ec2conn.create_volume(
                     size,
                     availability_zone,
                     snapshot=seed_snapshot_id)
             else:
                 logger.info(u"Creating a new blank EBS volume")
-                vol = ec2conn.create_volume(
+                return ec2conn.create_volume(
                     size,
                     availability_zone)
         except:
-            logging.info(
+            logger.info(
                 "Error trying to create the volume for device [%s]",
                 device)
-            logging.info("Sleeping for [%s] and trying again", LAUNCH_REFRESH)
-            time.sleep(LAUNCH_REFRESH)
+            return None
 
-    # Attach the volume, waiting until the volume is available first
-    while not vol.status == 'available':
-        logger.info(
-            "vol [%s] still pending. Trying again in %ss",
-            vol.id,
-            LAUNCH_REFRESH)
-        time.sleep(LAUNCH_REFRESH)
-        vols = ec2conn.get_all_volumes(volume_ids=[vol.id])
-        vol = vols[0]
+    return wait_until(
+        create_volume,
+        "volume for device %s to be created" % device,
+        backoff=Backoff(max_delay=LAUNCH_REFRESH),
+    )
 
-    # First Instance in the first Reservation
-    instance = ec2conn.get_all_instances(
-        instance_ids=[instance_id])[0].instances[0]
-    while instance.state != 'running':
-        logger.info(
-            "Waiting until ec2 instance %s is running for EBS attachment",
-            instance_id)
-        time.sleep(LAUNCH_REFRESH)
-        instance.update()
 
+def _attach_volume(ec2conn, instance_id, vol, device):
+    """
+    Attach an available volume to an instance, retrying on errors.
+
+    Doesn't wait for the attachment to complete.
+    """
     logger.info("Attaching the volume [%s] to [%s]", vol.id, device)
-    attached = False
-    while not attached:
+
+    def attach_volume():
         try:
             ec2conn.attach_volume(vol.id, instance_id, device=device)
-            attached = True
             logger.info(
                 "Successfully attached volume [%s] to [%s]",
                 vol.id,
                 device)
+            return True
         except Exception, e:
             logger.warning(e)
             logger.warning(
@@ -957,10 +1329,13 @@ def create_and_attach_ebs_vol(
                 vol.id,
                 instance_id,
                 device)
-            logger.info("Waiting %ss and retrying", LAUNCH_REFRESH)
-            time.sleep(LAUNCH_REFRESH)
+            return False
 
-    return vol
+    wait_until(
+        attach_volume,
+        "vol %s to attach to %s" % (vol.id, device),
+        backoff=Backoff(max_delay=LAUNCH_REFRESH),
+    )
 
 
 def _get_attached_volumes(ec2conn, ec2_instance_id):
@@ -12,11 +12,19 @@ import dateutil.parser
 from boto import rds
 from boto.exception import BotoServerError
 from dateutil.tz import tzlocal
-from fabric.api import prompt
 
 from neckbeard.cloud_provisioners import BaseNodeDeployment
-
-LAUNCH_REFRESH = 15  # Seconds to wait before refreshing RDS checks
+from neckbeard.cloud_provisioners.aws.rds_parameters import (
+    default_cache,
+    diff_parameters,
+    modify_parameters,
+)
+from neckbeard.host_scope import prompt
+from neckbeard.waiters import Backoff, wait_until
+
+LAUNCH_REFRESH = 15  # Most seconds to wait before refreshing RDS checks
+# Seconds to wait for a seed snapshot to finish before giving up on the launch
+SEED_SNAPSHOT_TIMEOUT = 3 * 60 * 60  # 3 hours
 
 logger = logging.getLogger('aws:rds')
 
@@ -34,6 +42,8 @@ class RdsNodeDeployment(BaseNodeDeployment):
     """
     Deployment controller for an RDS database node.
     """
+    # Where the parameter groups' current parameters are cached between deploys
+    parameter_group_cache = default_cache
 
     def __init__(self, *args, **kwargs):
         super(RdsNodeDeployment, self).__init__(*args, **kwargs)
@@ -116,6 +126,16 @@ class RdsNodeDeployment(BaseNodeDeployment):
             exit(1)
 
     def _create_snapshot(self):
+        cache_key = 'rds:%s:%s' % (
+            self.seed_deployment.deployment_name,
+            self.seed_node_name,
+        )
+        snapshots = self.get_cached_seed_snapshots(cache_key)
+        if snapshots and self._snapshot_usable(snapshots['db']):
+            logger.info("Re-using recent seed snapshot: %s", snapshots['db'])
+            self.seed_snapshot_id = snapshots['db']
+            return
+
         instance = self.seed_node.boto_instance
         now = datetime.now()
         nowstr = now.strftime('%Y%m%d-%H%M%S')
@@ -126,6 +146,33 @@ class RdsNodeDeployment(BaseNodeDeployment):
         )
         restoration_snapshot = instance.snapshot(label)
         self.seed_snapshot_id = restoration_snapshot.id
+        self.cache_seed_snapshots(cache_key, {'db': self.seed_snapshot_id})
+
+    def _snapshot_usable(self, snapshot_id):
+        """
+        Does the given DB snapshot still exist without having failed?
+        """
+        rdsconn = self.get_connection('rds')
+        try:
+            snapshot = rdsconn.get_all_dbsnapshots(snapshot_id=snapshot_id)[0]
+        except BotoServerError, e:
+            if e.error_code != 'DBSnapshotNotFound':
+                raise
+            logger.info("Cached seed snapshot is gone: %s", snapshot_id)
+            return False
+
+        return snapshot.status in ('available', 'creating')
+
+    def _get_available_snapshot(self, snapshot_id):
+        """
+        The given DB snapshot if it has finished, otherwise None.
+        """
+        rdsconn = self.get_connection('rds')
+        snapshot = rdsconn.get_all_dbsnapshots(snapshot_id=snapshot_id)[0]
+        if snapshot.status != 'available':
+            logger.info("RDS Snapshot pending. Status: %s", snapshot.status)
+            return None
+        return snapshot
 
     def _get_restorable_lag(self):
         """
@@ -177,6 +224,7 @@ class RdsNodeDeployment(BaseNodeDeployment):
         conf = self.deployment.deployment_confs['rds'][self.node_name]['conf']
 
         rds_label = str(rds_label)
+        rdsconn = self.get_connection('rds')
 
         if self.seed_snapshot_id:
             logger.info(
@@ -186,17 +234,13 @@ class RdsNodeDeployment(BaseNodeDeployment):
             )
 
             # Wait for the snapshot to complete
-            snapshot = self.deployment.rdsconn.get_all_dbsnapshots(
-                snapshot_id=self.seed_snapshot_id)[0]
-            while snapshot.status != 'available':
-                logger.info(
-                    "RDS Snapshot pending. Waiting %ss",
-                    LAUNCH_REFRESH)
-                time.sleep(LAUNCH_REFRESH)
-                snapshot = self.deployment.rdsconn.get_all_dbsnapshots(
-                    snapshot_id=self.seed_snapshot_id)[0]
+            snapshot = wait_until(
+                lambda: self._get_available_snapshot(self.seed_snapshot_id),
+                "RDS snapshot %s to be available" % self.seed_snapshot_id,
+                timeout=SEED_SNAPSHOT_TIMEOUT,
+                backoff=Backoff(initial_delay=5, max_delay=LAUNCH_REFRESH),
+            )
 
-            rdsconn = self.deployment.rdsconn
             db_instance = rdsconn.restore_dbinstance_from_dbsnapshot(
                 identifier=snapshot.id,
                 instance_id=rds_label,
@@ -211,7 +255,6 @@ class RdsNodeDeployment(BaseNodeDeployment):
                     seed_instance.id)
 
                 # Create using rdsconn.restore_db_instance_from_dbsnapshot
-                rdsconn = self.deployment.rdsconn
                 db_instance = rdsconn.restore_dbinstance_from_point_in_time(
                     source_instance_id=seed_instance.id,
                     target_instance_id=rds_label,
@@ -223,7 +266,7 @@ class RdsNodeDeployment(BaseNodeDeployment):
             else:
                 # Creating a new, blank, DB
                 logger.info("Creating new blank RDS instance: %s" % rds_label)
-                db_instance = self.deployment.rdsconn.create_dbinstance(
+                db_instance = rdsconn.create_dbinstance(
                     id=rds_label,
                     allocated_storage=conf['rds_allocated_storage'],
                     instance_class=conf['rds_instance_class'],
@@ -249,7 +292,7 @@ class RdsNodeDeployment(BaseNodeDeployment):
 
         logger.info("Modifying RDS DB parameters")
         # Need to modify the db to make sure all of the properties are set
-        self.deployment.rdsconn.modify_dbinstance(
+        self.get_connection('rds').modify_dbinstance(
             id=node.boto_instance.id,
             allocated_storage=conf['rds_allocated_storage'],
             instance_class=conf['rds_instance_class'],
@@ -377,69 +420,21 @@ class RdsNodeDeployment(BaseNodeDeployment):
         return False
 
     def wait_until_created(self, node):
-        start_time = time.time()
-        waited = False
-        while not self.creation_complete(node):
-            waited = True
-            logger.info(
-                "RDS DB still pending. Status: %s",
-                node.boto_instance.status,
-            )
-            time.sleep(LAUNCH_REFRESH)
-        if waited:
-            logger.info("Waited %.1fs for DB", time.time() - start_time)
+        wait_until(
+            lambda: self.creation_complete(node),
+            "RDS DB %s to be created" % node.aws_id,
+            backoff=Backoff(initial_delay=5, max_delay=LAUNCH_REFRESH),
+        )
 
     def creation_complete(self, node):
         node.refresh_boto_instance()
-        return node.boto_instance.status == 'available'
-
-    def _get_all_db_parameters(self, group_name):
-        """
-        Create the named parameter group (if needed)
-        and return a list of all the db parameters, accounting for request
-        pagination.
-        """
-        rdsconn = self.deployment.rdsconn
-        all_parameters = []
-        try:
-            all_parameters = rdsconn.get_all_dbparameters(
-                groupname=group_name,
-                max_records=100,
-            )
-        except BotoServerError:
+        if node.boto_instance.status != 'available':
             logger.info(
-                "RDS Parameter Group %s doesn't exist. Creating it.",
-                group_name,
-            )
-            # TODO: Detect the message `Invalid parameter group name:` Message
-            # to ensure that this isn't some other kind of error
-            rdsconn.create_parameter_group(name=group_name)
-            all_parameters = rdsconn.get_all_dbparameters(
-                groupname=group_name,
-                max_records=100,
-            )
-
-        def _get_pagination_marker(parameter_group):
-            # Determine if we got paginated results
-            pagination_marker = None
-            if hasattr(parameter_group, 'Marker'):
-                pagination_marker = parameter_group.Marker
-
-            return pagination_marker
-
-        pagination_marker = _get_pagination_marker(all_parameters)
-
-        while pagination_marker:
-            additional_parameters = rdsconn.get_all_dbparameters(
-                groupname=group_name,
-                max_records=100,
-                marker=pagination_marker,
+                "RDS DB still pending. Status: %s",
+                node.boto_instance.status,
             )
-            all_parameters.update(additional_parameters)
-
-            pagination_marker = _get_pagination_marker(additional_parameters)
-
-        return all_parameters
+            return False
+        return True
 
     def _validate_desired_parameter_group_configuration(
         self,
@@ -477,49 +472,24 @@ class RdsNodeDeployment(BaseNodeDeployment):
             group_name=group_name,
             confs=confs,
         )
-        current_parameters = self._get_all_db_parameters(group_name)
-
-        parameters_to_modify = []
-        for parameter_name, desired_value in confs.items():
-            try:
-                current_parameter = current_parameters[parameter_name]
-            except KeyError:
-                logger.warning(
-                    "RDS Parameter '%s' does not currently exist",
-                    parameter_name,
-                )
-                current_parameter = rds.parametergroup.Parameter(
-                    group=current_parameters,
-                    name=parameter_name,
-                )
-                # Set the expected data type for validation
-                # The default is string
-                if isinstance(desired_value, int):
-                    current_parameter.type = 'integer'
-                elif isinstance(desired_value, bool):
-                    current_parameter.type = 'boolean'
-                elif isinstance(desired_value, str):
-                    current_parameter.type = 'string'
-
-            if current_parameter.type == str:
-                # Work-around for a boto 1.9 Parameter.type initialization bug
-                # Remove this when we drop support for boto 1.9
-                current_parameter.type = 'string'
-            if current_parameter.value != desired_value:
-                logger.info(
-                    "RDS Parameter Group %s requires change for %s",
-                    group_name,
-                    parameter_name,
-                )
-                logger.info("Current value: %s", current_parameter.value)
-                logger.info("Desired value: %s", desired_value)
-                current_parameter.value = desired_value
-                current_parameter.apply_method = 'immediate'
-                parameters_to_modify.append(current_parameter)
+        rdsconn = self.get_connection('rds')
+        current_parameters = self.parameter_group_cache.get_parameters(
+            rdsconn,
+            group_name,
+        )
 
+        parameters_to_modify = diff_parameters(
+            group_name,
+            current_parameters,
+            confs,
+        )
         if parameters_to_modify:
             logger.info("Modifying RDS Parameter Group: %s", group_name)
-            self.deployment.rdsconn.modify_parameter_group(
-                name=group_name,
-                parameters=parameters_to_modify,
+            modify_parameters(rdsconn, group_name, parameters_to_modify)
+            self.parameter_group_cache.record_modified(
+                group_name,
+                dict(
+                    (parameter.name, parameter.value)
+                    for parameter in parameters_to_modify
+                ),
             )
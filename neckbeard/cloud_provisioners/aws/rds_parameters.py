@@ -0,0 +1,253 @@
+"""
+Keeping RDS parameter groups in line with their configured parameters.
+
+A parameter group holds hundreds of parameters, nearly all of them engine
+defaults, and RDS only describes them 100 at a time. RDS doesn't tell us when
+a group last changed, so the parameters that have been set by hand (its
+``user`` parameters, usually a single page) stand in for a modification
+marker: the full listing is cached locally along with that marker and only
+fetched again once the marker changes.
+"""
+import hashlib
+import json
+import logging
+import os.path
+import threading
+
+from boto import rds
+from boto.exception import BotoServerError
+
+logger = logging.getLogger('aws:rds')
+
+DEFAULT_CACHE_PATH = '~/.neckbeard/cache/rds_parameter_groups.json'
+# RDS won't describe more than this many parameters per request
+PARAMETER_PAGE_SIZE = 100
+# Nor modify more than this many in a single request
+MAX_MODIFIED_PARAMETERS = 20
+
+
+def _get_parameter_state(parameter):
+    parameter_type = parameter.type
+    if parameter_type == str:
+        # Work-around for a boto 1.9 Parameter.type initialization bug
+        # Remove this when we drop support for boto 1.9
+        parameter_type = 'string'
+    return {
+        'value': parameter.value,
+        'type': parameter_type,
+        'source': parameter.source,
+        'apply_type': getattr(parameter, 'apply_type', None),
+        'allowed_values': parameter.allowed_values,
+    }
+
+
+def get_modification_marker(parameter_values):
+    """
+    Fingerprint a dictionary of the user-set parameter names and values.
+    """
+    return hashlib.sha1(
+        json.dumps(sorted(parameter_values.items())),
+    ).hexdigest()
+
+
+def fetch_parameters(rdsconn, group_name, source=None):
+    """
+    Get the state of every parameter in the group (or just those from
+    ``source``), following the pagination markers.
+
+    Returns a dictionary of parameter names and their states.
+    """
+    parameters = {}
+    marker = None
+    while True:
+        page = rdsconn.get_all_dbparameters(
+            groupname=group_name,
+            source=source,
+            max_records=PARAMETER_PAGE_SIZE,
+            marker=marker,
+        )
+        for name, parameter in page.items():
+            parameters[name] = _get_parameter_state(parameter)
+
+        marker = getattr(page, 'Marker', None)
+        if not marker:
+            return parameters
+
+
+class ParameterGroupCache(object):
+    """
+    Cache the full parameter listing of each parameter group along with the
+    modification marker it was fetched at.
+
+    ``path`` Optional path to a JSON file used to share the cache between
+    separate runs. If not given, the cache only lives as long as the process.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = None
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as fp:
+                    self._entries = json.load(fp)
+            except (IOError, ValueError), e:
+                logger.warning(
+                    "Ignoring unreadable parameter group cache at %s: %s",
+                    self.path,
+                    e,
+                )
+
+        return self._entries
+
+    def _persist(self):
+        if not self.path:
+            return
+
+        cache_dir = os.path.dirname(self.path)
+        try:
+            if cache_dir and not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            with open(self.path, 'w') as fp:
+                json.dump(self._entries, fp)
+        except (IOError, OSError), e:
+            logger.warning(
+                "Unable to write parameter group cache to %s: %s",
+                self.path,
+                e,
+            )
+
+    def get_parameters(self, rdsconn, group_name):
+        """
+        Get the state of every parameter in the group, only fetching the full
+        listing if the group's user parameters changed since it was cached.
+        The group is created if it doesn't exist.
+        """
+        try:
+            user_parameters = fetch_parameters(rdsconn, group_name, 'user')
+        except BotoServerError, e:
+            if e.error_code != 'DBParameterGroupNotFound':
+                raise
+            logger.info(
+                "RDS Parameter Group %s doesn't exist. Creating it.",
+                group_name,
+            )
+            rdsconn.create_parameter_group(name=group_name)
+            user_parameters = {}
+        marker = get_modification_marker(dict(
+            (name, state['value'])
+            for name, state in user_parameters.items()
+        ))
+
+        with self._lock:
+            entry = self._load().get(group_name)
+            if entry is not None and entry['marker'] == marker:
+                self.hits += 1
+                return entry['parameters']
+
+        self.misses += 1
+        logger.info("Fetching all parameters for %s", group_name)
+        parameters = fetch_parameters(rdsconn, group_name)
+        with self._lock:
+            self._load()[group_name] = {
+                'marker': marker,
+                'parameters': parameters,
+            }
+            self._persist()
+
+        return parameters
+
+    def record_modified(self, group_name, modified_values):
+        """
+        Update the cached group with the parameter values we just set, so
+        that the next run doesn't need to fetch the full listing again.
+        """
+        with self._lock:
+            entry = self._load().get(group_name)
+            if entry is None:
+                return
+
+            parameters = entry['parameters']
+            for name, value in modified_values.items():
+                parameters.setdefault(name, {'type': _get_desired_type(value)})
+                parameters[name]['value'] = value
+                parameters[name]['source'] = 'user'
+            entry['marker'] = get_modification_marker(dict(
+                (name, state['value'])
+                for name, state in parameters.items()
+                if state.get('source') == 'user'
+            ))
+            self._persist()
+
+
+def _get_desired_type(desired_value):
+    # bool is a subclass of int, so check it first
+    if isinstance(desired_value, bool):
+        return 'boolean'
+    elif isinstance(desired_value, (int, long)):
+        return 'integer'
+    return 'string'
+
+
+def diff_parameters(group_name, current_parameters, confs):
+    """
+    Compare the current parameter states with the desired ``confs`` values.
+
+    Returns a list of `boto.rds.parametergroup.Parameter` objects for just the
+    parameters that need to change, set to their desired values.
+    """
+    changed = []
+    for name, desired_value in sorted(confs.items()):
+        state = current_parameters.get(name)
+        if state is None:
+            logger.warning("RDS Parameter '%s' does not currently exist", name)
+            state = {'value': None, 'type': _get_desired_type(desired_value)}
+
+        if state['value'] == desired_value:
+            continue
+        logger.info(
+            "RDS Parameter Group %s requires change for %s",
+            group_name,
+            name,
+        )
+        logger.info("Current value: %s", state['value'])
+        logger.info("Desired value: %s", desired_value)
+
+        parameter = rds.parametergroup.Parameter(name=name)
+        parameter.type = state['type']
+        parameter.allowed_values = state.get('allowed_values')
+        parameter.value = desired_value
+        parameter.apply_type = state.get('apply_type') or 'dynamic'
+        # Static parameters can only take effect after a reboot
+        if parameter.apply_type == 'static':
+            parameter.apply_method = 'pending-reboot'
+        else:
+            parameter.apply_method = 'immediate'
+        changed.append(parameter)
+
+    return changed
+
+
+def modify_parameters(rdsconn, group_name, parameters):
+    """
+    Submit the changed ``parameters``, as few at a time as RDS allows.
+    """
+    for i in range(0, len(parameters), MAX_MODIFIED_PARAMETERS):
+        rdsconn.modify_parameter_group(
+            name=group_name,
+            parameters=parameters[i:i + MAX_MODIFIED_PARAMETERS],
+        )
+
+
+# The cache used unless one is specifically given
+default_cache = ParameterGroupCache(
+    path=os.path.expanduser(DEFAULT_CACHE_PATH),
+)
@@ -97,6 +97,56 @@ class BaseNodeDeployment(object):
         # nodes or nodes that we're provisioning for the first time
         self.initial_deploy_complete = False
 
+    def get_connection(self, service):
+        """
+        Get the ``service`` AWS connection (eg. ``'ec2'``) for the account and
+        region that this node lives in.
+        """
+        return self.deployment.get_connection(
+            service,
+            self.aws_type,
+            self.node_name,
+        )
+
+    def get_seed_connection(self, service):
+        """
+        Get the ``service`` AWS connection for the seed node's account and
+        region.
+        """
+        return self.seed_deployment.get_connection(
+            service,
+            self.aws_type,
+            self.seed_node_name,
+        )
+
+    def get_cached_seed_snapshots(self, seed_key):
+        """
+        Get the snapshot ids that the resource tracker recently recorded for
+        ``seed_key``, or None if there aren't any.
+        """
+        if self.deployment.resource_tracker is None:
+            return None
+        return self.deployment.resource_tracker.get_seed_snapshots(seed_key)
+
+    def cache_seed_snapshots(self, seed_key, snapshots):
+        """
+        Record the just-taken seed ``snapshots`` with the resource tracker, so
+        other deployments seeded from the same node can re-use them.
+        """
+        if self.deployment.resource_tracker is None:
+            return
+        self.deployment.resource_tracker.set_seed_snapshots(
+            seed_key,
+            snapshots,
+        )
+
+    def get_dependencies(self):
+        """
+        Get the ``(aws_type, node_name)`` of every node in this deployment
+        that must be created and deployed before this one.
+        """
+        return []
+
     def ensure_node_created(self):
         """
         Ensure that the node already exists, and if it doesn't, create it.
@@ -1,10 +1,12 @@
 import logging
+import threading
 import time
 
 import boto.exception
 import dateutil.parser
 import requests
 from boto.ec2 import elb
+from requests.adapters import HTTPAdapter
 from requests.exceptions import (
     ConnectionError,
     Timeout,
@@ -12,11 +14,25 @@ from requests.exceptions import (
 )
 from simpledb import models
 
+from neckbeard.concurrency import map_concurrently
 from neckbeard.output import fab_out_opts
+from neckbeard.waiters import Backoff, wait_until
 
 NODE_AWS_TYPES = ['ec2', 'rds', 'elb']
 EC2_RETIRED_STATES = ['shutting-down', 'terminated']
 RDS_RETIRED_STATES = ['deleted']
+HEALTH_CHECK_MAX_WORKERS = 20
+# The most time, in seconds, that we'll spend checking the health of a group
+# of nodes. Nodes whose checks haven't finished by then are unhealthy.
+HEALTH_CHECK_DEADLINE = 60
+# Every node is its own host, so keep pools for plenty of hosts, but we never
+# need many simultaneous connections to any one of them
+HTTP_POOL_HOSTS = 100
+HTTP_POOL_CONNECTIONS_PER_HOST = 2
+# The number of seconds for which cached loadbalancer state is trusted
+LOADBALANCER_CACHE_TTL = 5
+# The longest we'll wait between checks on an elastic IP association
+ELASTIC_IP_WAIT = 5
 
 logger = logging.getLogger('cloud_resource')
 
@@ -37,6 +53,276 @@ OPTIONAL_CONFIGURATION = {
 }
 
 
+def _format_node(node):
+    return '%s:%s[%s]<%s>' % (
+        node.aws_type,
+        node.name,
+        node.aws_id,
+        node.creation_date,
+    )
+
+
+def build_http_session(
+    pool_hosts=HTTP_POOL_HOSTS,
+    pool_connections_per_host=HTTP_POOL_CONNECTIONS_PER_HOST,
+):
+    """
+    Build a `requests.Session` whose keep-alive connections can be shared by
+    all of the health checks for a deployment.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_hosts,
+        pool_maxsize=pool_connections_per_host,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def _log_connection_reuse(session, url):
+    adapter = session.get_adapter(url)
+    pool = adapter.poolmanager.connection_from_url(url)
+    logger.debug(
+        "HTTP pool for %s has opened %s connection(s) for %s request(s)",
+        pool.host,
+        pool.num_connections,
+        pool.num_requests,
+    )
+
+
+def check_node_health(
+    nodes,
+    deadline=HEALTH_CHECK_DEADLINE,
+    max_workers=HEALTH_CHECK_MAX_WORKERS,
+):
+    """
+    Check whether each of the ``nodes`` ``is_healthy``, all at the same time,
+    so that one hung node doesn't hold up the rest.
+
+    Returns a dictionary mapping each node to True if it's healthy. Nodes
+    whose check doesn't finish within ``deadline`` seconds are unhealthy.
+    """
+    timed_out = object()
+    results = map_concurrently(
+        lambda node: node.is_healthy,
+        nodes,
+        max_workers=max_workers,
+        timeout=deadline,
+        default=timed_out,
+    )
+
+    node_health = {}
+    for node, is_healthy in zip(nodes, results):
+        if is_healthy is timed_out:
+            logger.info("Health check timed out for %s", node)
+            is_healthy = False
+        node_health[node] = is_healthy
+
+    return node_health
+
+
+class LoadBalancerCache(object):
+    """
+    Remember the state of a deployment's loadbalancers so that working out
+    whether each of its nodes is operational doesn't cost a couple of ELB
+    requests per node.
+
+    ``elbconn`` The ELB connection to query through.
+    ``names`` The names of the loadbalancers used by the deployment. They're
+    all fetched together with a single request. If ELB doesn't know about some
+    of them, the rest are looked up one at a time and the missing ones are
+    remembered as absent (``None``).
+    ``ttl`` The number of seconds before cached state is fetched again.
+    Registering or deregistering instances through the cache's loadbalancers
+    should be followed by a call to ``invalidate``.
+    """
+    def __init__(
+        self, elbconn, names, ttl=LOADBALANCER_CACHE_TTL, clock=time.time,
+    ):
+        self.elbconn = elbconn
+        self.names = set(names)
+        self.ttl = ttl
+        self._clock = clock
+        # Both keyed by loadbalancer name, with values of
+        # (fetched_at, loadbalancer) and (fetched_at, {instance_id: state})
+        self._loadbalancers = {}
+        self._instance_states = {}
+        self._lock = threading.RLock()
+
+        self.request_count = 0
+
+    def _is_fresh(self, entries, name):
+        if name not in entries:
+            return False
+        fetched_at, _ = entries[name]
+        return self._clock() - fetched_at <= self.ttl
+
+    def get_loadbalancer(self, name):
+        """
+        The named loadbalancer, or None if it doesn't exist.
+        """
+        with self._lock:
+            if not self._is_fresh(self._loadbalancers, name):
+                self._fetch_loadbalancers(name)
+            assert name in self._loadbalancers
+
+            return self._loadbalancers[name][1]
+
+    def _fetch_loadbalancers(self, name):
+        # Refresh everything that's stale while we're at it
+        self.names.add(name)
+        stale_names = [
+            loadbalancer_name
+            for loadbalancer_name in self.names
+            if not self._is_fresh(self._loadbalancers, loadbalancer_name)
+        ]
+        try:
+            loadbalancers = self._get_all_load_balancers(sorted(stale_names))
+        except boto.exception.BotoServerError, e:
+            if e.error_code != 'LoadBalancerNotFound':
+                raise
+            logger.warning(
+                "Not all loadbalancers were found. Looking them up singly",
+            )
+            loadbalancers = []
+            for loadbalancer_name in sorted(stale_names):
+                loadbalancers.extend(
+                    self._get_load_balancer_if_found(loadbalancer_name),
+                )
+
+        fetched_at = self._clock()
+        for loadbalancer_name in stale_names:
+            self._loadbalancers[loadbalancer_name] = (fetched_at, None)
+        for loadbalancer in loadbalancers:
+            self._loadbalancers[loadbalancer.name] = (fetched_at, loadbalancer)
+
+    def _get_all_load_balancers(self, names):
+        try:
+            return self.elbconn.get_all_load_balancers(
+                load_balancer_names=names,
+            )
+        finally:
+            self.request_count += 1
+
+    def _get_load_balancer_if_found(self, name):
+        try:
+            return self._get_all_load_balancers([name])
+        except boto.exception.BotoServerError, e:
+            if e.error_code != 'LoadBalancerNotFound':
+                raise
+            logger.warning("Loadbalancer not found: %s", name)
+            return []
+
+    def get_instance_state(self, name, instance_id):
+        """
+        The ELB health state (eg. `InService`) of the given instance in the
+        named loadbalancer, or None if it's not registered or the
+        loadbalancer doesn't exist.
+        """
+        with self._lock:
+            if not self._is_fresh(self._instance_states, name):
+                loadbalancer = self.get_loadbalancer(name)
+                if loadbalancer is None:
+                    return None
+                instance_states = dict(
+                    (instance_state.instance_id, instance_state.state)
+                    for instance_state in loadbalancer.get_instance_health()
+                )
+                self.request_count += 1
+                self._instance_states[name] = (self._clock(), instance_states)
+
+            return self._instance_states[name][1].get(instance_id)
+
+    def invalidate(self, name=None):
+        """
+        Forget the cached state of the named loadbalancer, or of all of them.
+        """
+        with self._lock:
+            if name is None:
+                self._loadbalancers.clear()
+                self._instance_states.clear()
+            else:
+                self._loadbalancers.pop(name, None)
+                self._instance_states.pop(name, None)
+
+
+class MissingElasticIp(Exception):
+    pass
+
+
+class ElasticIpCache(object):
+    """
+    Map each of a deployment's elastic IPs to its address, including the
+    instance it's associated with, so that nodes don't each need to look up
+    their own.
+
+    ``ec2conn`` The EC2 connection to query through.
+    ``public_ips`` The elastic IPs used by the deployment. They're all fetched
+    together with a single request, and again whenever ``refresh`` is called.
+    If EC2 doesn't know about some of them, the rest are looked up one at a
+    time so that only the missing ones fail.
+    """
+    def __init__(self, ec2conn, public_ips):
+        self.ec2conn = ec2conn
+        self.public_ips = set(public_ips)
+        self._addresses = None
+        self._lock = threading.RLock()
+
+        self.request_count = 0
+
+    def refresh(self):
+        with self._lock:
+            try:
+                addresses = self._get_all_addresses(sorted(self.public_ips))
+            except boto.exception.EC2ResponseError, e:
+                if e.error_code != 'InvalidAddress.NotFound':
+                    raise
+                logger.warning(
+                    "Not all elastic IPs were found. Looking them up singly",
+                )
+                addresses = []
+                for public_ip in sorted(self.public_ips):
+                    addresses.extend(self._get_address_if_found(public_ip))
+            self._addresses = dict(
+                (address.public_ip, address) for address in addresses
+            )
+
+    def _get_all_addresses(self, public_ips):
+        try:
+            return self.ec2conn.get_all_addresses(public_ips)
+        finally:
+            self.request_count += 1
+
+    def _get_address_if_found(self, public_ip):
+        try:
+            return self._get_all_addresses([public_ip])
+        except boto.exception.EC2ResponseError, e:
+            if e.error_code != 'InvalidAddress.NotFound':
+                raise
+            logger.warning("Elastic IP not found: %s", public_ip)
+            return []
+
+    def invalidate(self):
+        with self._lock:
+            self._addresses = None
+
+    def get_address(self, public_ip):
+        with self._lock:
+            if public_ip not in self.public_ips:
+                self.public_ips.add(public_ip)
+                self._addresses = None
+            if self._addresses is None:
+                self.refresh()
+            if public_ip not in self._addresses:
+                raise MissingElasticIp(
+                    "Elastic IP %s doesn't exist in this account" % public_ip,
+                )
+
+            return self._addresses[public_ip]
+
+
 class InfrastructureNode(models.Model):
     nodename = models.ItemName()
     generation_id = models.NumberField(required=True)
@@ -66,31 +352,42 @@ class InfrastructureNode(models.Model):
         self.elbconn = None
         self._boto_instance = None
         self._deployment_info = None
+        self._resource_tracker = None
+        self._http_session = None
+        self._loadbalancer_cache = None
+        self._elastic_ip_cache = None
         super(InfrastructureNode, self).__init__(*args, **kwargs)
 
     def __str__(self):
         if self.aws_type in NODE_AWS_TYPES:
-            output_str = '%s:%s[%s]<%s>' % (
-                self.aws_type,
-                self.name,
-                self.aws_id,
-                self.creation_date,
-            )
-            return output_str
+            return _format_node(self)
 
         return super(InfrastructureNode, self).__str__()
 
     def save(self):
+        if self._resource_tracker is not None:
+            self._resource_tracker.invalidate_cache(self.deployment_name)
+
         # Until this is well-tested, I don't want anyone running this code and
         # actually writing to a SimpleDB Domain. This is a "permanent mock"
         # until we think this functionality is safe/stable
         logger.critical("Called save on %s", self)
         return
 
-    def get_status_output(self):
+    def promote(self):
+        """
+        We're already a full model. See `NodeRecord.promote`.
+        """
+        return self
+
+    def get_status_output(self, is_healthy=None, check_health=True):
         """
         Provide a detailed string representation of the instance with its
         current operational/health status.
+
+        ``is_healthy`` Optionally, the result of an already-run health check
+        (eg. from `check_node_health`) to use instead of checking again.
+        ``check_health`` If False, leave the health status out entirely.
         """
         if self.aws_type in NODE_AWS_TYPES:
             status_str = ''
@@ -101,20 +398,37 @@ class InfrastructureNode(models.Model):
                     status_str += 'UP-'
                 else:
                     status_str += 'INACTIVE-'
-                if not self.is_healthy:
-                    status_str += 'UNHEALTHY-'
+                if check_health:
+                    if is_healthy is None:
+                        is_healthy = self.is_healthy
+                    if not is_healthy:
+                        status_str += 'UNHEALTHY-'
 
             return "%s-%s" % (status_str, self)
 
         return "UNKNOWN-%s" % self
 
-    def set_aws_conns(self, ec2conn, rdsconn):
+    def set_aws_conns(self, ec2conn, rdsconn, elbconn=None):
         self.ec2conn = ec2conn
         self.rdsconn = rdsconn
+        if elbconn is not None:
+            self.elbconn = elbconn
 
     def set_deployment_info(self, deployment_info):
         self._deployment_info = deployment_info
 
+    def set_resource_tracker(self, resource_tracker):
+        self._resource_tracker = resource_tracker
+
+    def set_http_session(self, http_session):
+        self._http_session = http_session
+
+    def set_loadbalancer_cache(self, loadbalancer_cache):
+        self._loadbalancer_cache = loadbalancer_cache
+
+    def set_elastic_ip_cache(self, elastic_ip_cache):
+        self._elastic_ip_cache = elastic_ip_cache
+
     def is_actually_running(self):
         """
         Checks AWS to ensure this node hasn't been terminated.
@@ -203,6 +517,7 @@ class InfrastructureNode(models.Model):
             loadbalancer,
         )
         loadbalancer.deregister_instances([self.aws_id])
+        self._invalidate_loadbalancer_state(loadbalancer)
 
     def make_fully_inoperative(self):
         """
@@ -222,6 +537,7 @@ class InfrastructureNode(models.Model):
                         elastic_ip.instance_id,
                     )
                     self.ec2conn.disassociate_address(elastic_ip.public_ip)
+                    self._invalidate_elastic_ip()
 
             self._remove_from_loadbalancer()
         elif self.aws_type == 'rds':
@@ -230,6 +546,13 @@ class InfrastructureNode(models.Model):
     def refresh_boto_instance(self):
         self._boto_instance = None
 
+    def set_boto_instance(self, boto_instance):
+        """
+        Use an already-fetched ``boto_instance``, eg. one of many fetched
+        together, rather than looking it up ourselves.
+        """
+        self._boto_instance = boto_instance
+
     @property
     def boto_instance(self):
         if not self._boto_instance:
@@ -333,15 +656,13 @@ class InfrastructureNode(models.Model):
                     )
                     return False
 
-                health_list = loadbalancer.get_instance_health(
-                    instances=[self.aws_id])
-                assert len(health_list) == 1
-                if health_list[0].state != 'InService':
+                health_state = self._get_loadbalancer_state(loadbalancer)
+                if health_state != 'InService':
                     logger.debug(
                         "is_operational: Node %s not healthy in loadbalancer.",
                         self.boto_instance,
                     )
-                    logger.debug("LB health state: %s", health_list[0].state)
+                    logger.debug("LB health state: %s", health_state)
                     return False
 
             return True
@@ -393,8 +714,10 @@ class InfrastructureNode(models.Model):
         status_success_string = health_check['status_contains']
         timeout = health_check['status_check_timeout']
 
+        # Without a shared session, each check opens a new connection
+        http = self._http_session or requests
         try:
-            site_status = requests.get(status_url, timeout=timeout)
+            site_status = http.get(status_url, timeout=timeout)
         except ConnectionError:
             logger.info("health_check unavailable for %s", self)
             logger.debug("status url: %s", status_url)
@@ -408,6 +731,8 @@ class InfrastructureNode(models.Model):
             logger.debug("status url: %s", status_url)
             logger.debug("Exception: %s", e)
             return False
+        if self._http_session is not None:
+            _log_connection_reuse(self._http_session, status_url)
         if status_success_string not in site_status.text:
             logger.debug(
                 "Required string not present in health_check for %s",
@@ -488,6 +813,7 @@ class InfrastructureNode(models.Model):
                         elastic_ip.instance_id,
                     )
                     self.ec2conn.disassociate_address(elastic_ip.public_ip)
+                    self._invalidate_elastic_ip()
 
             # Switch the elastic IP
             if elastic_ip and elastic_ip.instance_id != self.boto_instance.id:
@@ -496,15 +822,20 @@ class InfrastructureNode(models.Model):
                     elastic_ip.public_ip,
                     self.boto_instance,
                 )
-                while elastic_ip.instance_id != self.boto_instance.id:
+
+                def associate_elastic_ip():
                     self.boto_instance.use_ip(elastic_ip)
-                    elastic_ip = self.get_elastic_ip()
-                    logger.info(
-                        "Waiting 5s for ip %s to associated to %s",
-                        elastic_ip,
+                    associated_ip = self.get_elastic_ip(refresh=True)
+                    return associated_ip.instance_id == self.boto_instance.id
+
+                wait_until(
+                    associate_elastic_ip,
+                    "IP %s to associate to %s" % (
+                        elastic_ip.public_ip,
                         self.boto_instance,
-                    )
-                    time.sleep(5)
+                    ),
+                    backoff=Backoff(max_delay=ELASTIC_IP_WAIT),
+                )
                 logger.info(
                     "IP %s succesfully associated to %s",
                     elastic_ip,
@@ -519,30 +850,79 @@ class InfrastructureNode(models.Model):
                     loadbalancer,
                 )
                 loadbalancer.register_instances([self.boto_instance.id])
+                self._invalidate_loadbalancer_state(loadbalancer)
 
         elif self.aws_type == 'rds':
             pass
 
     def get_loadbalancer(self):
+        loadbalancer_name = self._deployment_info.get('loadbalancer', None)
+        if not loadbalancer_name:
+            return None
+
+        if self._loadbalancer_cache is not None:
+            return self._loadbalancer_cache.get_loadbalancer(
+                loadbalancer_name,
+            )
+
         if not self.elbconn:
             self.elbconn = elb.ELBConnection(
                 self.ec2conn.aws_access_key_id,
                 self.ec2conn.aws_secret_access_key)
 
-        if not self._deployment_info.get('loadbalancer', None):
-            return None
-
         elb_list = self.elbconn.get_all_load_balancers(
-            load_balancer_names=[self._deployment_info['loadbalancer']])
+            load_balancer_names=[loadbalancer_name])
         assert len(elb_list) == 1
 
         return elb_list[0]
 
-    def get_elastic_ip(self):
+    def get_loadbalancer_state(self):
+        """
+        Get this node's health state in its loadbalancer, eg. ``'InService'``.
+
+        Returns None if the node has no loadbalancer or isn't in it.
+        """
+        loadbalancer = self.get_loadbalancer()
+        if loadbalancer is None or not self._instance_in_load_balancer():
+            return None
+
+        return self._get_loadbalancer_state(loadbalancer)
+
+    def _get_loadbalancer_state(self, loadbalancer):
+        """
+        Get this node's health state in the given ``loadbalancer``.
+        """
+        if self._loadbalancer_cache is not None:
+            return self._loadbalancer_cache.get_instance_state(
+                loadbalancer.name,
+                self.aws_id,
+            )
+
+        health_list = loadbalancer.get_instance_health(
+            instances=[self.aws_id])
+        assert len(health_list) == 1
+
+        return health_list[0].state
+
+    def _invalidate_loadbalancer_state(self, loadbalancer):
+        if self._loadbalancer_cache is not None:
+            self._loadbalancer_cache.invalidate(loadbalancer.name)
+
+    def get_elastic_ip(self, refresh=False):
+        """
+        Get the configured elastic IP's address, if there is one.
+
+        ``refresh`` If True, ignore any address we've already looked up.
+        """
         configured_ip = self._deployment_info['aws'].get('elastic_ip')
         if not configured_ip:
             return None
 
+        if self._elastic_ip_cache is not None:
+            if refresh:
+                self._elastic_ip_cache.refresh()
+            return self._elastic_ip_cache.get_address(configured_ip)
+
         ips = self.ec2conn.get_all_addresses(
             [configured_ip],
         )
@@ -550,6 +930,10 @@ class InfrastructureNode(models.Model):
 
         return ips[0]
 
+    def _invalidate_elastic_ip(self):
+        if self._elastic_ip_cache is not None:
+            self._elastic_ip_cache.invalidate()
+
     def set_initial_deploy_complete(self):
         """
         Record that the initial deployment operation has completed
@@ -562,3 +946,177 @@ class InfrastructureNode(models.Model):
         if self.is_running == 1 and not self.is_actually_running():
             self.is_running = 0
             self.save()
+
+
+NODE_FIELD_NAMES = tuple(sorted(InfrastructureNode.fields.keys()))
+# The `InfrastructureNode` behaviour that only reads AWS state, which a
+# `NodeRecord` runs itself rather than promoting
+READ_ONLY_NODE_ATTRIBUTES = frozenset([
+    '_get_loadbalancer_state',
+    '_instance_in_load_balancer',
+    'boto_instance',
+    'get_elastic_ip',
+    'get_health_check_url',
+    'get_loadbalancer',
+    'get_loadbalancer_state',
+    'get_status_output',
+    'is_actually_running',
+    'is_healthy',
+    'is_operational',
+    'launch_time',
+    'passes_health_check',
+    'refresh_boto_instance',
+    'set_boto_instance',
+])
+
+
+def _build_field_property(index, field_name):
+    def get_value(self):
+        if self._node is not None:
+            return getattr(self._node, field_name)
+        return self._values[index]
+
+    def set_value(self, value):
+        setattr(self.promote(), field_name, value)
+
+    return property(get_value, set_value)
+
+
+class NodeRecord(object):
+    """
+    A compact, read-only stand-in for an `InfrastructureNode` used when
+    reading records in bulk. Scanning a deployment means reading every
+    historical generation's records, most of which are thrown away, so we
+    don't want to pay for the full model on each of them.
+
+    Field values can be read directly, and so can the read-only
+    `InfrastructureNode` behaviour in `READ_ONLY_NODE_ATTRIBUTES`, like
+    checking health or operational status. Assigning to a field, or using
+    any other behaviour (saving, terminating, making operational, etc),
+    promotes the record to a full `InfrastructureNode`, to which everything
+    is delegated from then on.
+    """
+    __slots__ = (
+        '_values',
+        '_node',
+        '_boto_instance',
+        'ec2conn',
+        'rdsconn',
+        'elbconn',
+        '_deployment_info',
+        '_resource_tracker',
+        '_http_session',
+        '_loadbalancer_cache',
+        '_elastic_ip_cache',
+    )
+
+    def __init__(self, **values):
+        field_values = []
+        for field_name in NODE_FIELD_NAMES:
+            if field_name in values:
+                field_values.append(values[field_name])
+            else:
+                field = InfrastructureNode.fields[field_name]
+                field_values.append(getattr(field, 'default', None))
+
+        self._values = tuple(field_values)
+        self._node = None
+        self._boto_instance = None
+        self.ec2conn = None
+        self.rdsconn = None
+        self.elbconn = None
+        self._deployment_info = None
+        self._resource_tracker = None
+        self._http_session = None
+        self._loadbalancer_cache = None
+        self._elastic_ip_cache = None
+
+    def __getattr__(self, name):
+        # Only called for names that aren't fields or slots. Read-only
+        # behaviour runs against the record itself, but anything else needs
+        # the full model
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if self._node is None and name in READ_ONLY_NODE_ATTRIBUTES:
+            return InfrastructureNode.__dict__[name].__get__(self, NodeRecord)
+        return getattr(self.promote(), name)
+
+    def __setattr__(self, name, value):
+        if name in NodeRecord.__slots__ or name in NODE_FIELD_NAMES:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.promote(), name, value)
+
+    def __str__(self):
+        if self._node is None and self.aws_type in NODE_AWS_TYPES:
+            return _format_node(self)
+
+        return str(self.promote())
+
+    def __repr__(self):
+        return '<NodeRecord: %s>' % self
+
+    @property
+    def is_promoted(self):
+        return self._node is not None
+
+    def promote(self):
+        """
+        Return the full `InfrastructureNode` for this record, building it the
+        first time it's needed.
+        """
+        if self._node is None:
+            node = InfrastructureNode(
+                **dict(zip(NODE_FIELD_NAMES, self._values))
+            )
+            node.set_aws_conns(self.ec2conn, self.rdsconn, self.elbconn)
+            node.set_boto_instance(self._boto_instance)
+            node.set_deployment_info(self._deployment_info)
+            node.set_resource_tracker(self._resource_tracker)
+            node.set_http_session(self._http_session)
+            node.set_loadbalancer_cache(self._loadbalancer_cache)
+            node.set_elastic_ip_cache(self._elastic_ip_cache)
+            self._node = node
+
+        return self._node
+
+    def set_aws_conns(self, ec2conn, rdsconn, elbconn=None):
+        self.ec2conn = ec2conn
+        self.rdsconn = rdsconn
+        if elbconn is not None:
+            self.elbconn = elbconn
+        if self._node is not None:
+            self._node.set_aws_conns(ec2conn, rdsconn, elbconn)
+
+    def set_deployment_info(self, deployment_info):
+        self._deployment_info = deployment_info
+        if self._node is not None:
+            self._node.set_deployment_info(deployment_info)
+
+    def set_resource_tracker(self, resource_tracker):
+        self._resource_tracker = resource_tracker
+        if self._node is not None:
+            self._node.set_resource_tracker(resource_tracker)
+
+    def set_http_session(self, http_session):
+        self._http_session = http_session
+        if self._node is not None:
+            self._node.set_http_session(http_session)
+
+    def set_loadbalancer_cache(self, loadbalancer_cache):
+        self._loadbalancer_cache = loadbalancer_cache
+        if self._node is not None:
+            self._node.set_loadbalancer_cache(loadbalancer_cache)
+
+    def set_elastic_ip_cache(self, elastic_ip_cache):
+        self._elastic_ip_cache = elastic_ip_cache
+        if self._node is not None:
+            self._node.set_elastic_ip_cache(elastic_ip_cache)
+
+
+for _index, _field_name in enumerate(NODE_FIELD_NAMES):
+    setattr(
+        NodeRecord,
+        _field_name,
+        _build_field_property(_index, _field_name),
+    )
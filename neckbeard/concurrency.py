@@ -0,0 +1,76 @@
+"""
+Helpers for running slow, mostly network-bound operations concurrently.
+"""
+import logging
+import time
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+
+logger = logging.getLogger('concurrency')
+
+DEFAULT_MAX_WORKERS = 10
+# Waiting on a result without a timeout can't be interrupted with Ctrl-C, so
+# never wait longer than this at a time
+MAX_WAIT = 60 * 60 * 24
+
+
+def map_concurrently(
+    func,
+    items,
+    max_workers=DEFAULT_MAX_WORKERS,
+    timeout=None,
+    default=None,
+):
+    """
+    Call ``func`` with each of ``items`` using a pool of up to ``max_workers``
+    threads and return a list of the results in the same order as ``items``.
+
+    ``timeout`` Optionally, the total number of seconds to wait for all of the
+    calls to finish. Any call that hasn't finished by then has ``default`` as
+    its result. The call itself is abandoned, not interrupted.
+
+    Exceptions raised by ``func`` are re-raised.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    deadline = None
+    if timeout is not None:
+        deadline = time.time() + timeout
+
+    pool = ThreadPool(min(max_workers, len(items)))
+    try:
+        async_results = [
+            pool.apply_async(func, (item,))
+            for item in items
+        ]
+        pool.close()
+
+        results = []
+        timed_out_count = 0
+        for async_result in async_results:
+            if deadline is None:
+                wait = MAX_WAIT
+            else:
+                wait = max(deadline - time.time(), 0)
+
+            try:
+                results.append(async_result.get(wait))
+            except TimeoutError:
+                timed_out_count += 1
+                results.append(default)
+    finally:
+        # Don't wait on any abandoned calls. The workers are daemon threads,
+        # so they won't keep us from exiting either.
+        pool.terminate()
+
+    if timed_out_count:
+        logger.warning(
+            "%s of %s call(s) didn't finish within %ss",
+            timed_out_count,
+            len(items),
+            timeout,
+        )
+
+    return results
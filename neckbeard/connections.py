@@ -0,0 +1,89 @@
+"""
+A pool of AWS connections, shared by everything that talks to AWS.
+
+boto connections are cheap to create, but each one keeps its own pool of
+HTTPS connections. Sharing a single connection per set of credentials, region
+and service means that every `Deployment` (including the seed deployment
+used by `up`) re-uses the same already-established HTTPS connections.
+"""
+import logging
+import threading
+from collections import namedtuple
+
+from boto import ec2, rds
+from boto.ec2 import elb
+
+logger = logging.getLogger('connections')
+
+DEFAULT_REGION = 'us-east-1'
+
+SERVICE_MODULES = {
+    'ec2': ec2,
+    'rds': rds,
+    'elb': elb,
+}
+
+# The AWS account and region that a resource lives in
+AWSSettings = namedtuple(
+    'AWSSettings',
+    ['access_key_id', 'secret_access_key', 'region'],
+)
+
+
+class UnknownAWSRegion(Exception):
+    pass
+
+
+class ConnectionPool(object):
+    """
+    Create AWS connections on demand, keeping one per combination of
+    credentials, region and service.
+    """
+    def __init__(self):
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def get_connection(self, service, aws_settings):
+        """
+        Get the connection to ``service`` (one of ``SERVICE_MODULES``) for the
+        given ``aws_settings``, creating it if this is the first time it's
+        been asked for.
+        """
+        region = aws_settings.region or DEFAULT_REGION
+        key = (
+            aws_settings.access_key_id,
+            aws_settings.secret_access_key,
+            region,
+            service,
+        )
+        with self._lock:
+            if key not in self._connections:
+                self._connections[key] = self._connect(
+                    service,
+                    aws_settings,
+                    region,
+                )
+
+            return self._connections[key]
+
+    def _connect(self, service, aws_settings, region):
+        logger.debug("Connecting to %s in %s", service, region)
+        conn = SERVICE_MODULES[service].connect_to_region(
+            region,
+            aws_access_key_id=aws_settings.access_key_id,
+            aws_secret_access_key=aws_settings.secret_access_key,
+        )
+        if conn is None:
+            raise UnknownAWSRegion(
+                "%s isn't available in region %s" % (service, region),
+            )
+
+        return conn
+
+    def clear(self):
+        with self._lock:
+            self._connections = {}
+
+
+# The pool used unless one is specifically given
+default_pool = ConnectionPool()
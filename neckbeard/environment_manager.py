@@ -1,16 +1,54 @@
 import logging
+import threading
 import time
+from collections import defaultdict
+from contextlib import contextmanager
 from copy import copy
 from datetime import datetime
 
-from boto import ec2, rds
-
-from neckbeard.cloud_resource import InfrastructureNode
+from neckbeard import connections
+from neckbeard.cloud_resource import (
+    ElasticIpCache,
+    InfrastructureNode,
+    LoadBalancerCache,
+    build_http_session,
+    check_node_health,
+)
+from neckbeard.concurrency import map_concurrently
+from neckbeard.connections import AWSSettings
+# `WaitTimedOut` used to live here, so it's imported for compatibility
+from neckbeard.waiters import Backoff, WaitTimedOut, wait_for_all  # NOQA
 
 logger = logging.getLogger('environment_manager')
+time_logger = logging.getLogger('timer')
 
+# The longest we'll wait between checks on nodes becoming operational
 WAIT_TIME = 10
 MAKE_OPERATIONAL_TIMEOUT = 4 * 60  # 4 minutes
+REPAIR_MAX_WORKERS = 10
+# The most instance ids to filter on in a single request
+INSTANCE_ID_FILTER_SIZE = 200
+
+# The outcomes of repairing each inoperational node
+REPAIR_MADE_OPERATIONAL = 'made_operational'
+# Asked to become operational, but not waited on
+REPAIR_REQUESTED = 'requested'
+REPAIR_TIMED_OUT = 'timed_out'
+REPAIR_FAILED = 'failed'
+REPAIR_UNHEALTHY = 'unhealthy'
+REPAIR_MISSING = 'missing'
+
+
+@contextmanager
+def _logs_phase(description):
+    """
+    Log how long the wrapped phase of work took to the ``timer`` logger.
+    """
+    start = time.time()
+    try:
+        yield
+    finally:
+        time_logger.info("%.1fs- %s", time.time() - start, description)
 
 
 class PstatRdsId(object):
@@ -51,57 +89,159 @@ class PstatRdsId(object):
         return None
 
 
-class WaitTimedOut(Exception):
-    """Waiting for an operation to complete timed out"""
+class MissingAWSCredentials(Exception):
     pass
 
 
-class MissingAWSCredentials(Exception):
+class NonUniformAWSCredentials(Exception):
     pass
 
 
-class NonUniformAWSCredentials(Exception):
+class InconsistentGenerationPointer(Exception):
+    """The recorded generation pointer disagrees with the node records"""
     pass
 
 
+class RollingBudget(object):
+    """
+    Limits how many of a deployment's nodes are out of operation at once while
+    they're deployed to concurrently.
+
+    ``max_unavailable`` The most operational nodes that may be out at once.
+    ``min_healthy`` The fewest other operational nodes that must remain for
+    each role (see `Deployment.has_required_redundancy`).
+    """
+    def __init__(self, deployment, max_unavailable=1, min_healthy=1):
+        self.deployment = deployment
+        self.max_unavailable = max_unavailable
+        self.min_healthy = min_healthy
+        # The names of the nodes currently taken out of operation
+        self.unavailable = set()
+        self._condition = threading.Condition()
+
+    def acquire(self, node):
+        """
+        Wait until ``node`` can be taken out of operation without going over
+        the budget, then count it as out.
+
+        Returns True if the required redundancy is kept. If it can't be kept
+        even once every other node is back in operation, the node is counted
+        as out anyway and False is returned.
+        """
+        with self._condition:
+            while True:
+                has_redundancy = self.deployment.has_required_redundancy(
+                    node,
+                    min_healthy=self.min_healthy,
+                    unavailable=self.unavailable,
+                )
+                if not self.unavailable:
+                    # Nothing else is out, so waiting won't help
+                    break
+                if (
+                    has_redundancy
+                    and len(self.unavailable) < self.max_unavailable
+                ):
+                    break
+
+                logger.info(
+                    "Waiting for one of %s node(s) to return to operation "
+                    "before taking %s out",
+                    len(self.unavailable),
+                    node,
+                )
+                self._condition.wait(WAIT_TIME)
+
+            self.unavailable.add(node.name)
+            return has_redundancy
+
+    def release(self, node):
+        """
+        Stop counting ``node`` as out of operation.
+        """
+        with self._condition:
+            self.unavailable.discard(node.name)
+            # Nodes waiting on this one need to see it's operational again
+            self.deployment.invalidate_operational_state()
+            self._condition.notify_all()
+
+
 class Deployment(object):
     """
     Use configuration info to classify all currently running ec2 and RDS
     instances and group them by deployment generation.
     """
-    def __init__(self, deployment_name, ec2_nodes, rds_nodes, elb_nodes):
+    def __init__(
+        self,
+        deployment_name,
+        ec2_nodes,
+        rds_nodes,
+        elb_nodes,
+        resource_tracker=None,
+        ec2conn=None,
+        rdsconn=None,
+        elbconn=None,
+        connection_pool=None,
+    ):
         """
         ``deployment_name`` A string uniquely identifying a deployment.
+        ``resource_tracker`` Optionally, the ``ResourceTracker`` through which
+        node records are queried.
+        ``ec2conn``, ``rdsconn`` and ``elbconn`` Optionally, already-built AWS
+        connections to use for every resource instead of connecting with the
+        configured credentials. Used to run against `neckbeard.fake_aws`.
+        ``connection_pool`` The `ConnectionPool` that AWS connections come
+        from. Defaults to the pool shared by all deployments.
         """
         self.deployment_name = deployment_name
+        self.resource_tracker = resource_tracker
         self.deployment_confs = {}
         self.deployment_confs['ec2'] = ec2_nodes
         self.deployment_confs['rds'] = rds_nodes
         self.deployment_confs['elb'] = elb_nodes
 
-        aws_credentials = self._get_valid_aws_credentials(
+        # Each resource's credentials and region
+        self._aws_settings = self._get_valid_aws_settings(
             self.deployment_confs,
         )
 
         self._pending_gen_id = None
         self._active_gen_id = None
-
-        self.ec2conn = ec2.EC2Connection(
-            aws_credentials['access_key_id'],
-            aws_credentials['secret_access_key'],
-        )
-        self.rdsconn = rds.RDSConnection(
-            aws_credentials['access_key_id'],
-            aws_credentials['secret_access_key'],
-        )
-
-    def _get_valid_aws_credentials(self, deployment_confs):
-        # TODO: Instead of just ensuring that all of the resources use the same
-        # credentials, actually manage multiple connection
-        aws_credentials = {
-            'access_key_id': None,
-            'secret_access_key': None,
+        # Whether the active generation was scanned from the node records
+        # because the resource tracker had no generation pointer for it
+        self._active_gen_id_scanned = False
+
+        if connection_pool is None:
+            connection_pool = connections.default_pool
+        self.connection_pool = connection_pool
+        self._given_conns = {
+            'ec2': ec2conn,
+            'rds': rdsconn,
+            'elb': elbconn,
         }
+        # Connect up front, so that unusable credentials are noticed before
+        # we start doing any work
+        distinct_settings = set(self._aws_settings.values())
+        if not distinct_settings:
+            distinct_settings.add(self._get_default_aws_settings())
+        for aws_settings in distinct_settings:
+            for service in connections.SERVICE_MODULES:
+                self._get_connection(service, aws_settings)
+        # All of the nodes in an account and region share what we know about
+        # their loadbalancers and elastic IPs. Keyed by `AWSSettings`.
+        self._loadbalancer_caches = {}
+        self._elastic_ip_caches = {}
+        # Health checks for all of our nodes share keep-alive connections
+        self.http_session = build_http_session()
+
+    def _get_valid_aws_settings(self, deployment_confs):
+        """
+        Ensure that every resource has AWS credentials configured.
+
+        Returns a dictionary mapping each ``(aws_type, name)`` to its
+        `AWSSettings`.
+        """
+        aws_settings = {}
         for aws_type, configs_of_type in deployment_confs.items():
             for name, resource_config in configs_of_type.items():
                 aws_config = resource_config.get('aws')
@@ -113,12 +253,8 @@ class Deployment(object):
                         ),
                     )
 
-                # Ensure that the keys exist and that they're not different
-                # from those found on other resources
                 for key in ['access_key_id', 'secret_access_key']:
-                    value = aws_config.get(key)
-
-                    if value is None:
+                    if aws_config.get(key) is None:
                         raise MissingAWSCredentials(
                             "%s resource %s has no '%s' config" % (
                                 aws_type,
@@ -126,52 +262,212 @@ class Deployment(object):
                                 key,
                             ),
                         )
-                    other_resource_value = aws_credentials.get(key)
-                    if other_resource_value is not None:
-                        if value != other_resource_value:
-                            raise NonUniformAWSCredentials(
-                                (
-                                    "%s resource %s has no '%s' config "
-                                    "different from previously seen"
-                                ) % (
-                                    aws_type,
-                                    name,
-                                    key,
-                                ),
-                            )
-                    aws_credentials[key] = value
-
-        return aws_credentials
+
+                aws_settings[(aws_type, name)] = AWSSettings(
+                    access_key_id=aws_config['access_key_id'],
+                    secret_access_key=aws_config['secret_access_key'],
+                    region=aws_config.get('region'),
+                )
+
+        return aws_settings
+
+    def _get_default_aws_settings(self):
+        """
+        Get the `AWSSettings` shared by all of our resources.
+
+        Raises `NonUniformAWSCredentials` if the resources use more than one
+        account or region, since there's then no single right answer.
+        """
+        distinct_settings = set(self._aws_settings.values())
+        if len(distinct_settings) > 1:
+            raise NonUniformAWSCredentials(
+                "%s resources use %s different AWS credentials/regions. "
+                "Use the connection for a specific resource" % (
+                    self.deployment_name,
+                    len(distinct_settings),
+                )
+            )
+        if not distinct_settings:
+            # Let boto find credentials in its configuration
+            return AWSSettings(None, None, None)
+
+        return distinct_settings.pop()
+
+    def get_aws_settings(self, aws_type, node_name):
+        """
+        Get the `AWSSettings` for the given resource. Resources that aren't
+        configured use the deployment-wide settings.
+        """
+        settings = self._aws_settings.get((aws_type, node_name))
+        if settings is None:
+            settings = self._get_default_aws_settings()
+
+        return settings
+
+    def _get_connection(self, service, aws_settings):
+        given_conn = self._given_conns[service]
+        if given_conn is not None:
+            return given_conn
+
+        return self.connection_pool.get_connection(service, aws_settings)
+
+    def get_connection(self, service, aws_type, node_name):
+        """
+        Get the ``service`` connection (eg. ``'ec2'``) for the account and
+        region of the given resource.
+        """
+        return self._get_connection(
+            service,
+            self.get_aws_settings(aws_type, node_name),
+        )
+
+    @property
+    def ec2conn(self):
+        return self._get_connection('ec2', self._get_default_aws_settings())
+
+    @property
+    def rdsconn(self):
+        return self._get_connection('rds', self._get_default_aws_settings())
+
+    @property
+    def elbconn(self):
+        return self._get_connection('elb', self._get_default_aws_settings())
+
+    def _get_loadbalancer_cache(self, aws_settings):
+        if aws_settings not in self._loadbalancer_caches:
+            loadbalancer_names = [
+                conf['loadbalancer']
+                for name, conf in self.deployment_confs['ec2'].items()
+                if conf.get('loadbalancer')
+                and self._aws_settings[('ec2', name)] == aws_settings
+            ]
+            self._loadbalancer_caches[aws_settings] = LoadBalancerCache(
+                self._get_connection('elb', aws_settings),
+                loadbalancer_names,
+            )
+
+        return self._loadbalancer_caches[aws_settings]
+
+    def _get_elastic_ip_cache(self, aws_settings):
+        if aws_settings not in self._elastic_ip_caches:
+            elastic_ips = [
+                conf['aws']['elastic_ip']
+                for name, conf in self.deployment_confs['ec2'].items()
+                if conf['aws'].get('elastic_ip')
+                and self._aws_settings[('ec2', name)] == aws_settings
+            ]
+            self._elastic_ip_caches[aws_settings] = ElasticIpCache(
+                self._get_connection('ec2', aws_settings),
+                elastic_ips,
+            )
+
+        return self._elastic_ip_caches[aws_settings]
+
+    @property
+    def loadbalancer_cache(self):
+        return self._get_loadbalancer_cache(self._get_default_aws_settings())
+
+    @property
+    def elastic_ip_cache(self):
+        return self._get_elastic_ip_cache(self._get_default_aws_settings())
 
     @property
     def active_gen_id(self):
         if self._active_gen_id:
             return self._active_gen_id
 
-        active_nodes = InfrastructureNode.objects.filter(
-            deployment_name=self.deployment_name,
-            is_active_generation=1)
+        if self.resource_tracker is not None:
+            self._active_gen_id = (
+                self.resource_tracker.get_active_generation_id(
+                    self.deployment_name,
+                )
+            )
+            if self._active_gen_id:
+                return self._active_gen_id
+
+        # No pointer has been recorded yet, so find the active generation
+        # from the node records. Reading never writes the pointer; `up` seeds
+        # it explicitly with `record_generation_pointer`.
+        self._active_gen_id = self._scan_active_gen_id()
+        self._active_gen_id_scanned = bool(self._active_gen_id)
+
+        return self._active_gen_id
+
+    def record_generation_pointer(self):
+        """
+        If the active generation had to be scanned from the node records,
+        record it in the resource tracker's generation pointer so that the
+        next run can read it directly.
+        """
+        active_gen_id = self.active_gen_id
+        if not self._active_gen_id_scanned or self.resource_tracker is None:
+            return
+        self.resource_tracker.set_active_generation_id(
+            self.deployment_name,
+            active_gen_id,
+        )
+        self._active_gen_id_scanned = False
+
+    def _scan_active_gen_id(self):
+        """
+        Determine the active generation by scanning all of the node records
+        marked active and ensuring that they agree.
+        """
+        # A stale read here would have us deploying to the wrong generation,
+        # so always ask for consistency
+        active_nodes = self._filter_node_values(
+            ['aws_id', 'generation_id'],
+            consistent_read=True,
+            is_active_generation=1,
+        )
         if len(active_nodes) == 0:
             return None
 
         first_active_node = active_nodes[0]
-        gen_id = first_active_node.generation_id
+        gen_id = first_active_node['generation_id']
         for active_node in active_nodes:
-            if active_node.generation_id != gen_id:
+            if active_node['generation_id'] != gen_id:
                 err_str = (
                     "Inconsistent generation ids in simpledb. "
                     "%s:%s and %s:%s both marked active"
                 )
                 context = (
-                    first_active_node.aws_id,
-                    first_active_node.generation_id,
-                    active_node.aws_id,
-                    active_node.generation_id)
+                    first_active_node['aws_id'],
+                    first_active_node['generation_id'],
+                    active_node['aws_id'],
+                    active_node['generation_id'])
                 raise Exception(err_str % context)
 
-        self._active_gen_id = gen_id
+        return gen_id
 
-        return self._active_gen_id
+    def verify_generation_pointer(self):
+        """
+        Ensure that the active generation recorded in the resource tracker's
+        generation pointer matches the node records.
+        """
+        scanned_gen_id = self._scan_active_gen_id()
+        if self.resource_tracker is None:
+            return scanned_gen_id
+
+        pointer_gen_id = self.resource_tracker.get_active_generation_id(
+            self.deployment_name,
+        )
+        if pointer_gen_id is not None and pointer_gen_id != scanned_gen_id:
+            raise InconsistentGenerationPointer(
+                "Generation pointer for %s says %s is active, but the node "
+                "records say %s" % (
+                    self.deployment_name,
+                    pointer_gen_id,
+                    scanned_gen_id,
+                )
+            )
+        logger.info(
+            "Generation pointer for %s verified: %s",
+            self.deployment_name,
+            scanned_gen_id,
+        )
+
+        return scanned_gen_id
 
     @property
     def pending_gen_id(self):
@@ -185,10 +481,81 @@ class Deployment(object):
         self._pending_gen_id = 1
         return self._pending_gen_id
 
-    def get_blank_node(self, aws_type):
+    def _filter_nodes(self, consistent_read=None, **filters):
+        """
+        Query the node records for this deployment, going through the
+        ``resource_tracker`` if we have one.
+        """
+        if self.resource_tracker is None:
+            return InfrastructureNode.objects.filter(
+                deployment_name=self.deployment_name,
+                **filters
+            )
+
+        return self.resource_tracker.filter_nodes(
+            self.deployment_name,
+            consistent_read=consistent_read,
+            **filters
+        )
+
+    def _filter_node_values(self, fields, consistent_read=None, **filters):
+        """
+        Query just the given ``fields`` of the matching node records for this
+        deployment. Returns a list of dictionaries.
+        """
+        if self.resource_tracker is None:
+            nodes = self._filter_nodes(**filters)
+            return [
+                dict((field, getattr(node, field)) for field in fields)
+                for node in nodes
+            ]
+
+        return self.resource_tracker.filter_node_values(
+            self.deployment_name,
+            fields,
+            consistent_read=consistent_read,
+            **filters
+        )
+
+    def _configure_node(self, node):
+        """
+        Give the ``node`` the tracker shared by all of this deployment's
+        nodes, along with the connections and caches for its account and
+        region.
+        """
+        node.set_resource_tracker(self.resource_tracker)
+        node.set_http_session(self.http_session)
+
+        try:
+            aws_settings = self.get_aws_settings(node.aws_type, node.name)
+        except NonUniformAWSCredentials:
+            # A node we no longer have configuration for, so we can't know
+            # which of our accounts it's in
+            logger.debug("No AWS configuration for node %s", node)
+            return
+        node.set_aws_conns(
+            self._get_connection('ec2', aws_settings),
+            self._get_connection('rds', aws_settings),
+            self._get_connection('elb', aws_settings),
+        )
+        node.set_loadbalancer_cache(self._get_loadbalancer_cache(aws_settings))
+        node.set_elastic_ip_cache(self._get_elastic_ip_cache(aws_settings))
+
+    def invalidate_operational_state(self):
+        """
+        Forget the loadbalancer and elastic IP state shared by our nodes, so
+        that the next operational check sees any changes.
+        """
+        for loadbalancer_cache in self._loadbalancer_caches.values():
+            loadbalancer_cache.invalidate()
+        for elastic_ip_cache in self._elastic_ip_caches.values():
+            elastic_ip_cache.invalidate()
+
+    def get_blank_node(self, aws_type, name=None):
         node = InfrastructureNode()
-        node.set_aws_conns(self.ec2conn, self.rdsconn)
         node.aws_type = aws_type
+        node.name = name
+        self._configure_node(node)
 
         return node
 
@@ -224,17 +591,16 @@ class Deployment(object):
         return nodes
 
     def get_all_nodes(self, generation_id=None, is_running=None):
-        matching_nodes = InfrastructureNode.objects.filter(
-            deployment_name=self.deployment_name,
-        )
+        filters = {}
         if generation_id:
-            matching_nodes = matching_nodes.filter(generation_id=generation_id)
+            filters['generation_id'] = generation_id
         if is_running is not None:
-            matching_nodes = matching_nodes.filter(is_running=is_running)
+            filters['is_running'] = is_running
+        matching_nodes = self._filter_nodes(**filters)
 
         configured_nodes = []
         for node in matching_nodes:
-            node.set_aws_conns(self.ec2conn, self.rdsconn)
+            self._configure_node(node)
             deploy_conf = self.deployment_confs[node.aws_type].get(
                 node.name, None)
             if deploy_conf is None:
@@ -262,8 +628,7 @@ class Deployment(object):
         return configured_nodes
 
     def get_node(self, aws_type, node_name, generation_id, is_running=1):
-        matching_nodes = InfrastructureNode.objects.filter(
-            deployment_name=self.deployment_name,
+        matching_nodes = self._filter_nodes(
             generation_id=generation_id,
             aws_type=aws_type,
             name=node_name,
@@ -272,8 +637,9 @@ class Deployment(object):
         if len(matching_nodes) > 1:
             raise Exception('More than one matching node')
         elif len(matching_nodes) == 1:
-            node = matching_nodes[0]
-            node.set_aws_conns(self.ec2conn, self.rdsconn)
+            # Callers of `get_node` generally go on to modify the node
+            node = matching_nodes[0].promote()
+            self._configure_node(node)
             node.set_deployment_info(
                 self.deployment_confs[node.aws_type][node.name])
             return node
@@ -307,15 +673,15 @@ class Deployment(object):
 
         aws_id = boto_object.id
 
-        matching_nodes = InfrastructureNode.objects.filter(
+        matching_nodes = self._filter_nodes(
             aws_type=aws_type,
             aws_id=aws_id,
-            deployment_name=self.deployment_name,
         )
         if len(matching_nodes) == 1:
-            node = matching_nodes[0]
+            node = matching_nodes[0].promote()
+            self._configure_node(node)
         else:
-            node = self.get_blank_node(aws_type)
+            node = self.get_blank_node(aws_type, node_name)
 
         node.generation_id = generation_id
         node.deployment_name = self.deployment_name
@@ -337,9 +703,87 @@ class Deployment(object):
             'pstat' + self.deployment_name, version, counter)
         return rds_label
 
+    def prefetch_boto_instances(self, nodes):
+        """
+        Fetch the boto instances for all of the given ``nodes`` with as few
+        requests as possible, rather than each node looking up its own.
+        """
+        ec2_nodes_by_conn = defaultdict(list)
+        rds_nodes_by_conn = defaultdict(list)
+        for node in nodes:
+            if not node.aws_id:
+                continue
+            if node.aws_type == 'ec2':
+                ec2_nodes_by_conn[node.ec2conn].append(node)
+            elif node.aws_type == 'rds':
+                rds_nodes_by_conn[node.rdsconn].append(node)
+
+        for ec2conn, ec2_nodes in ec2_nodes_by_conn.items():
+            instance_ids = sorted(set(node.aws_id for node in ec2_nodes))
+            instances = {}
+            for i in range(0, len(instance_ids), INSTANCE_ID_FILTER_SIZE):
+                # Filtering, unlike asking for ``instance_ids``, doesn't fail
+                # if one of them no longer exists
+                reservations = ec2conn.get_all_instances(
+                    filters={
+                        'instance-id': instance_ids[
+                            i:i + INSTANCE_ID_FILTER_SIZE
+                        ],
+                    },
+                )
+                for reservation in reservations:
+                    for instance in reservation.instances:
+                        instances[instance.id] = instance
+            for node in ec2_nodes:
+                if node.aws_id in instances:
+                    node.set_boto_instance(instances[node.aws_id])
+
+        for rdsconn, rds_nodes in rds_nodes_by_conn.items():
+            db_instances = {}
+            marker = None
+            while True:
+                results = rdsconn.get_all_dbinstances(marker=marker)
+                for db_instance in results:
+                    db_instances[db_instance.id] = db_instance
+                marker = getattr(results, 'marker', None)
+                if not marker:
+                    break
+            for node in rds_nodes:
+                if node.aws_id in db_instances:
+                    node.set_boto_instance(db_instances[node.aws_id])
+
     def verify_running_state(self, nodes):
+        """
+        Ensure that every one of ``nodes`` recorded as running actually is,
+        correcting the records of those that aren't.
+
+        The nodes' instances are fetched together, and all of the corrections
+        are saved together.
+        """
+        with _logs_phase("describe %s node(s)" % len(nodes)):
+            self.prefetch_boto_instances(nodes)
+
+        retired_nodes = []
         for node in nodes:
-            node.verify_running_state()
+            if node.is_running == 1 and not node.is_actually_running():
+                logger.info("Node no longer running: %s", node)
+                node.is_running = 0
+                retired_nodes.append(node)
+
+        with _logs_phase("save %s retired node(s)" % len(retired_nodes)):
+            self._save_nodes(retired_nodes, fields=['is_running'])
+
+    def _save_nodes(self, nodes, fields=None):
+        if self.resource_tracker is None:
+            for node in nodes:
+                node.save()
+            return
+
+        self.resource_tracker.save_nodes(
+            self.deployment_name,
+            nodes,
+            fields=fields,
+        )
 
     def verify_active_deployment_state(self):
         """
@@ -365,11 +809,35 @@ class Deployment(object):
         ``is_running`` node that isn't running, that entry is updated.
 
         Nodes that actually exist but aren't recorded are NOT affected.
+
+        Each generation's records are queried concurrently, and then all of
+        the nodes are verified together.
+
+        Returns the verified nodes, with their boto instances already fetched.
         """
-        self.verify_pending_deployment_state()
-        self.verify_active_deployment_state()
+        # Settle which generations are which before looking them up
+        # concurrently
+        self.pending_gen_id
+
+        get_generation_nodes = [
+            self.get_all_pending_nodes,
+            self.get_all_active_nodes,
+        ]
         if verify_old:
-            self.verify_old_deployment_state()
+            get_generation_nodes.append(self.get_all_old_nodes)
+
+        with _logs_phase("query %s generation(s)" % len(get_generation_nodes)):
+            generation_nodes = map_concurrently(
+                lambda get_nodes: get_nodes(),
+                get_generation_nodes,
+            )
+
+        nodes = []
+        for some_nodes in generation_nodes:
+            nodes.extend(some_nodes)
+        self.verify_running_state(nodes)
+
+        return nodes
 
     def get_inoperational_active_nodes(self):
         """
@@ -385,8 +853,7 @@ class Deployment(object):
             for node_name, node_confs in confs.items():
                 node = self.get_active_node(aws_type, node_name)
                 if not node:
-                    mock_node = self.get_blank_node(aws_type)
-                    mock_node.name = node_name
+                    mock_node = self.get_blank_node(aws_type, node_name)
                     inoperational.append(mock_node)
                     logger.info("Missing node: %s-%s" % (aws_type, node_name))
                     continue
@@ -399,55 +866,62 @@ class Deployment(object):
         """
         Get a list of configured nodes that don't exist or aren't healthy.
         """
-        nodes = self.get_all_active_nodes()
+        return self._get_unhealthy_nodes(
+            self.get_all_active_nodes(),
+            self.get_active_node,
+        )
 
-        # Check that all running nodes are healthy
-        unhealthy = [
-            node for node in nodes
-            if node.is_running and not node.is_healthy
-        ]
+    def get_unhealthy_pending_nodes(self):
+        """
+        Get a list of configured nodes that don't exist or aren't healthy.
+        """
+        return self._get_unhealthy_nodes(
+            self.get_all_pending_nodes(),
+            self.get_pending_node,
+        )
 
-        # Ensure that all roles are filled exactly once with healthy nodes
+    def _get_unhealthy_nodes(self, nodes, get_node):
+        """
+        Find the unhealthy nodes among ``nodes`` along with the configured
+        roles that ``get_node`` can't find a healthy node for. The health
+        checks all run concurrently.
+        """
+        running_nodes = [node for node in nodes if node.is_running]
+
+        # Each configured role's node, or a mock node if it's missing
+        role_nodes = []
         for aws_type, confs in self.deployment_confs.items():
             for node_name, node_confs in confs.items():
-                node = self.get_active_node(aws_type, node_name)
+                node = get_node(aws_type, node_name)
                 if not node:
-                    mock_node = self.get_blank_node(aws_type)
-                    mock_node.name = node_name
-                    unhealthy.append(mock_node)
+                    mock_node = self.get_blank_node(aws_type, node_name)
+                    role_nodes.append((mock_node, True))
                     logger.info("Missing node: %s-%s" % (aws_type, node_name))
                     continue
-                if not node.is_healthy:
-                    unhealthy.append(node)
-                    logger.info("Node unhealthy: %s" % node)
-
-        return unhealthy
-
-    def get_unhealthy_pending_nodes(self):
-        """
-        Get a list of configured nodes that don't exist or aren't healthy.
-        """
-        nodes = self.get_all_pending_nodes()
+                role_nodes.append((node, False))
+
+        node_health = check_node_health(
+            running_nodes + [
+                role_node
+                for role_node, is_missing in role_nodes
+                if not is_missing
+            ],
+        )
 
         # Check that all running nodes are healthy
         unhealthy = [
-            node for node in nodes
-            if node.is_running and not node.is_healthy
+            running_node
+            for running_node in running_nodes
+            if not node_health[running_node]
         ]
 
         # Ensure that all roles are filled exactly once with healthy nodes
-        for aws_type, confs in self.deployment_confs.items():
-            for node_name, node_confs in confs.items():
-                node = self.get_pending_node(aws_type, node_name)
-                if not node:
-                    mock_node = self.get_blank_node(aws_type)
-                    mock_node.name = node_name
-                    unhealthy.append(mock_node)
-                    logger.info("Missing node: %s-%s" % (aws_type, node_name))
-                    continue
-                if not node.is_healthy:
-                    unhealthy.append(node)
-                    logger.info("Node unhealthy: %s" % node)
+        for node, is_missing in role_nodes:
+            if is_missing:
+                unhealthy.append(node)
+            elif not node_health[node]:
+                unhealthy.append(node)
+                logger.info("Node unhealthy: %s" % node)
 
         return unhealthy
 
@@ -477,7 +951,11 @@ class Deployment(object):
         return True
 
     def repair_active_generation(
-        self, force_operational=False, wait_until_operational=True,
+        self,
+        force_operational=False,
+        wait_until_operational=True,
+        parallel=False,
+        max_workers=REPAIR_MAX_WORKERS,
     ):
         """
         Ensure that all healthy active-generation nodes are operational.
@@ -486,9 +964,23 @@ class Deployment(object):
         will be made operational.
         ``wait_until_operational`` If False, doesn't wait for the nodes to
         become fully operational.
+        ``parallel`` If True, repair the nodes concurrently using
+        `repair_active_generation_concurrently`.
 
         Returns any nodes that were made operational by this action.
         """
+        if parallel:
+            outcomes = self.repair_active_generation_concurrently(
+                force_operational=force_operational,
+                wait_until_operational=wait_until_operational,
+                max_workers=max_workers,
+            )
+            return [
+                node
+                for node, outcome in outcomes.items()
+                if outcome in (REPAIR_MADE_OPERATIONAL, REPAIR_REQUESTED)
+            ]
+
         if self.active_is_fully_operational():
             logger.info("All active nodes are operational")
             return []
@@ -523,27 +1015,128 @@ class Deployment(object):
         if not wait_until_operational:
             return fixed_nodes
 
+        def refresh_operational_state(nodes):
+            # We're waiting on AWS to notice the changes
+            self.invalidate_operational_state()
+            return nodes
+
         logger.info("Waiting until all nodes are actually operational")
-        time_waited = 0
-        while made_operational:
-            if time_waited > MAKE_OPERATIONAL_TIMEOUT:
-                raise WaitTimedOut(
-                    "Timed out waiting on nodes: %s" % made_operational)
-            _made_operational = made_operational[:]
-            for node in _made_operational:
-                if node.is_operational:
-                    made_operational.remove(node)
-            if made_operational:
-                logger.info(
-                    "%s node(s) still not operational. Waiting %ss",
-                    len(made_operational),
-                    WAIT_TIME,
-                )
-                time.sleep(WAIT_TIME)
-                time_waited += WAIT_TIME
+        wait_for_all(
+            made_operational,
+            poll=refresh_operational_state,
+            is_ready=lambda node: node.is_operational,
+            description="nodes to become operational",
+            key=id,
+            timeout=MAKE_OPERATIONAL_TIMEOUT,
+            backoff=Backoff(max_delay=WAIT_TIME),
+        )
 
         return fixed_nodes
 
+    def repair_active_generation_concurrently(
+        self,
+        force_operational=False,
+        wait_until_operational=True,
+        max_workers=REPAIR_MAX_WORKERS,
+    ):
+        """
+        Like `repair_active_generation`, but the health checks and the calls
+        to make nodes operational all run concurrently, using up to
+        ``max_workers`` threads, and then all of the nodes are waited on
+        together. A repair takes about as long as its slowest node.
+
+        A failure to make one node operational doesn't stop the others.
+
+        Returns a dictionary mapping each inoperational node to its outcome,
+        one of the ``REPAIR_*`` values.
+        """
+        nodes = self.get_inoperational_active_nodes()
+        if not nodes:
+            logger.info("All active nodes are operational")
+            return {}
+
+        outcomes = {}
+        candidates = []
+        for node in nodes:
+            if not node.aws_id:
+                logger.warning(
+                    "Node missing: %s- %s",
+                    node.aws_type,
+                    node.name,
+                )
+                outcomes[node] = REPAIR_MISSING
+                continue
+            candidates.append(node)
+
+        if not force_operational:
+            node_health = check_node_health(candidates)
+            for node in candidates:
+                if not node_health[node]:
+                    logger.warning("Node unhealthy: %s" % node.boto_instance)
+                    outcomes[node] = REPAIR_UNHEALTHY
+            candidates = [node for node in candidates if node_health[node]]
+
+        def make_operational(node):
+            logger.info("Making node operational: %s" % node)
+            try:
+                node.make_operational(force_operational=force_operational)
+            except Exception, e:
+                logger.exception(
+                    "Failed to make node operational: %s: %s", node, e,
+                )
+                return False
+            return True
+
+        results = map_concurrently(
+            make_operational,
+            candidates,
+            max_workers=max_workers,
+        )
+        made_operational = []
+        for node, succeeded in zip(candidates, results):
+            if succeeded:
+                made_operational.append(node)
+            else:
+                outcomes[node] = REPAIR_FAILED
+
+        if not made_operational:
+            logger.info("No healthy non-operational nodes available")
+            return outcomes
+
+        if not wait_until_operational:
+            for node in made_operational:
+                outcomes[node] = REPAIR_REQUESTED
+            return outcomes
+
+        def refresh_operational_state(nodes):
+            # We're waiting on AWS to notice the changes
+            self.invalidate_operational_state()
+            return nodes
+
+        logger.info("Waiting until all nodes are actually operational")
+        pending_ids = set()
+        try:
+            wait_for_all(
+                made_operational,
+                poll=refresh_operational_state,
+                is_ready=lambda node: node.is_operational,
+                description="nodes to become operational",
+                key=id,
+                timeout=MAKE_OPERATIONAL_TIMEOUT,
+                backoff=Backoff(max_delay=WAIT_TIME),
+            )
+        except WaitTimedOut, e:
+            logger.warning("Nodes never became operational: %s", e.pending)
+            pending_ids = set(id(node) for node in e.pending)
+
+        for node in made_operational:
+            if id(node) in pending_ids:
+                outcomes[node] = REPAIR_TIMED_OUT
+            else:
+                outcomes[node] = REPAIR_MADE_OPERATIONAL
+
+        return outcomes
+
     def uses_rds(self):
         """
         Does this deployment uses rds. (is there an RDS node in the config)
@@ -552,7 +1145,7 @@ class Deployment(object):
             return False
         return True
 
-    def has_required_redundancy(self, node):
+    def has_required_redundancy(self, node, min_healthy=1, unavailable=()):
         """
         Determine whether the given ``node`` has the required level of
         redundancy so that it can be rendered inoperational without service
@@ -560,24 +1153,50 @@ class Deployment(object):
 
         Returns True if there are redundant nodes, False otherwise.
 
-        The logic is currently crude in that only one other node of the same
-        ``aws_type`` needs to be available.
+        ``min_healthy`` The number of other operational nodes that must remain
+        for each of the node's roles. Nodes without roles only need other
+        nodes of the same ``aws_type``.
+        ``unavailable`` The names of nodes that are about to be taken out of
+        operation, or already are, so don't count towards the redundancy.
         """
         all_gen_nodes = self.get_all_nodes(node.generation_id, is_running=True)
-        same_aws_nodes = [
+        other_nodes = [
             n
             for n in all_gen_nodes
+            # Don't include the node we're checking
             if n.aws_type == node.aws_type
+            and n.name != node.name
+            and n.name not in unavailable
         ]
 
-        other_operational_nodes = []
-        for other_node in same_aws_nodes:
-            # Don't include the node we're checking
-            if other_node.name != node.name:
-                if other_node.is_operational:
-                    other_operational_nodes.append(other_node)
+        roles = self._get_node_roles(node)
+        if not roles:
+            # Every node of this type is interchangeable
+            other_operational_nodes = [
+                n for n in other_nodes if n.is_operational
+            ]
+            return len(other_operational_nodes) >= min_healthy
+
+        for role in roles:
+            other_operational_nodes = [
+                n
+                for n in other_nodes
+                if role in self._get_node_roles(n) and n.is_operational
+            ]
+            if len(other_operational_nodes) < min_healthy:
+                logger.info(
+                    "Only %s other operational %s node(s) for %s",
+                    len(other_operational_nodes),
+                    role,
+                    node,
+                )
+                return False
+
+        return True
 
-        return bool(other_operational_nodes)
+    def _get_node_roles(self, node):
+        node_conf = self.deployment_confs[node.aws_type].get(node.name, {})
+        return node_conf.get('roles', [])
 
     def increment_generation(self):
         """
@@ -591,16 +1210,30 @@ class Deployment(object):
 
         active_nodes = self.get_all_active_nodes()
         pending_nodes = self.get_all_pending_nodes()
+        new_active_gen_id = self.pending_gen_id
 
         # Set is_active_generation to 0 for the active and 1 for pending
         for node in active_nodes:
             node.is_active_generation = 0
-            node.save()
         for node in pending_nodes:
             node.is_active_generation = 1
-            node.save()
-        self._active_gen_id += 1
-        self._pending_gen_id += 1
+        if self.resource_tracker is None:
+            for node in active_nodes + pending_nodes:
+                node.save()
+        else:
+            records_saved = self.resource_tracker.save_nodes(
+                self.deployment_name,
+                active_nodes + pending_nodes,
+                fields=['is_active_generation'],
+            )
+            # Only move the pointer if the records it summarizes moved too
+            if records_saved:
+                self.resource_tracker.set_active_generation_id(
+                    self.deployment_name,
+                    new_active_gen_id,
+                )
+        self._active_gen_id = new_active_gen_id
+        self._pending_gen_id = new_active_gen_id + 1
 
         logger.info("Generation succesfully incremented.")
         logger.info("Making nodes operational")
@@ -0,0 +1,855 @@
+"""
+In-memory stand-ins for the AWS services that neckbeard talks to.
+
+`FakeAWS` holds the state of a pretend AWS account (EC2 instances, elastic
+IPs, RDS instances, ELBs and SimpleDB domains) and hands out connection
+objects that mimic the parts of the boto connection APIs that neckbeard uses.
+Those connections can be passed to `Deployment` and
+`SimpleDBResourceTracker` so that actions can run end-to-end without touching
+real infrastructure.
+
+Every API call is counted in `FakeAWS.calls`, keyed by ``<service>.<action>``,
+and can be slowed down by a configurable amount of latency to approximate a
+real round trip.
+
+Newly-launched instances are ``pending`` until the next time they're
+described, when they become ``running``. Likewise, new and detaching EBS
+volumes become ``available`` once they're next described.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from boto.exception import (
+    BotoServerError,
+    EC2ResponseError,
+    SDBResponseError,
+)
+
+SELECT_RE = re.compile(
+    r'^select (?P<output_list>.+?) from `(?P<domain>(?:[^`]|``)+)`'
+    r'(?: where (?P<conditions>.+?))?'
+    r'(?: limit (?P<limit>\d+))?$'
+)
+CONDITION_RE = re.compile(r"`((?:[^`]|``)+)` = '((?:[^']|'')*)'")
+OUTPUT_NAME_RE = re.compile(r"`((?:[^`]|``)+)`")
+ERROR_BODY_TPL = (
+    '<Response><Errors><Error>'
+    '<Code>%s</Code><Message>%s</Message>'
+    '</Error></Errors></Response>'
+)
+
+
+def _build_error(error_class, status, reason, error_code):
+    """
+    Build a boto exception that parses to the given ``error_code``, as if it
+    came from a real AWS error response.
+    """
+    return error_class(
+        status,
+        reason,
+        ERROR_BODY_TPL % (error_code, reason),
+    )
+
+
+class FakeAWS(object):
+    """
+    The shared state behind all of the fake connections.
+
+    ``latency`` The number of seconds each API call takes.
+    ``service_latencies`` Optionally, a dictionary of per-service latencies
+    (eg. ``{'sdb': 0.1}``) that override ``latency``.
+    """
+    def __init__(self, latency=0, service_latencies=None):
+        self.latency = latency
+        self.service_latencies = service_latencies or {}
+
+        self.calls = defaultdict(int)
+        self._calls_lock = threading.Lock()
+        self._id_counter = 0
+
+        self.instances = {}
+        self.volumes = {}
+        self.snapshots = {}
+        self.addresses = {}
+        self.db_instances = {}
+        self.parameter_groups = {}
+        self.load_balancers = {}
+        self.sdb_domains = {}
+
+    def record_call(self, service, action):
+        with self._calls_lock:
+            self.calls['%s.%s' % (service, action)] += 1
+
+        latency = self.service_latencies.get(service, self.latency)
+        if latency:
+            time.sleep(latency)
+
+    def get_call_count(self, service=None):
+        """
+        The total number of API calls made, optionally limited to a single
+        ``service``.
+        """
+        if service is None:
+            return sum(self.calls.values())
+
+        prefix = '%s.' % service
+        return sum(
+            count for call, count in self.calls.items()
+            if call.startswith(prefix)
+        )
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    def _get_next_id(self, prefix):
+        with self._calls_lock:
+            self._id_counter += 1
+            return '%s-%08x' % (prefix, self._id_counter)
+
+    def ec2_connection(self):
+        return FakeEC2Connection(self)
+
+    def rds_connection(self):
+        return FakeRDSConnection(self)
+
+    def elb_connection(self):
+        return FakeELBConnection(self)
+
+    def sdb_connection(self):
+        return FakeSDBConnection(self)
+
+    def add_instance(
+        self, key_name, state='running', placement='us-east-1a', **kwargs
+    ):
+        instance = FakeInstance(
+            self,
+            self._get_next_id('i'),
+            key_name=key_name,
+            state=state,
+            placement=placement,
+            **kwargs
+        )
+        self.instances[instance.id] = instance
+
+        return instance
+
+    def add_volume(self, size, zone, snapshot_id=None, status='available'):
+        volume = FakeVolume(
+            self,
+            self._get_next_id('vol'),
+            size,
+            zone,
+            snapshot_id=snapshot_id,
+            status=status,
+        )
+        self.volumes[volume.id] = volume
+
+        return volume
+
+    def add_snapshot(self, volume_id=None, progress='100%', description=''):
+        snapshot = FakeSnapshot(
+            self._get_next_id('snap'),
+            volume_id=volume_id,
+            progress=progress,
+            description=description,
+        )
+        self.snapshots[snapshot.id] = snapshot
+
+        return snapshot
+
+    def add_address(self, public_ip, instance_id=None):
+        address = FakeAddress(public_ip, instance_id=instance_id)
+        self.addresses[public_ip] = address
+
+        return address
+
+    def add_db_instance(self, db_instance_id, status='available'):
+        db_instance = FakeDBInstance(self, db_instance_id, status=status)
+        self.db_instances[db_instance_id] = db_instance
+
+        return db_instance
+
+    def add_parameter_group(self, name, parameters=None):
+        """
+        Create a DB parameter group from a dictionary of ``parameters`` and
+        their ``(value, type, source, apply_type)``.
+        """
+        group = {}
+        for parameter_name, (value, type, source, apply_type) in (
+            (parameters or {}).items()
+        ):
+            group[parameter_name] = FakeParameter(
+                parameter_name,
+                value,
+                type=type,
+                source=source,
+                apply_type=apply_type,
+            )
+        self.parameter_groups[name] = group
+
+        return group
+
+    def add_load_balancer(self, name, instance_ids=None):
+        load_balancer = FakeLoadBalancer(self, name)
+        load_balancer.instance_ids.extend(instance_ids or [])
+        self.load_balancers[name] = load_balancer
+
+        return load_balancer
+
+    def add_sdb_item(self, domain_name, item_name, attributes):
+        """
+        Store an item, whose ``attributes`` are already encoded as strings,
+        directly in a SimpleDB domain.
+        """
+        domain = self.sdb_domains.setdefault(domain_name, {})
+        domain[item_name] = dict(attributes)
+
+
+class FakeInstance(object):
+    def __init__(
+        self,
+        aws,
+        instance_id,
+        key_name,
+        state='running',
+        placement='us-east-1a',
+        instance_type='m1.small',
+        image_id='ami-00000000',
+        public_dns_name=None,
+    ):
+        self._aws = aws
+        self.id = instance_id
+        self.key_name = key_name
+        self.state = state
+        self.placement = placement
+        self.instance_type = instance_type
+        self.image_id = image_id
+        if public_dns_name is None:
+            public_dns_name = '%s.compute-1.amazonaws.com' % instance_id
+        self.public_dns_name = public_dns_name
+        self.launch_time = datetime.utcnow().isoformat() + 'Z'
+
+    def __repr__(self):
+        return 'Instance:%s' % self.id
+
+    def update(self):
+        self._aws.record_call('ec2', 'DescribeInstances')
+        self._boot()
+        return self.state
+
+    def _boot(self):
+        if self.state == 'pending':
+            self.state = 'running'
+
+    def terminate(self):
+        self._aws.record_call('ec2', 'TerminateInstances')
+        self.state = 'terminated'
+
+    def use_ip(self, address):
+        self._aws.record_call('ec2', 'AssociateAddress')
+        public_ip = getattr(address, 'public_ip', address)
+        self._aws.addresses[public_ip].instance_id = self.id
+
+
+class FakeAttachmentSet(object):
+    def __init__(self):
+        self.instance_id = None
+        self.device = None
+
+
+class FakeVolume(object):
+    def __init__(
+        self, aws, volume_id, size, zone, snapshot_id=None, status='available',
+    ):
+        self._aws = aws
+        self.id = volume_id
+        self.size = size
+        self.zone = zone
+        self.snapshot_id = snapshot_id
+        self.status = status
+        self.attach_data = FakeAttachmentSet()
+
+    def __repr__(self):
+        return 'Volume:%s' % self.id
+
+    def update(self):
+        self._aws.record_call('ec2', 'DescribeVolumes')
+        self._settle()
+        return self.status
+
+    def _settle(self):
+        if self.status in ['creating', 'detaching']:
+            self.status = 'available'
+
+    def detach(self, force=False):
+        self._aws.record_call('ec2', 'DetachVolume')
+        if self.status != 'in-use':
+            raise _build_error(
+                EC2ResponseError,
+                400,
+                'Bad Request',
+                'IncorrectState',
+            )
+        self.status = 'detaching'
+        self.attach_data = FakeAttachmentSet()
+
+        return True
+
+    def delete(self):
+        self._aws.record_call('ec2', 'DeleteVolume')
+        if self.status != 'available':
+            raise _build_error(
+                EC2ResponseError,
+                400,
+                'Bad Request',
+                'VolumeInUse',
+            )
+        del self._aws.volumes[self.id]
+
+        return True
+
+
+class FakeSnapshot(object):
+    def __init__(
+        self, snapshot_id, volume_id=None, progress='100%', description='',
+    ):
+        self.id = snapshot_id
+        self.volume_id = volume_id
+        self.progress = progress
+        self.description = description
+
+    @property
+    def status(self):
+        if self.progress == '100%':
+            return 'completed'
+        return 'pending'
+
+    def __repr__(self):
+        return 'Snapshot:%s' % self.id
+
+
+class FakeReservation(object):
+    def __init__(self, instances):
+        self.instances = instances
+
+
+class FakeAddress(object):
+    def __init__(self, public_ip, instance_id=None):
+        self.public_ip = public_ip
+        self.instance_id = instance_id
+
+    def __repr__(self):
+        return 'Address:%s' % self.public_ip
+
+
+class FakeEC2Connection(object):
+    def __init__(self, aws):
+        self._aws = aws
+        self.aws_access_key_id = 'fake-access-key-id'
+        self.aws_secret_access_key = 'fake-secret-access-key'
+
+    def get_all_instances(self, instance_ids=None, filters=None):
+        self._aws.record_call('ec2', 'DescribeInstances')
+        if filters and 'instance-id' in filters:
+            instance_ids = filters['instance-id']
+        if instance_ids is None:
+            instances = self._aws.instances.values()
+        else:
+            instances = [
+                self._aws.instances[instance_id]
+                for instance_id in instance_ids
+                if instance_id in self._aws.instances
+            ]
+        for instance in instances:
+            instance._boot()
+
+        return [FakeReservation([instance]) for instance in instances]
+
+    def run_instances(
+        self,
+        image_id,
+        min_count=1,
+        max_count=1,
+        key_name=None,
+        placement=None,
+        instance_type='m1.small',
+        **kwargs
+    ):
+        self._aws.record_call('ec2', 'RunInstances')
+        instances = []
+        for _ in range(max_count):
+            instance = self._aws.add_instance(
+                key_name,
+                state='pending',
+                placement=placement,
+                instance_type=instance_type,
+                image_id=image_id,
+            )
+            instances.append(instance)
+
+        return FakeReservation(instances)
+
+    def create_volume(self, size, zone, snapshot=None):
+        self._aws.record_call('ec2', 'CreateVolume')
+        return self._aws.add_volume(
+            size,
+            zone,
+            snapshot_id=snapshot,
+            status='creating',
+        )
+
+    def get_all_volumes(self, volume_ids=None):
+        self._aws.record_call('ec2', 'DescribeVolumes')
+        if volume_ids is None:
+            volumes = self._aws.volumes.values()
+        else:
+            volumes = [
+                self._aws.volumes[volume_id]
+                for volume_id in volume_ids
+                if volume_id in self._aws.volumes
+            ]
+        for volume in volumes:
+            volume._settle()
+
+        return volumes
+
+    def get_all_snapshots(self, snapshot_ids=None, **kwargs):
+        self._aws.record_call('ec2', 'DescribeSnapshots')
+        if snapshot_ids is None:
+            return self._aws.snapshots.values()
+
+        for snapshot_id in snapshot_ids:
+            if snapshot_id not in self._aws.snapshots:
+                raise _build_error(
+                    EC2ResponseError,
+                    400,
+                    'Bad Request',
+                    'InvalidSnapshot.NotFound',
+                )
+
+        return [
+            self._aws.snapshots[snapshot_id] for snapshot_id in snapshot_ids
+        ]
+
+    def attach_volume(self, volume_id, instance_id, device):
+        self._aws.record_call('ec2', 'AttachVolume')
+        volume = self._aws.volumes[volume_id]
+        if volume.status != 'available':
+            raise _build_error(
+                EC2ResponseError,
+                400,
+                'Bad Request',
+                'IncorrectState',
+            )
+        volume.status = 'in-use'
+        volume.attach_data.instance_id = instance_id
+        volume.attach_data.device = device
+
+        return True
+
+    def detach_volume(self, volume_id, force=False):
+        return self._aws.volumes[volume_id].detach(force=force)
+
+    def get_all_addresses(self, addresses=None):
+        self._aws.record_call('ec2', 'DescribeAddresses')
+        if addresses is None:
+            return self._aws.addresses.values()
+
+        # Like EC2, one unknown address fails the whole request
+        for public_ip in addresses:
+            if public_ip not in self._aws.addresses:
+                raise _build_error(
+                    EC2ResponseError,
+                    400,
+                    'Bad Request',
+                    'InvalidAddress.NotFound',
+                )
+
+        return [self._aws.addresses[public_ip] for public_ip in addresses]
+
+    def associate_address(self, instance_id, public_ip):
+        self._aws.record_call('ec2', 'AssociateAddress')
+        self._aws.addresses[public_ip].instance_id = instance_id
+
+        return True
+
+    def disassociate_address(self, public_ip):
+        self._aws.record_call('ec2', 'DisassociateAddress')
+        self._aws.addresses[public_ip].instance_id = None
+
+        return True
+
+
+class FakeDBInstance(object):
+    def __init__(self, aws, db_instance_id, status='available'):
+        self._aws = aws
+        self.id = db_instance_id
+        self.status = status
+        self.create_time = datetime.utcnow().isoformat() + 'Z'
+        self.endpoint = ('%s.rds.amazonaws.com' % db_instance_id, 3306)
+        self.master_username = 'root'
+
+    def __repr__(self):
+        return 'DBInstance:%s' % self.id
+
+    def update(self):
+        self._aws.record_call('rds', 'DescribeDBInstances')
+        return self.status
+
+    def stop(self, skip_final_snapshot=False, final_snapshot_id=''):
+        self._aws.record_call('rds', 'DeleteDBInstance')
+        self.status = 'deleted'
+
+
+class FakeParameter(object):
+    def __init__(
+        self, name, value, type='string', source='engine-default',
+        apply_type='dynamic',
+    ):
+        self.name = name
+        self.value = value
+        self.type = type
+        self.source = source
+        self.apply_type = apply_type
+        self.allowed_values = None
+
+    def __repr__(self):
+        return 'Parameter:%s' % self.name
+
+
+class FakeParameterGroup(dict):
+    def __init__(self, parameters, marker=None):
+        super(FakeParameterGroup, self).__init__(
+            (parameter.name, parameter) for parameter in parameters
+        )
+        if marker is not None:
+            self.Marker = marker
+
+
+class FakeRDSConnection(object):
+    # RDS won't modify more parameters than this in one request
+    MAX_MODIFIED_PARAMETERS = 20
+
+    def __init__(self, aws):
+        self._aws = aws
+
+    def _get_parameter_group(self, name):
+        if name not in self._aws.parameter_groups:
+            raise _build_error(
+                BotoServerError,
+                404,
+                'Not Found',
+                'DBParameterGroupNotFound',
+            )
+
+        return self._aws.parameter_groups[name]
+
+    def get_all_dbinstances(self, instance_id=None, marker=None):
+        self._aws.record_call('rds', 'DescribeDBInstances')
+        if instance_id is None:
+            return self._aws.db_instances.values()
+
+        if instance_id not in self._aws.db_instances:
+            raise _build_error(
+                BotoServerError,
+                404,
+                'Not Found',
+                'DBInstanceNotFound',
+            )
+
+        return [self._aws.db_instances[instance_id]]
+
+    def get_all_dbparameters(
+        self, groupname, source=None, max_records=None, marker=None,
+    ):
+        """
+        Pages through the parameters in name order. The ``marker`` is the
+        index of the first parameter on the page.
+        """
+        self._aws.record_call('rds', 'DescribeDBParameters')
+        group = self._get_parameter_group(groupname)
+        parameters = [
+            group[name] for name in sorted(group)
+            if source is None or group[name].source == source
+        ]
+
+        start = int(marker or 0)
+        end = len(parameters)
+        if max_records is not None:
+            end = min(end, start + max_records)
+        next_marker = None
+        if end < len(parameters):
+            next_marker = str(end)
+
+        return FakeParameterGroup(parameters[start:end], marker=next_marker)
+
+    def create_parameter_group(self, name, engine='MySQL5.1', description=''):
+        self._aws.record_call('rds', 'CreateDBParameterGroup')
+        if name in self._aws.parameter_groups:
+            raise _build_error(
+                BotoServerError,
+                400,
+                'Bad Request',
+                'DBParameterGroupAlreadyExists',
+            )
+
+        return self._aws.add_parameter_group(name)
+
+    def modify_parameter_group(self, name, parameters):
+        self._aws.record_call('rds', 'ModifyDBParameterGroup')
+        group = self._get_parameter_group(name)
+        if len(parameters) > self.MAX_MODIFIED_PARAMETERS:
+            raise _build_error(
+                BotoServerError,
+                400,
+                'Bad Request',
+                'InvalidParameterValue',
+            )
+
+        for parameter in parameters:
+            if parameter.name not in group:
+                group[parameter.name] = FakeParameter(
+                    parameter.name,
+                    None,
+                    type=parameter.type,
+                )
+            group[parameter.name].value = parameter.value
+            group[parameter.name].source = 'user'
+
+
+class FakeInstanceInfo(object):
+    def __init__(self, instance_id):
+        self.id = instance_id
+
+
+class FakeInstanceState(object):
+    def __init__(self, instance_id, state):
+        self.instance_id = instance_id
+        self.state = state
+
+
+class FakeLoadBalancer(object):
+    def __init__(self, aws, name):
+        self._aws = aws
+        self.name = name
+        self.instance_ids = []
+        # Instance ids that aren't passing the ELB health check
+        self.out_of_service_ids = set()
+
+    def __repr__(self):
+        return 'LoadBalancer:%s' % self.name
+
+    @property
+    def instances(self):
+        return [
+            FakeInstanceInfo(instance_id)
+            for instance_id in self.instance_ids
+        ]
+
+    def get_instance_health(self, instances=None):
+        self._aws.record_call('elb', 'DescribeInstanceHealth')
+        if instances is None:
+            instances = self.instance_ids
+
+        states = []
+        for instance_id in instances:
+            if instance_id in self.out_of_service_ids:
+                state = 'OutOfService'
+            elif instance_id not in self.instance_ids:
+                state = 'Unknown'
+            else:
+                state = 'InService'
+            states.append(FakeInstanceState(instance_id, state))
+
+        return states
+
+    def register_instances(self, instances):
+        self._aws.record_call('elb', 'RegisterInstancesWithLoadBalancer')
+        for instance_id in instances:
+            if instance_id not in self.instance_ids:
+                self.instance_ids.append(instance_id)
+
+        return self.instances
+
+    def deregister_instances(self, instances):
+        self._aws.record_call('elb', 'DeregisterInstancesFromLoadBalancer')
+        for instance_id in instances:
+            if instance_id in self.instance_ids:
+                self.instance_ids.remove(instance_id)
+
+        return self.instances
+
+
+class FakeELBConnection(object):
+    def __init__(self, aws):
+        self._aws = aws
+
+    def get_all_load_balancers(self, load_balancer_names=None):
+        self._aws.record_call('elb', 'DescribeLoadBalancers')
+        if load_balancer_names is None:
+            return self._aws.load_balancers.values()
+
+        for name in load_balancer_names:
+            if name not in self._aws.load_balancers:
+                raise _build_error(
+                    BotoServerError,
+                    400,
+                    'Bad Request',
+                    'LoadBalancerNotFound',
+                )
+
+        return [self._aws.load_balancers[name] for name in load_balancer_names]
+
+
+class FakeSDBDomain(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeSDBItem(dict):
+    def __init__(self, name, attributes):
+        super(FakeSDBItem, self).__init__(attributes)
+        self.name = name
+
+
+class FakeSDBResultSet(list):
+    def __init__(self, items, next_token=None):
+        super(FakeSDBResultSet, self).__init__(items)
+        self.next_token = next_token
+
+
+class FakeSDBConnection(object):
+    """
+    Supports the subset of the SimpleDB select syntax that the
+    `SimpleDBResourceTracker` generates: an output list, equality conditions
+    joined with ``and`` and a ``limit``.
+    """
+    def __init__(self, aws):
+        self._aws = aws
+        # The query expression and read consistency of each select
+        self.selects = []
+
+    def _get_domain_items(self, domain):
+        domain_name = getattr(domain, 'name', domain)
+        if domain_name not in self._aws.sdb_domains:
+            raise _build_error(
+                SDBResponseError,
+                400,
+                'Bad Request',
+                'NoSuchDomain',
+            )
+
+        return self._aws.sdb_domains[domain_name]
+
+    def get_domain(self, domain_name, validate=True):
+        if validate:
+            self._aws.record_call('sdb', 'Select')
+            if domain_name not in self._aws.sdb_domains:
+                raise _build_error(
+                    SDBResponseError,
+                    400,
+                    'Bad Request',
+                    'NoSuchDomain',
+                )
+
+        return FakeSDBDomain(domain_name)
+
+    def create_domain(self, domain_name):
+        self._aws.record_call('sdb', 'CreateDomain')
+        self._aws.sdb_domains.setdefault(domain_name, {})
+
+        return FakeSDBDomain(domain_name)
+
+    def select(self, domain, query, next_token=None, consistent_read=False):
+        self._aws.record_call('sdb', 'Select')
+        self.selects.append((query, consistent_read))
+
+        match = SELECT_RE.match(query)
+        if match is None:
+            raise _build_error(
+                SDBResponseError,
+                400,
+                'Bad Request',
+                'InvalidQueryExpression',
+            )
+        # Like the real thing, we query the domain named in the expression
+        items = self._get_domain_items(
+            match.group('domain').replace('``', '`'),
+        )
+
+        conditions = []
+        if match.group('conditions'):
+            conditions = [
+                (name.replace('``', '`'), value.replace("''", "'"))
+                for name, value in CONDITION_RE.findall(
+                    match.group('conditions'),
+                )
+            ]
+
+        output_names = None
+        if match.group('output_list') != '*':
+            output_names = [
+                name.replace('``', '`')
+                for name in OUTPUT_NAME_RE.findall(match.group('output_list'))
+            ]
+
+        matching = []
+        for item_name in sorted(items.keys()):
+            attributes = items[item_name]
+            is_match = all(
+                attributes.get(name) == value for name, value in conditions
+            )
+            if is_match:
+                if output_names is not None:
+                    attributes = dict(
+                        (name, attributes[name])
+                        for name in output_names
+                        if name in attributes
+                    )
+                matching.append(FakeSDBItem(item_name, attributes))
+
+        start = int(next_token or 0)
+        limit = int(match.group('limit') or len(matching) or 1)
+        page = matching[start:start + limit]
+        if start + limit < len(matching):
+            next_token = str(start + limit)
+        else:
+            next_token = None
+
+        return FakeSDBResultSet(page, next_token=next_token)
+
+    def get_attributes(
+        self,
+        domain,
+        item_name,
+        attribute_names=None,
+        consistent_read=False,
+    ):
+        self._aws.record_call('sdb', 'GetAttributes')
+        attributes = self._get_domain_items(domain).get(item_name, {})
+        if attribute_names is not None:
+            attributes = dict(
+                (name, value) for name, value in attributes.items()
+                if name in attribute_names
+            )
+
+        return attributes
+
+    def put_attributes(self, domain, item_name, attributes, replace=True):
+        self._aws.record_call('sdb', 'PutAttributes')
+        items = self._get_domain_items(domain)
+        if replace or item_name not in items:
+            items.setdefault(item_name, {}).update(attributes)
+
+        return True
+
+    def batch_put_attributes(self, domain, items, replace=True):
+        self._aws.record_call('sdb', 'BatchPutAttributes')
+        domain_items = self._get_domain_items(domain)
+        for item_name, attributes in items.items():
+            domain_items.setdefault(item_name, {}).update(attributes)
+
+        return True
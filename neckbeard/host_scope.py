@@ -0,0 +1,381 @@
+"""
+Running Fabric commands against many hosts at once, from threads.
+
+Fabric keeps the host that commands run against (``env.host_string``) and
+everything else about them in the global ``env`` and ``output`` dictionaries,
+which normally limits a process to one host at a time. `host_scope` gives the
+current thread its own copy of both for the duration of a block, so that
+threads can each point commands at their own node without stepping on each
+other. Remote output written inside a scope can also be buffered and printed
+as one block at the end, so that concurrent hosts' output isn't interleaved.
+Code that might run inside such a scope should ask the user questions with
+this module's `prompt`, which is never buffered.
+
+Only while at least one scope is open, ``env``, ``output`` and Fabric's
+connection cache are patched to be thread-aware and ``sys.stdout`` is
+wrapped. When the last scope closes, the patching is undone.
+"""
+import logging
+import sys
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from fabric import state
+from fabric.network import normalize, normalize_to_string
+from fabric.operations import prompt as fabric_prompt
+
+from neckbeard.concurrency import DEFAULT_MAX_WORKERS, map_concurrently
+
+logger = logging.getLogger('host_scope')
+
+# Each thread's stack of active scopes
+_local = threading.local()
+# Only one thread prints its buffered output at a time
+_output_lock = threading.Lock()
+# Only one thread asks the user for input at a time
+_prompt_lock = threading.Lock()
+_install_lock = threading.Lock()
+# The number of scopes open across all threads, while Fabric is patched
+_install_count = 0
+# The patched objects and their original classes, to restore
+_original_classes = []
+# The thread-aware class built for each of the original classes
+_patched_classes = {}
+# Only one thread connects to any given host at a time
+_connect_locks = defaultdict(threading.RLock)
+_connect_locks_lock = threading.Lock()
+
+# The dictionary methods that read or write through to a thread's scope
+SCOPED_METHODS = [
+    '__contains__',
+    '__delitem__',
+    '__getitem__',
+    '__iter__',
+    '__len__',
+    'clear',
+    'copy',
+    'get',
+    'has_key',
+    'items',
+    'iteritems',
+    'iterkeys',
+    'itervalues',
+    'keys',
+    'pop',
+    'popitem',
+    'setdefault',
+    'update',
+    'values',
+]
+
+
+class _Scope(object):
+    def __init__(self, values, buffer, label=None):
+        # Maps the id of each scoped dictionary to this scope's copy of it
+        self.values = values
+        # The list that output is buffered in, if any
+        self.buffer = buffer
+        # The name the buffered output is printed under
+        self.label = label
+
+
+def _get_current_scope():
+    scopes = getattr(_local, 'scopes', None)
+    if not scopes:
+        return None
+    return scopes[-1]
+
+
+def _copy_containers(value):
+    """
+    Copy ``value`` along with any dictionaries, lists and sets nested in it,
+    so that a scope can change settings like ``env.pstat_settings`` without
+    affecting other scopes. Anything else is shared, since it may not be
+    copyable.
+    """
+    if isinstance(value, dict):
+        copied = dict(
+            (key, _copy_containers(item)) for key, item in value.items()
+        )
+        if type(value) is dict:
+            return copied
+        # Keep subclasses like Fabric's `_AttributeDict`
+        try:
+            return type(value)(copied)
+        except TypeError:
+            return copied
+    if isinstance(value, list):
+        return [_copy_containers(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return type(value)(value)
+    return value
+
+
+def _scoped_method(name):
+    def method(self, *args, **kwargs):
+        values = self._get_scoped_values()
+        if values is None:
+            return getattr(super(HostScopedDict, self), name)(*args, **kwargs)
+        return getattr(values, name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class HostScopedDict(object):
+    """
+    Mixed in to Fabric's ``env`` and ``output`` dictionaries while scopes are
+    open, so that inside a `host_scope` they read and write the scope's copy.
+    """
+    __slots__ = ()
+
+    def _get_scoped_values(self):
+        scope = _get_current_scope()
+        if scope is None:
+            return None
+        return scope.values.get(id(self))
+
+    def _copy_values(self):
+        values = self._get_scoped_values()
+        if values is None:
+            values = dict.copy(self)
+        return _copy_containers(values)
+
+    def __setitem__(self, key, value):
+        values = self._get_scoped_values()
+        if values is None:
+            return super(HostScopedDict, self).__setitem__(key, value)
+
+        # Like `fabric.utils._AliasDict`, setting an alias sets its keys
+        aliases = self.__dict__.get('aliases')
+        if aliases and key in aliases:
+            for aliased in aliases[key]:
+                self[aliased] = value
+        else:
+            values[key] = value
+
+    def __repr__(self):
+        return repr(self._copy_values())
+
+
+for _name in SCOPED_METHODS:
+    setattr(HostScopedDict, _name, _scoped_method(_name))
+
+
+class _ThreadBufferedStream(object):
+    """
+    Stands in for ``sys.stdout``, sending writes to the current scope's
+    buffer if it has one.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        scope = _get_current_scope()
+        if scope is None or scope.buffer is None:
+            self.stream.write(data)
+        else:
+            scope.buffer.append(data)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class LockedConnectionCache(object):
+    """
+    Mixed in to Fabric's connection cache while scopes are open, so that
+    threads that need the same host at once share a single new connection.
+    """
+    __slots__ = ()
+
+    def connect(self, key):
+        with _get_connect_lock(key):
+            return super(LockedConnectionCache, self).connect(key)
+
+    def __getitem__(self, key):
+        with _get_connect_lock(key):
+            return super(LockedConnectionCache, self).__getitem__(key)
+
+
+def _get_connect_lock(key):
+    with _connect_locks_lock:
+        return _connect_locks[normalize_to_string(key)]
+
+
+def _get_scoped_dicts():
+    return [state.env, state.output]
+
+
+def _patch_class(obj, mixin):
+    base = type(obj)
+    if base not in _patched_classes:
+        _patched_classes[base] = type(
+            'Patched%s' % base.__name__.lstrip('_'),
+            (mixin, base),
+            {},
+        )
+    _original_classes.append((obj, base))
+    # Fabric's dictionaries turn attribute assignment in to keys
+    dict.__setattr__(obj, '__class__', _patched_classes[base])
+
+
+def _install():
+    global _install_count
+    with _install_lock:
+        _install_count += 1
+        if _install_count > 1:
+            return
+        for scoped_dict in _get_scoped_dicts():
+            _patch_class(scoped_dict, HostScopedDict)
+        _patch_class(state.connections, LockedConnectionCache)
+        sys.stdout = _ThreadBufferedStream(sys.stdout)
+
+
+def _uninstall():
+    global _install_count
+    with _install_lock:
+        _install_count -= 1
+        if _install_count > 0:
+            return
+        while _original_classes:
+            obj, base = _original_classes.pop()
+            dict.__setattr__(obj, '__class__', base)
+        if isinstance(sys.stdout, _ThreadBufferedStream):
+            sys.stdout = sys.stdout.stream
+
+
+def is_installed():
+    """
+    Is Fabric currently patched for open scopes?
+    """
+    with _install_lock:
+        return _install_count > 0
+
+
+@contextmanager
+def host_scope(host_string=None, buffer_output=False, label=None, **values):
+    """
+    Run the block with the current thread's own copy of Fabric's ``env`` and
+    ``output``, starting from their current values. Changes made inside the
+    block never affect other threads, and are discarded when it ends.
+
+    ``host_string`` Optionally, the host to point commands at.
+    ``buffer_output`` Hold on to everything written to ``sys.stdout`` in the
+    block (including remote command output) and print it all at once at the
+    end.
+    ``label`` A name for the buffered output. Defaults to ``host_string``.
+
+    Any other keyword arguments are set in the scope's ``env``.
+
+    Fabric's classes and ``sys.stdout`` are patched when the first scope
+    opens, and restored once no thread has a scope open.
+    """
+    _install()
+    try:
+        with _open_scope(host_string, buffer_output, label, values):
+            yield
+    finally:
+        _uninstall()
+
+
+@contextmanager
+def _open_scope(host_string, buffer_output, label, values):
+    if host_string is not None:
+        values['host_string'] = host_string
+        values['host'] = normalize(host_string)[1]
+
+    parent = _get_current_scope()
+    buffer = None
+    if parent is not None:
+        buffer = parent.buffer
+    owns_buffer = buffer_output and buffer is None
+    if owns_buffer:
+        buffer = []
+        label = label or host_string
+    elif parent is not None:
+        label = parent.label
+
+    scope = _Scope(
+        dict(
+            (id(scoped_dict), scoped_dict._copy_values())
+            for scoped_dict in _get_scoped_dicts()
+        ),
+        buffer,
+        label=label,
+    )
+    scope.values[id(state.env)].update(values)
+
+    if not hasattr(_local, 'scopes'):
+        _local.scopes = []
+    _local.scopes.append(scope)
+    try:
+        yield
+    finally:
+        _local.scopes.pop()
+        if owns_buffer and buffer:
+            _write_buffer(label, buffer)
+
+
+def _write_buffer(label, buffer):
+    output = ''.join(buffer)
+    with _output_lock:
+        stream = sys.stdout
+        if label:
+            stream.write("----- %s -----\n" % label)
+        stream.write(output)
+        if not output.endswith('\n'):
+            stream.write('\n')
+        stream.flush()
+
+
+def prompt(*args, **kwargs):
+    """
+    Like Fabric's `prompt`, but safe to use inside a scope that buffers its
+    output. The output buffered so far is printed first, so that the user has
+    the context for the question, then the prompt is written straight to the
+    terminal. Only one thread prompts at a time.
+    """
+    with _prompt_lock:
+        scope = _get_current_scope()
+        if scope is None or scope.buffer is None:
+            return fabric_prompt(*args, **kwargs)
+
+        buffer = scope.buffer
+        scope.buffer = None
+        try:
+            if buffer:
+                _write_buffer(scope.label, buffer)
+                del buffer[:]
+            return fabric_prompt(*args, **kwargs)
+        finally:
+            scope.buffer = buffer
+
+
+def run_on_hosts(
+    func,
+    host_strings,
+    max_workers=DEFAULT_MAX_WORKERS,
+    **values
+):
+    """
+    Call ``func`` with each of ``host_strings`` concurrently, each in its own
+    `host_scope` pointed at that host with its output buffered.
+
+    Any other keyword arguments are set in every scope's ``env``.
+
+    Returns a dictionary of each host string and ``func``'s result.
+    """
+    host_strings = list(host_strings)
+
+    def run_on_host(host_string):
+        with host_scope(host_string, buffer_output=True, **values):
+            return func(host_string)
+
+    logger.info("Running on %s host(s)", len(host_strings))
+    results = map_concurrently(
+        run_on_host,
+        host_strings,
+        max_workers=max_workers,
+    )
+    return dict(zip(host_strings, results))
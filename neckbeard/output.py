@@ -35,6 +35,14 @@ LOGGERS = [
     'environment_manager',
     'actions.view',
     'actions.up',
+    'resource_tracker',
+    'concurrency',
+    'waiters',
+    'connections',
+    'snapshot',
+    'scheduler',
+    'ssh',
+    'host_scope',
     'timer',
 ]
 
@@ -1,10 +1,28 @@
+import json
+import logging
+import os.path
+import time
+
 import simpledb
+from boto.exception import SDBResponseError
+from boto.sdb.connection import SDBConnection
+from simpledb import models
 from simpledb.models import FieldEncoder
 
+from neckbeard.cloud_resource import NodeRecord
 # This is a hack so that we can patch the `InfrastructureNode` object in the
 # correct place for the SimpleDBResourceTracker. Once we can stop doing this
 # evil, this import should be from the proper place
 from neckbeard.environment_manager import InfrastructureNode
+from neckbeard.resource_tracker.cache import TrackerCache
+
+logger = logging.getLogger('resource_tracker')
+
+DEFAULT_CACHE_DIR = '~/.neckbeard/cache'
+# SimpleDB won't return more than this many items in a single Select response
+MAX_PAGE_SIZE = 2500
+# Nor accept more than this many items in a single BatchPutAttributes request
+MAX_BATCH_PUT_SIZE = 25
 
 
 def build_tracker_from_config(configuration_manager):
@@ -38,17 +56,182 @@ class ResourceTrackerBase(object):
     configuration from `neckbeard_meta.resource_tracker.init`.
     """
 
+    def filter_nodes(
+        self,
+        deployment_name,
+        consistent_read=None,
+        page_size=None,
+        **filters
+    ):
+        """
+        Return a list of the node records for the given deployment that match
+        all of the given field ``filters``. Records may be `NodeRecord`
+        objects, which promote themselves to full `InfrastructureNode`
+        objects as needed.
+
+        ``consistent_read`` and ``page_size`` override the tracker's defaults
+        for this query only.
+        """
+        raise NotImplementedError()
+
+    def filter_node_values(
+        self,
+        deployment_name,
+        fields,
+        consistent_read=None,
+        page_size=None,
+        **filters
+    ):
+        """
+        Like ``filter_nodes``, but only fetch the given ``fields`` and return
+        them as a list of dictionaries. Useful when we just need ids.
+        """
+        raise NotImplementedError()
+
+    def get_active_generation_id(self, deployment_name):
+        """
+        Return the active generation id recorded in the deployment's
+        generation pointer, or None if no pointer has been recorded.
+        """
+        return None
+
+    def set_active_generation_id(self, deployment_name, generation_id):
+        """
+        Record ``generation_id`` as the deployment's active generation.
+        """
+        pass
+
+    def get_seed_snapshots(self, seed_key):
+        """
+        Return the dictionary of snapshot ids recorded for ``seed_key`` by
+        `set_seed_snapshots`, or None if nothing recent enough was recorded.
+        """
+        return None
+
+    def set_seed_snapshots(self, seed_key, snapshots):
+        """
+        Record the ``snapshots`` (a dictionary of names and snapshot ids)
+        just taken of the seed data identified by ``seed_key``, so that other
+        deployments seeded from the same data can re-use them.
+        """
+        pass
+
+    def save_nodes(self, deployment_name, nodes, fields=None):
+        """
+        Write the records for all of the given ``nodes`` from the deployment
+        together, rather than saving them one at a time.
+
+        ``fields`` Optionally, only write these fields.
+
+        Returns True if the records were actually written.
+        """
+        for node in nodes:
+            node.save()
+
+    def invalidate_cache(self, deployment_name):
+        """
+        Forget any locally-cached records for the given deployment. Called
+        whenever one of that deployment's records is written.
+        """
+        pass
+
+    def log_stats(self):
+        """
+        Output any statistics gathered about the tracker's usage.
+        """
+        pass
+
 
 class SimpleDBResourceTracker(ResourceTrackerBase):
+    """
+    Track resources in a SimpleDB domain.
+
+    ``cache_ttl`` Optionally, the number of seconds for which query results
+    are cached locally. Defaults to 0, which disables caching.
+    ``cache_path`` Where to store the local cache so that it's shared between
+    runs. Defaults to a file named after the domain in `DEFAULT_CACHE_DIR`.
+    ``consistent_read`` Whether queries should use SimpleDB consistent reads
+    by default. Consistent reads never return stale records, but are slower.
+    ``page_size`` The maximum number of records to request per round trip.
+    Defaults to the SimpleDB maximum of `MAX_PAGE_SIZE`.
+    ``sdbconn`` Optionally, an already-built boto `SDBConnection` (or a
+    stand-in like `neckbeard.fake_aws.FakeSDBConnection`) to query through
+    instead of connecting with the given credentials.
+    ``write_node_records`` Whether `save_nodes` and
+    `set_active_generation_id` actually write to the domains. Like
+    `InfrastructureNode.save`, they default to no-ops until writing node
+    records is well-tested.
+    ``seed_snapshot_max_age`` Optionally, the number of seconds for which
+    seed snapshots taken for one deployment are re-used by other deployments
+    seeded from the same node. Defaults to 0, which always takes new
+    snapshots.
 
-    def __init__(self, domain, aws_access_key_id, aws_secret_access_key):
+    Besides the node records in ``domain``, a small ``<domain>-meta`` domain
+    holds one generation pointer item per deployment so that the active
+    generation can be read with a single keyed get. It also holds the
+    recently-taken seed snapshots.
+    """
+
+    def __init__(
+        self,
+        domain,
+        aws_access_key_id,
+        aws_secret_access_key,
+        cache_ttl=0,
+        cache_path=None,
+        consistent_read=False,
+        page_size=MAX_PAGE_SIZE,
+        sdbconn=None,
+        write_node_records=False,
+        seed_snapshot_max_age=0,
+        clock=time.time,
+    ):
         self.domain = domain
+        self.meta_domain = '%s-meta' % domain
         self.aws_access_key_id = aws_access_key_id
         self.aws_secret_access_key = aws_secret_access_key
+        self.consistent_read = consistent_read
+        self.page_size = page_size
+        self.write_node_records = write_node_records
+        self.seed_snapshot_max_age = seed_snapshot_max_age
+        self._clock = clock
+
+        # The number of SimpleDB requests made for node queries
+        self.request_count = 0
+
+        self.cache = None
+        if cache_ttl:
+            if cache_path is None:
+                cache_path = os.path.join(
+                    DEFAULT_CACHE_DIR,
+                    '%s.json' % domain,
+                )
+            self.cache = TrackerCache(
+                ttl=cache_ttl,
+                path=os.path.expanduser(cache_path),
+            )
+
+        self.initialize_backend(sdbconn)
 
-        self.initialize_backend()
+    def initialize_backend(self, sdbconn=None):
+        if sdbconn is None:
+            self._initialize_orm()
+            # The `simpledb` ORM doesn't give us control over read consistency
+            # or page size, so queries go through boto directly
+            sdbconn = SDBConnection(
+                self.aws_access_key_id,
+                self.aws_secret_access_key,
+            )
+        self.sdbconn = sdbconn
+        self.sdb_domain = self.sdbconn.get_domain(self.domain, validate=False)
 
-    def initialize_backend(self):
+        # The meta domain is created the first time we write to it
+        self.sdb_meta_domain = self.sdbconn.get_domain(
+            self.meta_domain,
+            validate=False,
+        )
+
+    def _initialize_orm(self):
         simpledbconn = simpledb.SimpleDB(
             # Evidently the connection can't deal with unicode keys
             str(self.aws_access_key_id),
@@ -83,3 +266,318 @@ class SimpleDBResourceTracker(ResourceTrackerBase):
         SimpleDBMeta.domain = domain
 
         InfrastructureNode.Meta = SimpleDBMeta
+
+    def filter_nodes(
+        self,
+        deployment_name,
+        consistent_read=None,
+        page_size=None,
+        **filters
+    ):
+        # A consistent read is a request for the latest data, so don't answer
+        # it from the cache
+        use_cache = self.cache is not None and not consistent_read
+        if use_cache:
+            records = self.cache.get(deployment_name, filters)
+            if records is not None:
+                return [NodeRecord(**record) for record in records]
+
+        records = self._select(
+            deployment_name,
+            filters,
+            consistent_read=consistent_read,
+            page_size=page_size,
+        )
+        if self.cache is not None:
+            self.cache.set(deployment_name, filters, records)
+
+        return [NodeRecord(**record) for record in records]
+
+    def filter_node_values(
+        self,
+        deployment_name,
+        fields,
+        consistent_read=None,
+        page_size=None,
+        **filters
+    ):
+        return self._select(
+            deployment_name,
+            filters,
+            fields=fields,
+            consistent_read=consistent_read,
+            page_size=page_size,
+        )
+
+    def _select(
+        self,
+        deployment_name,
+        filters,
+        fields=None,
+        consistent_read=None,
+        page_size=None,
+    ):
+        """
+        Run a Select for the matching records, following pagination, and
+        return them as a list of dictionaries of decoded field values.
+        """
+        if consistent_read is None:
+            consistent_read = self.consistent_read
+        if page_size is None:
+            page_size = self.page_size
+
+        filters = dict(filters)
+        filters['deployment_name'] = deployment_name
+        expression = self._build_select_expression(
+            filters,
+            fields,
+            min(page_size, MAX_PAGE_SIZE),
+        )
+
+        records = []
+        next_token = None
+        while True:
+            items = self.sdbconn.select(
+                self.sdb_domain,
+                expression,
+                next_token=next_token,
+                consistent_read=consistent_read,
+            )
+            self.request_count += 1
+            records.extend(self._decode_item(item) for item in items)
+
+            next_token = items.next_token
+            if not next_token:
+                break
+
+        return records
+
+    def _build_select_expression(self, filters, fields, page_size):
+        def _quote_name(name):
+            return '`%s`' % name.replace('`', '``')
+
+        def _quote_value(value):
+            return "'%s'" % value.replace("'", "''")
+
+        if fields:
+            output_list = ', '.join(_quote_name(field) for field in fields)
+        else:
+            output_list = '*'
+
+        conditions = []
+        for field_name, value in sorted(filters.items()):
+            encoded_value = InfrastructureNode.fields[field_name].encode(value)
+            conditions.append(
+                '%s = %s' % (
+                    _quote_name(field_name),
+                    _quote_value(encoded_value),
+                )
+            )
+
+        expression = 'select %s from %s' % (
+            output_list,
+            _quote_name(self.domain),
+        )
+        if conditions:
+            expression += ' where %s' % ' and '.join(conditions)
+        expression += ' limit %s' % page_size
+
+        return expression
+
+    def _decode_item(self, item):
+        record = {}
+        for field_name, field in InfrastructureNode.fields.items():
+            if isinstance(field, models.ItemName):
+                record[field_name] = item.name
+            elif field_name in item:
+                record[field_name] = field.decode(item[field_name])
+
+        return record
+
+    def _get_generation_pointer_name(self, deployment_name):
+        return 'generation-pointer:%s' % deployment_name
+
+    def get_active_generation_id(self, deployment_name):
+        try:
+            attributes = self.sdbconn.get_attributes(
+                self.sdb_meta_domain,
+                self._get_generation_pointer_name(deployment_name),
+                attribute_names=['active_generation_id'],
+                consistent_read=True,
+            )
+        except SDBResponseError, e:
+            if e.error_code != 'NoSuchDomain':
+                raise
+            return None
+        finally:
+            self.request_count += 1
+
+        active_generation_id = attributes.get('active_generation_id')
+        if active_generation_id is None:
+            return None
+        return int(active_generation_id)
+
+    def set_active_generation_id(self, deployment_name, generation_id):
+        # The pointer must always agree with the node records, so it's only
+        # written when they are
+        if not self.write_node_records:
+            logger.critical(
+                "Called set_active_generation_id on %s: %s",
+                deployment_name,
+                generation_id,
+            )
+            return
+
+        logger.info(
+            "Pointing %s at active generation %s",
+            deployment_name,
+            generation_id,
+        )
+        self._put_meta_attributes(
+            self._get_generation_pointer_name(deployment_name),
+            {
+                'deployment_name': deployment_name,
+                'active_generation_id': str(generation_id),
+            },
+        )
+
+    def _get_seed_snapshots_name(self, seed_key):
+        return 'seed-snapshots:%s' % seed_key
+
+    def get_seed_snapshots(self, seed_key):
+        if not self.seed_snapshot_max_age:
+            return None
+
+        try:
+            attributes = self.sdbconn.get_attributes(
+                self.sdb_meta_domain,
+                self._get_seed_snapshots_name(seed_key),
+                attribute_names=['snapshots', 'taken_at'],
+                consistent_read=True,
+            )
+        except SDBResponseError, e:
+            if e.error_code != 'NoSuchDomain':
+                raise
+            return None
+        finally:
+            self.request_count += 1
+
+        if 'snapshots' not in attributes or 'taken_at' not in attributes:
+            return None
+        age = self._clock() - float(attributes['taken_at'])
+        if age > self.seed_snapshot_max_age:
+            logger.info(
+                "Seed snapshots for %s are too old to re-use: %.0fs",
+                seed_key,
+                age,
+            )
+            return None
+
+        return json.loads(attributes['snapshots'])
+
+    def set_seed_snapshots(self, seed_key, snapshots):
+        if not self.seed_snapshot_max_age:
+            return
+
+        self._put_meta_attributes(
+            self._get_seed_snapshots_name(seed_key),
+            {
+                'snapshots': json.dumps(snapshots, sort_keys=True),
+                'taken_at': '%.3f' % self._clock(),
+            },
+        )
+
+    def _put_meta_attributes(self, item_name, attributes):
+        """
+        Store the attributes for the named item in the meta domain, creating
+        the domain if it doesn't yet exist.
+        """
+        try:
+            self.sdbconn.put_attributes(
+                self.sdb_meta_domain,
+                item_name,
+                attributes,
+                replace=True,
+            )
+        except SDBResponseError, e:
+            if e.error_code != 'NoSuchDomain':
+                raise
+            logger.info("Creating SimpleDB domain: %s", self.meta_domain)
+            self.sdb_meta_domain = self.sdbconn.create_domain(
+                self.meta_domain,
+            )
+            self.sdbconn.put_attributes(
+                self.sdb_meta_domain,
+                item_name,
+                attributes,
+                replace=True,
+            )
+            self.request_count += 1
+        finally:
+            self.request_count += 1
+
+    def save_nodes(self, deployment_name, nodes, fields=None):
+        if not nodes:
+            return
+        self.invalidate_cache(deployment_name)
+
+        if fields is None:
+            fields = [
+                field_name
+                for field_name, field in InfrastructureNode.fields.items()
+                if not isinstance(field, models.ItemName)
+            ]
+        items = {}
+        for node in nodes:
+            items[node.nodename] = self._encode_fields(node, fields)
+
+        if not self.write_node_records:
+            logger.critical(
+                "Called save_nodes on %s node(s): %s",
+                len(items),
+                sorted(items),
+            )
+            return
+
+        item_names = sorted(items)
+        for i in range(0, len(item_names), MAX_BATCH_PUT_SIZE):
+            batch = dict(
+                (item_name, items[item_name])
+                for item_name in item_names[i:i + MAX_BATCH_PUT_SIZE]
+            )
+            self.sdbconn.batch_put_attributes(
+                self.sdb_domain,
+                batch,
+                replace=True,
+            )
+            self.request_count += 1
+
+        return True
+
+    def _encode_fields(self, node, fields):
+        attributes = {}
+        for field_name in fields:
+            value = getattr(node, field_name)
+            if value is None:
+                continue
+            field = InfrastructureNode.fields[field_name]
+            attributes[field_name] = field.encode(value)
+
+        return attributes
+
+    def invalidate_cache(self, deployment_name):
+        if self.cache is not None:
+            self.cache.invalidate(deployment_name)
+
+    def log_stats(self):
+        logger.info("Tracker requests: %s", self.request_count)
+        if self.cache is None:
+            return
+
+        logger.info(
+            (
+                "Tracker cache: %(hits)s hit(s), %(misses)s miss(es), "
+                "%(expirations)s expired, %(invalidations)s invalidation(s)"
+            ),
+            self.cache.get_stats(),
+        )
@@ -0,0 +1,156 @@
+"""
+A short-lived, local read-through cache for `ResourceTracker` node records.
+
+Tracker queries are slow and eventually consistent, but the records they
+return rarely change between two back-to-back commands. Caching them locally
+for a few seconds lets an operator run `view` repeatedly without paying for a
+full round trip every time. Any write to a deployment's records invalidates
+everything cached for that deployment.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import dateutil.parser
+
+logger = logging.getLogger('resource_tracker')
+
+DATETIME_KEY = '__datetime__'
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {DATETIME_KEY: value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and DATETIME_KEY in value:
+        return dateutil.parser.parse(value[DATETIME_KEY])
+    return value
+
+
+class TrackerCache(object):
+    """
+    Cache lists of node records (dictionaries of field values) keyed by the
+    deployment name and the filters used to query them.
+
+    ``ttl`` The number of seconds a cached query result remains valid.
+    ``path`` Optional path to a JSON file used to share the cache between
+    separate runs. If not given, the cache only lives as long as the process.
+    """
+    def __init__(self, ttl, path=None, clock=time.time):
+        self.ttl = ttl
+        self.path = path
+        self._clock = clock
+        self._entries = None
+        # Queries may run concurrently, and each write rewrites the file
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _get_query_key(filters):
+        return json.dumps(sorted(filters.items()))
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path) as fp:
+                    self._entries = json.load(fp)
+            except (IOError, ValueError), e:
+                logger.warning(
+                    "Ignoring unreadable tracker cache at %s: %s",
+                    self.path,
+                    e,
+                )
+
+        return self._entries
+
+    def _persist(self):
+        if not self.path:
+            return
+
+        cache_dir = os.path.dirname(self.path)
+        try:
+            if cache_dir and not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            with open(self.path, 'w') as fp:
+                json.dump(self._entries, fp)
+        except (IOError, OSError), e:
+            logger.warning(
+                "Unable to write tracker cache to %s: %s",
+                self.path,
+                e,
+            )
+
+    def get(self, deployment_name, filters):
+        """
+        Get the cached records for the given query, or None if there is no
+        fresh cached result.
+        """
+        with self._lock:
+            deployment_entries = self._load().get(deployment_name, {})
+            entry = deployment_entries.get(self._get_query_key(filters))
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if self._clock() - entry['stored_at'] > self.ttl:
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return [
+            dict(
+                (field, _decode_value(value))
+                for field, value in record.items()
+            )
+            for record in entry['records']
+        ]
+
+    def set(self, deployment_name, filters, records):
+        entry = {
+            'stored_at': self._clock(),
+            'records': [
+                dict(
+                    (field, _encode_value(value))
+                    for field, value in record.items()
+                )
+                for record in records
+            ],
+        }
+        with self._lock:
+            deployment_entries = self._load().setdefault(deployment_name, {})
+            deployment_entries[self._get_query_key(filters)] = entry
+            self._persist()
+
+    def invalidate(self, deployment_name):
+        """
+        Throw away every cached query for the given deployment.
+        """
+        with self._lock:
+            entries = self._load()
+            if deployment_name in entries:
+                del entries[deployment_name]
+                self._persist()
+            self.invalidations += 1
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,190 @@
+"""
+Running node deployers in dependency order, as concurrently as possible.
+
+Each `BaseNodeDeployment` declares the nodes that must be finished before it
+can start (eg. app servers need the ``masterdb`` RDS node). Every deployer
+whose dependencies are done starts right away on a pool of worker threads, so
+a full deploy takes about as long as its slowest chain of dependent nodes
+instead of the sum of every node.
+"""
+import Queue
+import logging
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+from neckbeard.concurrency import DEFAULT_MAX_WORKERS, MAX_WAIT
+
+logger = logging.getLogger('scheduler')
+time_logger = logging.getLogger('timer')
+
+
+class DependencyCycle(Exception):
+    """Some deployers depend on each other, so none of them can start"""
+    def __init__(self, message, keys):
+        super(DependencyCycle, self).__init__(message)
+        self.keys = keys
+
+
+def get_deployer_key(deployer):
+    return (deployer.aws_type, deployer.node_name)
+
+
+def build_dependency_graph(deployers):
+    """
+    Map each deployer's ``(aws_type, node_name)`` key to the set of keys it
+    depends on. Dependencies on nodes that aren't being deployed are ignored.
+
+    Raises `DependencyCycle` if the dependencies can never all be satisfied.
+    """
+    keys = set(get_deployer_key(deployer) for deployer in deployers)
+    graph = {}
+    for deployer in deployers:
+        key = get_deployer_key(deployer)
+        dependencies = set()
+        for dependency in deployer.get_dependencies():
+            if dependency not in keys:
+                logger.debug(
+                    "%s:%s depends on %s:%s, which isn't being deployed",
+                    key[0],
+                    key[1],
+                    dependency[0],
+                    dependency[1],
+                )
+                continue
+            if dependency != key:
+                dependencies.add(dependency)
+        graph[key] = dependencies
+
+    # Repeatedly remove the nodes with no dependencies left. Anything that's
+    # never removed is part of (or waiting on) a cycle.
+    remaining = dict((key, set(deps)) for key, deps in graph.items())
+    while True:
+        ready = [
+            ready_key for ready_key, deps in remaining.items() if not deps
+        ]
+        if not ready:
+            break
+        for ready_key in ready:
+            del remaining[ready_key]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    if remaining:
+        cycle_keys = sorted(remaining)
+        raise DependencyCycle(
+            "Circular node dependencies between: %s" % ', '.join(
+                '%s:%s' % key for key in cycle_keys
+            ),
+            keys=cycle_keys,
+        )
+
+    return graph
+
+
+class DeployScheduler(object):
+    """
+    Call a function with each of ``deployers`` once all of the deployers it
+    depends on have finished, using up to ``max_workers`` threads.
+
+    ``deployers`` should be given in priority order. When more deployers are
+    ready than there are free workers, earlier ones start first.
+
+    Deployers that run remote commands through Fabric should do so inside a
+    `neckbeard.host_scope.host_scope`, so that concurrent deployers don't
+    share Fabric's global ``env``.
+    """
+    def __init__(self, deployers, max_workers=DEFAULT_MAX_WORKERS):
+        self.deployers = list(deployers)
+        self.max_workers = max_workers
+        self.graph = build_dependency_graph(self.deployers)
+        self._deployers_by_key = dict(
+            (get_deployer_key(deployer), deployer)
+            for deployer in self.deployers
+        )
+        # Each deployer's key mapped to how long its call took, in seconds
+        self.durations = {}
+
+    def run(self, func):
+        """
+        Call ``func`` with each deployer. If any call raises an exception, no
+        more calls are started and, once the running calls finish, the first
+        exception is re-raised.
+        """
+        if not self.deployers:
+            return
+
+        start = time.time()
+        priorities = dict(
+            (get_deployer_key(deployer), i)
+            for i, deployer in enumerate(self.deployers)
+        )
+        remaining = dict((key, set(deps)) for key, deps in self.graph.items())
+        finished = Queue.Queue()
+        running = set()
+        failure = None
+
+        pool = ThreadPool(min(self.max_workers, len(self.deployers)))
+        try:
+            while True:
+                if failure is None:
+                    ready = sorted(
+                        [key for key, deps in remaining.items() if not deps],
+                        key=priorities.get,
+                    )
+                    for key in ready:
+                        del remaining[key]
+                        running.add(key)
+                        pool.apply_async(self._call, (func, key, finished))
+                if not running:
+                    break
+
+                key, exc_info = finished.get(True, MAX_WAIT)
+                running.remove(key)
+                if exc_info is None:
+                    for deps in remaining.values():
+                        deps.discard(key)
+                elif failure is None:
+                    logger.critical(
+                        "Deploying %s:%s failed. Waiting on %s running "
+                        "deploy(s) before stopping",
+                        key[0],
+                        key[1],
+                        len(running),
+                    )
+                    failure = exc_info
+        finally:
+            pool.close()
+            pool.join()
+
+        time_logger.info(
+            "%.1fs- deploying %s node(s)",
+            time.time() - start,
+            len(self.deployers),
+        )
+        if failure is not None:
+            if remaining:
+                logger.critical(
+                    "Never started: %s",
+                    ', '.join('%s:%s' % key for key in sorted(remaining)),
+                )
+            raise failure[0], failure[1], failure[2]
+
+    def _call(self, func, key, finished):
+        deployer = self._deployers_by_key[key]
+        start = time.time()
+        exc_info = None
+        try:
+            func(deployer)
+        except:
+            # Also catch SystemExit from the many `exit(1)` calls, so that it
+            # doesn't silently end the worker thread
+            exc_info = sys.exc_info()
+        finally:
+            self.durations[key] = time.time() - start
+            time_logger.info(
+                "%.1fs- %s:%s",
+                self.durations[key],
+                key[0],
+                key[1],
+            )
+            finished.put((key, exc_info))
@@ -0,0 +1,239 @@
+"""
+Machine-readable snapshots of a deployment's state, and diffs between them.
+
+A snapshot records every running node along with its AWS state, loadbalancer
+membership, elastic IP and health. It's gathered in one batched pass, so
+it's cheap enough to take regularly for monitoring.
+"""
+import logging
+from datetime import datetime
+
+from neckbeard.cloud_resource import check_node_health
+
+logger = logging.getLogger('snapshot')
+
+SNAPSHOT_VERSION = 1
+
+# The deployment-wide values that `diff_snapshots` compares
+DEPLOYMENT_FIELDS = [
+    'active_generation_id',
+    'pending_generation_id',
+]
+
+NODE_ADDED = 'added'
+NODE_REMOVED = 'removed'
+NODE_CHANGED = 'changed'
+
+
+def _get_generation(deployment, node):
+    if node.generation_id == deployment.active_gen_id:
+        return 'active'
+    elif node.generation_id == deployment.pending_gen_id:
+        return 'pending'
+    return 'old'
+
+
+def _get_state(node):
+    if node.boto_instance is None:
+        return None
+    if node.aws_type == 'ec2':
+        return node.boto_instance.state
+    elif node.aws_type == 'rds':
+        return node.boto_instance.status
+
+    return None
+
+
+def _get_address(node):
+    if node.boto_instance is None:
+        return None
+    if node.aws_type == 'ec2':
+        return node.boto_instance.public_dns_name or None
+    elif node.aws_type == 'rds':
+        endpoint = node.boto_instance.endpoint
+        if endpoint:
+            return endpoint[0]
+
+    return None
+
+
+def _get_elastic_ip_state(node):
+    """
+    Returns the configured elastic IP, if any, and whether it's currently
+    pointed at the node.
+    """
+    if node.aws_type != 'ec2':
+        return None, None
+
+    elastic_ip = node.get_elastic_ip()
+    if elastic_ip is None:
+        return None, None
+
+    return elastic_ip.public_ip, elastic_ip.instance_id == node.aws_id
+
+
+def _get_node_snapshot(deployment, node, is_healthy):
+    creation_date = node.creation_date
+    if creation_date is not None:
+        creation_date = creation_date.isoformat()
+    loadbalancer_name = None
+    loadbalancer_state = None
+    if node.aws_type == 'ec2':
+        loadbalancer = node.get_loadbalancer()
+        if loadbalancer is not None:
+            loadbalancer_name = loadbalancer.name
+            loadbalancer_state = node.get_loadbalancer_state()
+    elastic_ip, elastic_ip_associated = _get_elastic_ip_state(node)
+
+    return {
+        'aws_type': node.aws_type,
+        'name': node.name,
+        'aws_id': node.aws_id,
+        'generation_id': node.generation_id,
+        'generation': _get_generation(deployment, node),
+        'creation_date': creation_date,
+        'state': _get_state(node),
+        'address': _get_address(node),
+        'loadbalancer': loadbalancer_name,
+        'loadbalancer_state': loadbalancer_state,
+        'elastic_ip': elastic_ip,
+        'elastic_ip_associated': elastic_ip_associated,
+        'is_healthy': is_healthy,
+        'is_operational': node.is_operational,
+    }
+
+
+def gather_snapshot(deployment, nodes=None):
+    """
+    Gather the state of all of the running nodes in ``deployment``.
+
+    The nodes' instances are all fetched together, as are the loadbalancer
+    and elastic IP states, and the health checks run concurrently.
+
+    ``nodes`` Optionally, the deployment's running nodes with their boto
+    instances already fetched (eg. by `Deployment.verify_deployment_state`),
+    so that they aren't looked up again.
+
+    Returns a JSON-serializable dictionary.
+    """
+    if nodes is None:
+        nodes = deployment.get_all_nodes(is_running=1)
+        deployment.prefetch_boto_instances(nodes)
+    node_health = check_node_health(nodes)
+
+    node_snapshots = [
+        _get_node_snapshot(deployment, node, node_health[node])
+        for node in nodes
+    ]
+    node_snapshots.sort(
+        key=lambda n: (n['aws_type'], n['name'], n['generation_id']),
+    )
+    logger.info(
+        "Gathered a snapshot of %s node(s) in %s",
+        len(node_snapshots),
+        deployment.deployment_name,
+    )
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'deployment_name': deployment.deployment_name,
+        'taken_at': datetime.utcnow().isoformat(),
+        'active_generation_id': deployment.active_gen_id,
+        'pending_generation_id': deployment.pending_gen_id,
+        'nodes': node_snapshots,
+    }
+
+
+def _get_node_key(node_snapshot):
+    return (node_snapshot['aws_type'], node_snapshot['aws_id'])
+
+
+def diff_snapshots(old, new):
+    """
+    Compare two snapshots taken by `gather_snapshot`.
+
+    Returns a dictionary with:
+
+    ``deployment`` Maps each changed deployment-wide value to its old and new
+    values.
+    ``nodes`` A list of the node changes, each with the node's ``aws_type``,
+    ``name`` and ``aws_id``, the ``change`` (one of ``NODE_ADDED``,
+    ``NODE_REMOVED`` or ``NODE_CHANGED``) and, for changed nodes, the
+    ``fields`` that changed mapped to their old and new values.
+    """
+    deployment_changes = {}
+    for field in DEPLOYMENT_FIELDS:
+        if old.get(field) != new.get(field):
+            deployment_changes[field] = [old.get(field), new.get(field)]
+
+    old_nodes = dict(
+        (_get_node_key(node_snapshot), node_snapshot)
+        for node_snapshot in old['nodes']
+    )
+    new_nodes = dict(
+        (_get_node_key(node_snapshot), node_snapshot)
+        for node_snapshot in new['nodes']
+    )
+
+    node_changes = []
+    for key in sorted(set(old_nodes) | set(new_nodes)):
+        old_node = old_nodes.get(key)
+        new_node = new_nodes.get(key)
+        node = new_node or old_node
+        change = {
+            'aws_type': node['aws_type'],
+            'name': node['name'],
+            'aws_id': node['aws_id'],
+        }
+        if old_node is None:
+            change['change'] = NODE_ADDED
+        elif new_node is None:
+            change['change'] = NODE_REMOVED
+        else:
+            fields = dict(
+                (field, [old_node.get(field), new_node.get(field)])
+                for field in sorted(set(old_node) | set(new_node))
+                if old_node.get(field) != new_node.get(field)
+            )
+            if not fields:
+                continue
+            change['change'] = NODE_CHANGED
+            change['fields'] = fields
+        node_changes.append(change)
+
+    return {
+        'deployment': deployment_changes,
+        'nodes': node_changes,
+    }
+
+
+def format_diff(diff):
+    """
+    Describe a `diff_snapshots` result as a list of human-readable lines.
+    """
+    lines = []
+    for field, (old_value, new_value) in sorted(diff['deployment'].items()):
+        lines.append("%s: %s -> %s" % (field, old_value, new_value))
+
+    for change in diff['nodes']:
+        node_str = "%s:%s[%s]" % (
+            change['aws_type'],
+            change['name'],
+            change['aws_id'],
+        )
+        if change['change'] == NODE_ADDED:
+            lines.append("+ %s" % node_str)
+        elif change['change'] == NODE_REMOVED:
+            lines.append("- %s" % node_str)
+        else:
+            lines.append("~ %s" % node_str)
+            for field, (old_value, new_value) in sorted(
+                change['fields'].items()
+            ):
+                lines.append("    %s: %s -> %s" % (
+                    field,
+                    old_value,
+                    new_value,
+                ))
+
+    return lines
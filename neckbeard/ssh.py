@@ -0,0 +1,115 @@
+"""
+Persistent SSH connections to nodes, shared by every remote command.
+
+Fabric caches one connection per host string in ``fabric.state.connections``,
+but it only connects on a host's first command and never notices when an idle
+connection drops while a deploy waits on AWS. `SSHConnectionManager` opens
+each host's connection once, with keepalives so that it survives those waits,
+re-opens it if it drops anyway and records how long connecting took so that
+it shows up in the timing breakdown.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from fabric import state
+from fabric.network import normalize_to_string
+
+logger = logging.getLogger('ssh')
+time_logger = logging.getLogger('timer')
+
+# Seconds between keepalive packets on otherwise-idle connections
+DEFAULT_KEEPALIVE = 30
+
+
+class SSHConnectionManager(object):
+    """
+    Keep one open SSH connection per host, which every Fabric command run
+    against that host re-uses.
+
+    ``connections`` The Fabric `HostConnectionCache` that commands find their
+    connections in. Defaults to Fabric's global one.
+    ``keepalive`` The seconds between keepalive packets, or 0 for none.
+    """
+    def __init__(self, connections=None, keepalive=DEFAULT_KEEPALIVE):
+        if connections is None:
+            connections = state.connections
+        self.connections = connections
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        # Only one thread connects to any given host at a time
+        self._host_locks = defaultdict(threading.Lock)
+        # Each host mapped to the total seconds spent connecting to it
+        self.setup_times = {}
+        self.connect_count = 0
+        self.reuse_count = 0
+
+    def is_connected(self, host_string):
+        if host_string not in self.connections:
+            return False
+        transport = self.connections[host_string].get_transport()
+        return transport is not None and transport.is_active()
+
+    def connect(self, host_string):
+        """
+        Get the open connection to ``host_string``, only connecting if there
+        isn't one yet or the previous one dropped.
+
+        Raises Fabric's `NetworkError` if the host can't be reached.
+        """
+        key = normalize_to_string(host_string)
+        with self._lock:
+            host_lock = self._host_locks[key]
+
+        with host_lock:
+            if self.is_connected(key):
+                with self._lock:
+                    self.reuse_count += 1
+                return self.connections[key]
+            if key in self.connections:
+                logger.info("Re-connecting to %s", key)
+                del self.connections[key]
+
+            start = time.time()
+            self.connections.connect(key)
+            duration = time.time() - start
+
+            client = self.connections[key]
+            if self.keepalive:
+                client.get_transport().set_keepalive(self.keepalive)
+            with self._lock:
+                self.connect_count += 1
+                self.setup_times[key] = (
+                    self.setup_times.get(key, 0) + duration
+                )
+            time_logger.info("%.1fs- ssh connect to %s", duration, key)
+
+            return client
+
+    def get_total_setup_time(self):
+        with self._lock:
+            return sum(self.setup_times.values())
+
+    def disconnect_all(self):
+        """
+        Close every connection that this manager opened.
+        """
+        with self._lock:
+            keys = sorted(self.setup_times)
+        for key in keys:
+            if key in self.connections:
+                self.connections[key].close()
+                del self.connections[key]
+
+    def log_stats(self):
+        logger.info(
+            "SSH connections: %s opened, %s re-used, %.1fs connecting",
+            self.connect_count,
+            self.reuse_count,
+            self.get_total_setup_time(),
+        )
+
+
+# The manager used unless one is specifically given
+default_manager = SSHConnectionManager()
@@ -1,11 +1,17 @@
 
+import json
 import unittest2
 from os import path
+from tempfile import NamedTemporaryFile
 
 import mock
 import boto.exception
 
-from neckbeard.bin.neckbeard import run_commands, COMMAND_ERROR_CODES
+from neckbeard.bin.neckbeard import (
+    COMMAND_ERROR_CODES,
+    SNAPSHOTS_DIFFER_CODE,
+    run_commands,
+)
 
 FIXTURE_CONFIGS_DIR = path.abspath(
     path.join(path.dirname(__file__), '../fixture_configs'),
@@ -70,3 +76,35 @@ class TestRunCommands(unittest2.TestCase):
                 'beta',
                 configuration_dir,
             )
+
+    def _write_snapshot(self, snapshot):
+        snapshot_file = NamedTemporaryFile(suffix='.json')
+        self.addCleanup(snapshot_file.close)
+        json.dump(snapshot, snapshot_file)
+        snapshot_file.flush()
+
+        return snapshot_file.name
+
+    def test_diff(self):
+        snapshot = {'active_generation_id': 2, 'nodes': []}
+        old_path = self._write_snapshot(snapshot)
+        snapshot['active_generation_id'] = 3
+        new_path = self._write_snapshot(snapshot)
+
+        with mock.patch('sys.stdout'):
+            self.assertEqual(
+                run_commands('diff', None, None, snapshot_paths=[old_path]),
+                COMMAND_ERROR_CODES['INVALID_COMMAND_OPTIONS'],
+            )
+            self.assertEqual(
+                run_commands(
+                    'diff', None, None, snapshot_paths=[old_path, old_path],
+                ),
+                0,
+            )
+            self.assertEqual(
+                run_commands(
+                    'diff', None, None, snapshot_paths=[old_path, new_path],
+                ),
+                SNAPSHOTS_DIFFER_CODE,
+            )
@@ -0,0 +1,99 @@
+import os.path
+import subprocess
+import tempfile
+
+import mock
+import unittest2
+
+from neckbeard.brain_wrinkles import CommandBatch
+
+
+class LocalShell(object):
+    """
+    Runs the uploaded batch scripts locally instead of on a remote host.
+    """
+    def __init__(self):
+        self.uploaded_paths = []
+        self.executed = []
+        # A path that no step should get as far as creating
+        self.marker_path = os.path.join(
+            tempfile.gettempdir(),
+            'neckbeard-test-%s' % os.getpid(),
+        )
+
+    def upload(self, local_file, remote_path):
+        self.uploaded_paths.append(remote_path)
+        with open(remote_path, 'w') as f:
+            f.write(local_file.read())
+
+    def execute(self, command):
+        self.executed.append(command)
+        process = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        return process.communicate()[0]
+
+
+class TestCommandBatch(unittest2.TestCase):
+    def setUp(self):
+        self.shell = LocalShell()
+        self.batch = CommandBatch(
+            "test",
+            upload=self.shell.upload,
+            execute=self.shell.execute,
+        )
+
+    def test_steps_run_in_one_script(self):
+        self.batch.add('echo first')
+        self.batch.add('printf "no newline"')
+        self.batch.add('true')
+
+        results = self.batch.run()
+
+        self.assertEqual(len(self.shell.executed), 1)
+        self.assertEqual(
+            [(result.return_code, result.output) for result in results],
+            [(0, 'first'), (0, 'no newline'), (0, '')],
+        )
+        self.assertEqual(results[0].command, 'echo first')
+        # The script cleans up after itself
+        self.assertFalse(os.path.exists(self.shell.uploaded_paths[0]))
+
+    def test_failed_step_aborts(self):
+        self.batch.add('echo first')
+        self.batch.add('echo second; exit_code=3; (exit $exit_code)')
+        self.batch.add('touch %s' % self.shell.marker_path)
+
+        with mock.patch('neckbeard.brain_wrinkles.base.abort') as abort:
+            results = self.batch.run()
+
+        self.assertEqual(abort.call_count, 1)
+        self.assertEqual(
+            [(result.return_code, result.output) for result in results],
+            [(0, 'first'), (3, 'second'), (None, '')],
+        )
+        # Later steps can rely on the earlier ones having succeeded
+        self.assertFalse(os.path.exists(self.shell.marker_path))
+        self.assertFalse(os.path.exists(self.shell.uploaded_paths[0]))
+
+    def test_unfinished_steps_abort(self):
+        self.batch.add('true')
+        self.batch.add('exit 1')
+        self.batch.add('true')
+
+        with mock.patch('neckbeard.brain_wrinkles.base.abort') as abort:
+            results = self.batch.run()
+
+        self.assertEqual(abort.call_count, 1)
+        self.assertEqual(
+            [result.return_code for result in results],
+            [0, None, None],
+        )
+        self.assertFalse(os.path.exists(self.shell.uploaded_paths[0]))
+
+    def test_empty(self):
+        self.assertEqual(self.batch.run(), [])
+        self.assertEqual(self.shell.executed, [])
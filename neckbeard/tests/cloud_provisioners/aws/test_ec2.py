@@ -0,0 +1,215 @@
+import unittest2
+
+from neckbeard.cloud_provisioners.aws.ec2 import (
+    LaunchSpec,
+    _delete_volumes,
+    _snapshots_usable,
+    create_and_attach_ebs_vols,
+    launch_instances,
+    take_seed_snapshots,
+)
+from neckbeard.connections import AWSSettings
+from neckbeard.fake_aws import FakeAWS
+
+
+def build_launch_spec(instance_type='m1.small'):
+    return LaunchSpec(
+        aws_settings=AWSSettings('FOO', 'FOO', None),
+        image_id='ami-12345678',
+        key_name='beta',
+        placement='us-east-1a',
+        instance_type=instance_type,
+        security_groups=('web',),
+    )
+
+
+class FakeDeployer(object):
+    def __init__(self, ec2conn, launch_spec, node=None):
+        self.ec2conn = ec2conn
+        self.launch_spec = launch_spec
+        self.node = node
+        self.launched_instance = None
+
+    def get_node(self):
+        return self.node
+
+    def get_connection(self, service):
+        return self.ec2conn
+
+    def get_launch_spec(self):
+        return self.launch_spec
+
+    def set_launched_instance(self, instance):
+        self.launched_instance = instance
+
+
+class TestLaunchInstances(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.ec2conn = self.aws.ec2_connection()
+
+    def test_launched_together_per_spec(self):
+        small = build_launch_spec()
+        large = build_launch_spec(instance_type='m1.large')
+        deployers = [
+            FakeDeployer(self.ec2conn, small),
+            FakeDeployer(self.ec2conn, small),
+            FakeDeployer(self.ec2conn, large),
+            FakeDeployer(self.ec2conn, small),
+            # Already has a node, so nothing to launch
+            FakeDeployer(self.ec2conn, small, node=object()),
+        ]
+
+        instances = launch_instances(deployers)
+
+        self.assertEqual(len(instances), 4)
+        self.assertEqual(self.aws.calls['ec2.RunInstances'], 2)
+        self.assertEqual(self.aws.calls['ec2.DescribeInstances'], 2)
+        launched = [deployer.launched_instance for deployer in deployers]
+        self.assertEqual(launched[4], None)
+        self.assertEqual(len(set(launched[:4])), 4)
+        self.assertEqual(
+            [instance.instance_type for instance in launched[:4]],
+            ['m1.small', 'm1.small', 'm1.large', 'm1.small'],
+        )
+        self.assertTrue(
+            all(instance.state == 'running' for instance in launched[:4]),
+        )
+
+    def test_nothing_to_launch(self):
+        deployers = [
+            FakeDeployer(self.ec2conn, build_launch_spec(), node=object()),
+        ]
+
+        self.assertEqual(launch_instances(deployers), [])
+        self.assertEqual(self.aws.get_call_count(), 0)
+
+
+class TestEbsVolumes(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.ec2conn = self.aws.ec2_connection()
+        self.instance = self.aws.add_instance('beta')
+        self.vol_confs = {
+            'fs': {'device': '/dev/sdf', 'size': 50},
+            'logs': {'device': '/dev/sdg', 'size': 10},
+            'db': {'device': '/dev/sdh', 'size': 100},
+        }
+
+    def _attach_existing(self, device):
+        vol = self.aws.add_volume(50, 'us-east-1a')
+        self.ec2conn.attach_volume(vol.id, self.instance.id, device)
+        return vol
+
+    def test_created_and_attached_together(self):
+        self._attach_existing('/dev/sdf')
+        snapshot = self.aws.add_snapshot()
+        self.aws.reset_calls()
+
+        attached = create_and_attach_ebs_vols(
+            self.ec2conn,
+            'us-east-1a',
+            self.instance.id,
+            self.vol_confs,
+            seed_ebs_snapshots={'db': snapshot.id},
+        )
+
+        self.assertEqual(sorted(attached), ['db', 'logs'])
+        self.assertEqual(attached['db'].snapshot_id, snapshot.id)
+        self.assertEqual(
+            attached['logs'].attach_data.device,
+            '/dev/sdg',
+        )
+        self.assertEqual(self.aws.calls['ec2.CreateVolume'], 2)
+        self.assertEqual(self.aws.calls['ec2.AttachVolume'], 2)
+        # Finding the attached volumes, then waiting on the new ones
+        self.assertEqual(self.aws.calls['ec2.DescribeVolumes'], 2)
+
+    def test_delete_volumes(self):
+        vols = [
+            self._attach_existing('/dev/sdf'),
+            self._attach_existing('/dev/sdg'),
+        ]
+        self.aws.reset_calls()
+
+        _delete_volumes(self.ec2conn, vols)
+
+        self.assertEqual(self.aws.volumes, {})
+        self.assertEqual(self.aws.calls['ec2.DeleteVolume'], 2)
+        self.assertEqual(self.aws.calls['ec2.DescribeVolumes'], 1)
+
+
+class FakeSeedDeployer(object):
+    def __init__(self, aws, ec2conn, seed_node_name, node=None):
+        self.aws = aws
+        self.ec2conn = ec2conn
+        self.seed_deployment = object()
+        self.seed_node_name = seed_node_name
+        self.node = node
+        self.seed_ebs_snapshots = {}
+
+    def get_node(self):
+        return self.node
+
+    def get_seed_connection(self, service):
+        return self.ec2conn
+
+    def get_seed_snapshot_key(self):
+        return ('production', self.seed_node_name, (('fs', '/dev/sdf'),))
+
+    def _get_seed_ebs_snapshots(self):
+        self.aws.record_call('ssh', 'ec2-consistent-snapshot')
+        return {'fs': self.aws.add_snapshot().id}
+
+    def set_seed_ebs_snapshots(self, seed_ebs_snapshots):
+        self.seed_ebs_snapshots = seed_ebs_snapshots
+
+
+class TestTakeSeedSnapshots(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.ec2conn = self.aws.ec2_connection()
+
+    def test_shared_per_seed_node(self):
+        deployers = [
+            FakeSeedDeployer(self.aws, self.ec2conn, 'web0'),
+            FakeSeedDeployer(self.aws, self.ec2conn, 'web0'),
+            FakeSeedDeployer(self.aws, self.ec2conn, 'db0'),
+            # Already has a node, so needs no seed data
+            FakeSeedDeployer(self.aws, self.ec2conn, 'db0', node=object()),
+        ]
+
+        take_seed_snapshots(deployers)
+
+        self.assertEqual(self.aws.calls['ssh.ec2-consistent-snapshot'], 2)
+        self.assertEqual(
+            deployers[0].seed_ebs_snapshots,
+            deployers[1].seed_ebs_snapshots,
+        )
+        self.assertNotEqual(
+            deployers[0].seed_ebs_snapshots,
+            deployers[2].seed_ebs_snapshots,
+        )
+        self.assertEqual(deployers[3].seed_ebs_snapshots, {})
+        # All of the snapshots are waited on together
+        self.assertEqual(self.aws.calls['ec2.DescribeSnapshots'], 1)
+
+
+class TestSnapshotsUsable(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.ec2conn = self.aws.ec2_connection()
+
+    def test_usable(self):
+        snapshot_ids = [
+            self.aws.add_snapshot().id,
+            self.aws.add_snapshot(progress='50%').id,
+        ]
+
+        self.assertTrue(_snapshots_usable(self.ec2conn, snapshot_ids))
+        self.assertEqual(self.aws.calls['ec2.DescribeSnapshots'], 1)
+
+    def test_deleted(self):
+        snapshot_ids = [self.aws.add_snapshot().id, 'snap-deadbeef']
+
+        self.assertFalse(_snapshots_usable(self.ec2conn, snapshot_ids))
@@ -0,0 +1,163 @@
+import shutil
+import tempfile
+import unittest2
+from os import path
+
+from neckbeard.cloud_provisioners.aws.rds_parameters import (
+    ParameterGroupCache,
+    diff_parameters,
+    fetch_parameters,
+    modify_parameters,
+)
+from neckbeard.fake_aws import FakeAWS
+
+
+def build_parameters(count):
+    parameters = {}
+    for i in range(count):
+        parameters['param_%03d' % i] = (
+            i, 'integer', 'engine-default', 'dynamic',
+        )
+    return parameters
+
+
+class TestParameterGroupCache(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.rdsconn = self.aws.rds_connection()
+        parameters = build_parameters(250)
+        parameters['max_connections'] = (100, 'integer', 'user', 'dynamic')
+        self.aws.add_parameter_group('default', parameters)
+        self.cache = ParameterGroupCache()
+
+    def test_full_listing_paged(self):
+        parameters = fetch_parameters(self.rdsconn, 'default')
+
+        self.assertEqual(len(parameters), 251)
+        self.assertEqual(self.aws.calls['rds.DescribeDBParameters'], 3)
+
+    def test_unchanged_group_not_refetched(self):
+        self.cache.get_parameters(self.rdsconn, 'default')
+        self.aws.reset_calls()
+
+        parameters = self.cache.get_parameters(self.rdsconn, 'default')
+
+        self.assertEqual(len(parameters), 251)
+        # Only the single page of user parameters
+        self.assertEqual(self.aws.calls['rds.DescribeDBParameters'], 1)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_changed_group_refetched(self):
+        self.cache.get_parameters(self.rdsconn, 'default')
+        # Changed by someone else
+        self.aws.parameter_groups['default']['param_007'].value = 70
+        self.aws.parameter_groups['default']['param_007'].source = 'user'
+
+        parameters = self.cache.get_parameters(self.rdsconn, 'default')
+
+        self.assertEqual(parameters['param_007']['value'], 70)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_own_modifications_kept_cached(self):
+        self.cache.get_parameters(self.rdsconn, 'default')
+        parameters = diff_parameters(
+            'default',
+            self.cache.get_parameters(self.rdsconn, 'default'),
+            {'param_007': 70},
+        )
+        modify_parameters(self.rdsconn, 'default', parameters)
+        self.cache.record_modified('default', {'param_007': 70})
+
+        parameters = self.cache.get_parameters(self.rdsconn, 'default')
+
+        self.assertEqual(parameters['param_007']['value'], 70)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_missing_group_created(self):
+        parameters = self.cache.get_parameters(self.rdsconn, 'new-group')
+
+        self.assertEqual(parameters, {})
+        self.assertEqual(self.aws.calls['rds.CreateDBParameterGroup'], 1)
+        self.assertTrue('new-group' in self.aws.parameter_groups)
+
+    def test_shared_through_path(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache_path = path.join(cache_dir, 'cache', 'parameter_groups.json')
+        ParameterGroupCache(path=cache_path).get_parameters(
+            self.rdsconn,
+            'default',
+        )
+
+        cache = ParameterGroupCache(path=cache_path)
+        cache.get_parameters(self.rdsconn, 'default')
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 0)
+
+
+class TestDiffParameters(unittest2.TestCase):
+    def setUp(self):
+        self.current = {
+            'max_connections': {
+                'value': 100,
+                'type': 'integer',
+                'source': 'user',
+                'apply_type': 'dynamic',
+                'allowed_values': '1-100000',
+            },
+            'innodb_log_file_size': {
+                'value': 5242880,
+                'type': 'integer',
+                'source': 'engine-default',
+                'apply_type': 'static',
+                'allowed_values': None,
+            },
+        }
+
+    def test_only_changes(self):
+        parameters = diff_parameters('default', self.current, {
+            'max_connections': 100,
+            'innodb_log_file_size': 134217728,
+        })
+
+        self.assertEqual(
+            [parameter.name for parameter in parameters],
+            ['innodb_log_file_size'],
+        )
+        self.assertEqual(parameters[0].value, 134217728)
+        self.assertEqual(parameters[0].apply_method, 'pending-reboot')
+
+    def test_missing_parameter_types(self):
+        parameters = diff_parameters('default', self.current, {
+            'log_queries_not_using_indexes': True,
+            'long_query_time': 2,
+        })
+
+        types = dict(
+            (parameter.name, parameter.type) for parameter in parameters
+        )
+        self.assertEqual(types, {
+            'log_queries_not_using_indexes': 'boolean',
+            'long_query_time': 'integer',
+        })
+
+
+class TestModifyParameters(unittest2.TestCase):
+    def test_batched(self):
+        aws = FakeAWS()
+        aws.add_parameter_group('default', build_parameters(45))
+        rdsconn = aws.rds_connection()
+        current = fetch_parameters(rdsconn, 'default')
+        confs = dict((name, 1000) for name in current)
+
+        modify_parameters(
+            rdsconn,
+            'default',
+            diff_parameters('default', current, confs),
+        )
+
+        self.assertEqual(aws.calls['rds.ModifyDBParameterGroup'], 3)
+        user_parameters = fetch_parameters(rdsconn, 'default', 'user')
+        self.assertEqual(len(user_parameters), 45)
@@ -0,0 +1,84 @@
+import shutil
+import tempfile
+import unittest2
+from datetime import datetime
+from os import path
+
+from neckbeard.resource_tracker.cache import TrackerCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTrackerCache(unittest2.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.records = [
+            {
+                'name': 'web0-0',
+                'generation_id': 3,
+                'creation_date': datetime(2013, 3, 17, 12, 30),
+            },
+        ]
+
+    def test_miss_then_hit(self):
+        cache = TrackerCache(ttl=10, clock=self.clock)
+
+        self.assertEqual(cache.get('beta', {'is_running': 1}), None)
+        cache.set('beta', {'is_running': 1}, self.records)
+        self.assertEqual(cache.get('beta', {'is_running': 1}), self.records)
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_filters_are_part_of_the_key(self):
+        cache = TrackerCache(ttl=10, clock=self.clock)
+        cache.set('beta', {'is_running': 1}, self.records)
+
+        self.assertEqual(cache.get('beta', {'is_running': 0}), None)
+        self.assertEqual(cache.get('production', {'is_running': 1}), None)
+
+    def test_expiration(self):
+        cache = TrackerCache(ttl=10, clock=self.clock)
+        cache.set('beta', {}, self.records)
+
+        self.clock.now += 11
+        self.assertEqual(cache.get('beta', {}), None)
+        self.assertEqual(cache.expirations, 1)
+
+    def test_invalidate(self):
+        cache = TrackerCache(ttl=10, clock=self.clock)
+        cache.set('beta', {}, self.records)
+        cache.set('production', {}, self.records)
+
+        cache.invalidate('beta')
+
+        self.assertEqual(cache.get('beta', {}), None)
+        self.assertEqual(cache.get('production', {}), self.records)
+        self.assertEqual(cache.invalidations, 1)
+
+    def test_shared_between_instances_via_path(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache_path = path.join(cache_dir, 'nested', 'tracker.json')
+
+        first_cache = TrackerCache(ttl=10, path=cache_path, clock=self.clock)
+        first_cache.set('beta', {}, self.records)
+
+        second_cache = TrackerCache(ttl=10, path=cache_path, clock=self.clock)
+        self.assertEqual(second_cache.get('beta', {}), self.records)
+
+    def test_unreadable_cache_file_ignored(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache_path = path.join(cache_dir, 'tracker.json')
+        with open(cache_path, 'w') as fp:
+            fp.write('{not json')
+
+        cache = TrackerCache(ttl=10, path=cache_path, clock=self.clock)
+        self.assertEqual(cache.get('beta', {}), None)
@@ -0,0 +1,182 @@
+import unittest2
+
+from neckbeard import benchmark
+from neckbeard.fake_aws import FakeAWS
+from neckbeard.resource_tracker import MAX_PAGE_SIZE, SimpleDBResourceTracker
+
+
+class TestSaveNodes(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        benchmark.build_environment(self.aws, 20)
+
+    def _build_tracker(self, **kwargs):
+        return SimpleDBResourceTracker(
+            domain=benchmark.TRACKER_DOMAIN,
+            aws_access_key_id='FOO',
+            aws_secret_access_key='FOO',
+            sdbconn=self.aws.sdb_connection(),
+            **kwargs
+        )
+
+    def test_batched_writes(self):
+        tracker = self._build_tracker(write_node_records=True)
+        nodes = tracker.filter_nodes(benchmark.DEPLOYMENT_NAME, aws_type='ec2')
+        self.assertEqual(len(nodes), 40)
+        for node in nodes:
+            node.is_running = 0
+
+        tracker.save_nodes(
+            benchmark.DEPLOYMENT_NAME,
+            nodes,
+            fields=['is_running'],
+        )
+
+        self.assertEqual(self.aws.calls['sdb.BatchPutAttributes'], 2)
+        self.assertEqual(
+            tracker.filter_nodes(
+                benchmark.DEPLOYMENT_NAME,
+                aws_type='ec2',
+                is_running=1,
+            ),
+            [],
+        )
+
+    def test_writes_disabled_by_default(self):
+        tracker = self._build_tracker()
+        nodes = tracker.filter_nodes(benchmark.DEPLOYMENT_NAME, aws_type='ec2')
+
+        tracker.save_nodes(benchmark.DEPLOYMENT_NAME, nodes)
+
+        self.assertEqual(self.aws.calls['sdb.BatchPutAttributes'], 0)
+
+
+class TestSelect(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        benchmark.build_environment(self.aws, 20)
+
+    def _build_tracker(self, **kwargs):
+        return SimpleDBResourceTracker(
+            domain=benchmark.TRACKER_DOMAIN,
+            aws_access_key_id='FOO',
+            aws_secret_access_key='FOO',
+            sdbconn=self.aws.sdb_connection(),
+            **kwargs
+        )
+
+    def _get_consistency(self, tracker):
+        return [
+            consistent_read for _, consistent_read in tracker.sdbconn.selects
+        ]
+
+    def test_eventually_consistent_by_default(self):
+        tracker = self._build_tracker()
+
+        tracker.filter_nodes(benchmark.DEPLOYMENT_NAME, aws_type='ec2')
+        tracker.filter_node_values(
+            benchmark.DEPLOYMENT_NAME,
+            ['aws_id'],
+            consistent_read=True,
+            aws_type='ec2',
+        )
+
+        self.assertEqual(self._get_consistency(tracker), [False, True])
+
+    def test_consistent_tracker(self):
+        tracker = self._build_tracker(consistent_read=True)
+
+        tracker.filter_nodes(benchmark.DEPLOYMENT_NAME, aws_type='ec2')
+        tracker.filter_nodes(
+            benchmark.DEPLOYMENT_NAME,
+            consistent_read=False,
+            aws_type='ec2',
+        )
+
+        self.assertEqual(self._get_consistency(tracker), [True, False])
+
+    def test_pages_followed(self):
+        tracker = self._build_tracker(page_size=7)
+
+        nodes = tracker.filter_nodes(benchmark.DEPLOYMENT_NAME, aws_type='ec2')
+
+        self.assertEqual(len(nodes), 40)
+        self.assertEqual(len(set(node.nodename for node in nodes)), 40)
+        # 40 records, 7 at a time
+        self.assertEqual(self.aws.calls['sdb.Select'], 6)
+        self.assertEqual(tracker.request_count, 6)
+        for query, _ in tracker.sdbconn.selects:
+            self.assertTrue(query.endswith(' limit 7'))
+
+    def test_page_size_per_query(self):
+        tracker = self._build_tracker()
+
+        values = tracker.filter_node_values(
+            benchmark.DEPLOYMENT_NAME,
+            ['aws_id'],
+            page_size=25,
+            aws_type='ec2',
+        )
+
+        self.assertEqual(len(values), 40)
+        self.assertEqual(self.aws.calls['sdb.Select'], 2)
+
+    def test_page_size_capped(self):
+        tracker = self._build_tracker(page_size=5000)
+
+        tracker.filter_nodes(benchmark.DEPLOYMENT_NAME, aws_type='ec2')
+
+        query = tracker.sdbconn.selects[0][0]
+        self.assertTrue(query.endswith(' limit %s' % MAX_PAGE_SIZE))
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSeedSnapshots(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.clock = FakeClock()
+
+    def _build_tracker(self, **kwargs):
+        return SimpleDBResourceTracker(
+            domain=benchmark.TRACKER_DOMAIN,
+            aws_access_key_id='FOO',
+            aws_secret_access_key='FOO',
+            sdbconn=self.aws.sdb_connection(),
+            clock=self.clock,
+            **kwargs
+        )
+
+    def test_reused_within_max_age(self):
+        tracker = self._build_tracker(seed_snapshot_max_age=3600)
+        self.assertEqual(tracker.get_seed_snapshots('ebs:prod:web0'), None)
+
+        tracker.set_seed_snapshots('ebs:prod:web0', {'fs': 'snap-1'})
+        self.clock.now += 3600
+
+        self.assertEqual(
+            tracker.get_seed_snapshots('ebs:prod:web0'),
+            {'fs': 'snap-1'},
+        )
+        self.assertEqual(tracker.get_seed_snapshots('ebs:prod:web1'), None)
+
+    def test_expired(self):
+        tracker = self._build_tracker(seed_snapshot_max_age=3600)
+        tracker.set_seed_snapshots('ebs:prod:web0', {'fs': 'snap-1'})
+        self.clock.now += 3601
+
+        self.assertEqual(tracker.get_seed_snapshots('ebs:prod:web0'), None)
+
+    def test_disabled_by_default(self):
+        tracker = self._build_tracker()
+        tracker.set_seed_snapshots('ebs:prod:web0', {'fs': 'snap-1'})
+
+        self.assertEqual(tracker.get_seed_snapshots('ebs:prod:web0'), None)
+        self.assertEqual(self.aws.calls['sdb.PutAttributes'], 0)
+        self.assertEqual(self.aws.calls['sdb.GetAttributes'], 0)
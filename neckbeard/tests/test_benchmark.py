@@ -0,0 +1,90 @@
+import unittest2
+
+from neckbeard import benchmark
+from neckbeard.fake_aws import FakeAWS
+
+
+class TestFakeSDBConnection(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        for i in range(5):
+            self.aws.add_sdb_item(
+                'nodes',
+                'item-%s' % i,
+                {'deployment_name': 'beta', 'name': 'web%s' % i},
+            )
+        self.aws.add_sdb_item(
+            'nodes',
+            'other',
+            {'deployment_name': 'production', 'name': 'web0'},
+        )
+        self.sdbconn = self.aws.sdb_connection()
+
+    def test_select_follows_pages(self):
+        query = (
+            "select * from `nodes` where `deployment_name` = 'beta' limit 2"
+        )
+        domain = self.sdbconn.get_domain('nodes', validate=False)
+
+        first_page = self.sdbconn.select(domain, query)
+        self.assertEqual(len(first_page), 2)
+        self.assertTrue(first_page.next_token)
+
+        names = [item['name'] for item in first_page]
+        next_token = first_page.next_token
+        while next_token:
+            page = self.sdbconn.select(domain, query, next_token=next_token)
+            names.extend(item['name'] for item in page)
+            next_token = page.next_token
+
+        self.assertEqual(sorted(names), ['web%s' % i for i in range(5)])
+        self.assertEqual(self.aws.calls['sdb.Select'], 3)
+
+    def test_select_output_list(self):
+        query = "select `name` from `nodes` where `name` = 'web0' limit 10"
+        domain = self.sdbconn.get_domain('nodes', validate=False)
+
+        items = self.sdbconn.select(domain, query)
+        self.assertEqual(
+            sorted((item.name, dict(item)) for item in items),
+            [('item-0', {'name': 'web0'}), ('other', {'name': 'web0'})],
+        )
+
+
+class TestBenchmark(unittest2.TestCase):
+    def test_all_actions_reported(self):
+        results = benchmark.run_benchmark(3)
+
+        self.assertEqual(
+            [result['action'] for result in results],
+            [action_name for action_name, _, _ in benchmark.ACTIONS],
+        )
+        for result in results:
+            self.assertEqual(result['node_count'], 3)
+            self.assertEqual(
+                result['call_count'],
+                sum(result['calls'].values()),
+            )
+            self.assertTrue(result['call_count'] > 0)
+
+    def test_view_describes_once(self):
+        aws = FakeAWS()
+        deployment_confs = benchmark.build_environment(aws, 3)
+        deployment = benchmark.build_deployment(aws, deployment_confs)
+
+        benchmark.run_view(deployment)
+
+        self.assertEqual(aws.calls['ec2.DescribeInstances'], 1)
+        self.assertEqual(aws.calls['rds.DescribeDBInstances'], 1)
+
+    def test_terminate_only_touches_old_generation(self):
+        aws = FakeAWS()
+        deployment_confs = benchmark.build_environment(aws, 3)
+        deployment = benchmark.build_deployment(aws, deployment_confs)
+
+        benchmark.run_terminate(deployment)
+
+        self.assertEqual(aws.calls['ec2.TerminateInstances'], 3)
+        self.assertEqual(aws.calls['rds.DeleteDBInstance'], 1)
+        loadbalancer = aws.load_balancers[benchmark.LOADBALANCER_NAME]
+        self.assertEqual(len(loadbalancer.instance_ids), 3)
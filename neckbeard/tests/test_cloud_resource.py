@@ -0,0 +1,341 @@
+import threading
+import unittest2
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from datetime import datetime
+
+import mock
+
+from neckbeard import benchmark
+
+from neckbeard.cloud_resource import (
+    ElasticIpCache,
+    InfrastructureNode,
+    LoadBalancerCache,
+    MissingElasticIp,
+    NodeRecord,
+    build_http_session,
+    check_node_health,
+)
+from neckbeard.fake_aws import FakeAWS
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = 'status: OK'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeBotoInstance(object):
+    def __init__(self, public_dns_name):
+        self.public_dns_name = public_dns_name
+
+
+class FakeNode(object):
+    def __init__(self, healthy, hang=None):
+        self.healthy = healthy
+        self.hang = hang
+
+    @property
+    def is_healthy(self):
+        if self.hang is not None:
+            self.hang.wait()
+        return self.healthy
+
+
+class TestCheckNodeHealth(unittest2.TestCase):
+    def test_result_map(self):
+        healthy = FakeNode(True)
+        unhealthy = FakeNode(False)
+
+        self.assertEqual(
+            check_node_health([healthy, unhealthy]),
+            {healthy: True, unhealthy: False},
+        )
+
+    def test_hung_nodes_unhealthy_after_deadline(self):
+        hang = threading.Event()
+        self.addCleanup(hang.set)
+        healthy = FakeNode(True)
+        hung = FakeNode(True, hang=hang)
+
+        node_health = check_node_health([hung, healthy], deadline=0.2)
+
+        self.assertEqual(node_health, {hung: False, healthy: True})
+
+
+class TestHealthCheckSession(unittest2.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), StatusHandler)
+        server_thread = threading.Thread(target=self.server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        self.addCleanup(self.server.shutdown)
+
+    def _build_node(self):
+        node = InfrastructureNode(aws_type='ec2', name='web0')
+        node._boto_instance = FakeBotoInstance(
+            '127.0.0.1:%s' % self.server.server_port,
+        )
+        node.set_deployment_info({
+            'health_check': {
+                'status_url': '/status/',
+                'status_contains': 'OK',
+                'status_check_timeout': 5,
+            },
+        })
+        return node
+
+    def test_connections_reused_across_nodes(self):
+        session = build_http_session()
+        nodes = [self._build_node() for _ in range(3)]
+        for node in nodes:
+            node.set_http_session(session)
+            self.assertTrue(node.passes_health_check())
+
+        url = nodes[0].get_health_check_url()
+        pool = session.get_adapter(url).poolmanager.connection_from_url(url)
+        self.assertEqual(pool.num_requests, 3)
+        self.assertEqual(pool.num_connections, 1)
+
+    def test_no_session(self):
+        node = self._build_node()
+
+        self.assertTrue(node.passes_health_check())
+
+
+class TestStatusOutput(unittest2.TestCase):
+    def setUp(self):
+        self.node = InfrastructureNode(
+            aws_type='ec2',
+            name='web0',
+            aws_id='i-1',
+        )
+        self.node.set_boto_instance(FakeBotoInstance('web0.example.com'))
+
+    def test_given_health_used(self):
+        # Without any configuration, a health check would fail
+        self.assertFalse(
+            'UNHEALTHY' in self.node.get_status_output(is_healthy=True),
+        )
+        self.assertTrue(
+            'UNHEALTHY' in self.node.get_status_output(is_healthy=False),
+        )
+
+    def test_health_skipped(self):
+        self.assertTrue(
+            self.node.get_status_output(check_health=False).startswith(
+                'INACTIVE--',
+            ),
+        )
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLoadBalancerCache(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.aws.add_load_balancer('web', instance_ids=['i-1', 'i-2'])
+        self.aws.add_load_balancer('api', instance_ids=['i-3'])
+        self.aws.load_balancers['web'].out_of_service_ids.add('i-2')
+        self.clock = FakeClock()
+        self.cache = LoadBalancerCache(
+            self.aws.elb_connection(),
+            ['web', 'api'],
+            ttl=5,
+            clock=self.clock,
+        )
+
+    def test_loadbalancers_fetched_together(self):
+        self.assertEqual(self.cache.get_loadbalancer('web').name, 'web')
+        self.assertEqual(self.cache.get_loadbalancer('api').name, 'api')
+
+        self.assertEqual(self.aws.calls['elb.DescribeLoadBalancers'], 1)
+
+    def test_missing_loadbalancer(self):
+        self.cache.names.add('gone')
+
+        self.assertEqual(self.cache.get_loadbalancer('gone'), None)
+        self.assertEqual(self.cache.get_instance_state('gone', 'i-1'), None)
+        self.assertEqual(self.cache.get_loadbalancer('web').name, 'web')
+        self.assertEqual(self.cache.get_loadbalancer('api').name, 'api')
+
+        # The failed batch, then each loadbalancer singly
+        self.assertEqual(self.aws.calls['elb.DescribeLoadBalancers'], 4)
+        self.assertEqual(self.aws.calls['elb.DescribeInstanceHealth'], 0)
+
+    def test_instance_states_fetched_once(self):
+        self.assertEqual(
+            self.cache.get_instance_state('web', 'i-1'),
+            'InService',
+        )
+        self.assertEqual(
+            self.cache.get_instance_state('web', 'i-2'),
+            'OutOfService',
+        )
+        self.assertEqual(self.cache.get_instance_state('web', 'i-9'), None)
+
+        self.assertEqual(self.aws.calls['elb.DescribeInstanceHealth'], 1)
+
+    def test_expires(self):
+        self.cache.get_instance_state('web', 'i-1')
+        self.clock.now += 6
+        self.cache.get_instance_state('web', 'i-1')
+
+        self.assertEqual(self.aws.calls['elb.DescribeLoadBalancers'], 2)
+        self.assertEqual(self.aws.calls['elb.DescribeInstanceHealth'], 2)
+
+    def test_invalidate(self):
+        self.cache.get_instance_state('web', 'i-1')
+        self.aws.load_balancers['web'].register_instances(['i-4'])
+        self.cache.invalidate('web')
+
+        self.assertEqual(
+            self.cache.get_instance_state('web', 'i-4'),
+            'InService',
+        )
+        self.assertEqual(self.aws.calls['elb.DescribeInstanceHealth'], 2)
+
+
+class TestElasticIpCache(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        self.aws.add_address('10.0.0.1', instance_id='i-1')
+        self.aws.add_address('10.0.0.2', instance_id='i-2')
+        self.ec2conn = self.aws.ec2_connection()
+        self.cache = ElasticIpCache(self.ec2conn, ['10.0.0.1', '10.0.0.2'])
+
+    def test_addresses_fetched_together(self):
+        self.assertEqual(self.cache.get_address('10.0.0.1').instance_id, 'i-1')
+        self.assertEqual(self.cache.get_address('10.0.0.2').instance_id, 'i-2')
+
+        self.assertEqual(self.aws.calls['ec2.DescribeAddresses'], 1)
+
+    def test_refresh(self):
+        self.cache.get_address('10.0.0.1')
+        self.ec2conn.associate_address('i-3', '10.0.0.1')
+
+        self.cache.refresh()
+
+        self.assertEqual(self.cache.get_address('10.0.0.1').instance_id, 'i-3')
+        self.assertEqual(self.aws.calls['ec2.DescribeAddresses'], 2)
+
+    def test_unknown_address_added(self):
+        self.aws.add_address('10.0.0.3')
+
+        self.assertEqual(self.cache.get_address('10.0.0.3').instance_id, None)
+        self.assertEqual(self.cache.get_address('10.0.0.1').instance_id, 'i-1')
+        self.assertEqual(self.aws.calls['ec2.DescribeAddresses'], 1)
+
+    def test_missing_address_isolated(self):
+        cache = ElasticIpCache(
+            self.ec2conn,
+            ['10.0.0.1', '10.0.0.2', '10.0.0.9'],
+        )
+
+        self.assertEqual(cache.get_address('10.0.0.1').instance_id, 'i-1')
+        self.assertEqual(cache.get_address('10.0.0.2').instance_id, 'i-2')
+        self.assertRaises(MissingElasticIp, cache.get_address, '10.0.0.9')
+        # The failed batch, then one request per address
+        self.assertEqual(self.aws.calls['ec2.DescribeAddresses'], 4)
+
+
+class TestNodeRecord(unittest2.TestCase):
+    def setUp(self):
+        self.record = NodeRecord(
+            nodename='beta-web0-3',
+            generation_id=3,
+            deployment_name='beta',
+            aws_type='ec2',
+            aws_id='i-abcdef',
+            name='web0',
+            creation_date=datetime(2013, 3, 17, 12, 30),
+            is_running=1,
+            is_active_generation=1,
+        )
+
+    def test_reading_fields_does_not_promote(self):
+        self.assertEqual(self.record.generation_id, 3)
+        self.assertEqual(self.record.aws_id, 'i-abcdef')
+        self.assertEqual(
+            str(self.record),
+            'ec2:web0[i-abcdef]<2013-03-17 12:30:00>',
+        )
+        self.assertFalse(self.record.is_promoted)
+
+    def test_mutation_promotes(self):
+        self.record.is_running = 0
+
+        self.assertTrue(self.record.is_promoted)
+        node = self.record.promote()
+        self.assertTrue(isinstance(node, InfrastructureNode))
+        self.assertEqual(node.is_running, 0)
+        self.assertEqual(node.aws_id, 'i-abcdef')
+        self.assertEqual(self.record.is_running, 0)
+
+    def test_read_only_behaviour_does_not_promote(self):
+        boto_instance = FakeBotoInstance('ec2-1-2-3-4.amazonaws.com')
+        self.record.set_deployment_info({'aws': {'keypair': 'beta'}})
+        self.record.set_boto_instance(boto_instance)
+
+        self.assertTrue(self.record.boto_instance is boto_instance)
+        self.assertEqual(self.record.get_health_check_url(), None)
+        self.assertFalse(self.record.is_promoted)
+
+    def test_view_does_not_promote(self):
+        aws = FakeAWS()
+        deployment = benchmark.build_deployment(
+            aws,
+            benchmark.build_environment(aws, 5),
+        )
+        deployment.verify_deployment_state()
+        nodes = deployment.get_all_active_nodes()
+        deployment.prefetch_boto_instances(nodes)
+        node_health = check_node_health(nodes)
+        for node in nodes:
+            node.get_status_output(is_healthy=node_health[node])
+
+        self.assertEqual(len(nodes), 6)
+        self.assertEqual(
+            [node for node in nodes if node.is_promoted],
+            [],
+        )
+
+    def test_behaviour_promotes_with_configuration(self):
+        deployment_info = {'aws': {'keypair': 'beta'}}
+        tracker = mock.Mock()
+        self.record.set_deployment_info(deployment_info)
+        self.record.set_resource_tracker(tracker)
+
+        self.record.save()
+
+        self.assertTrue(self.record.is_promoted)
+        node = self.record.promote()
+        self.assertEqual(node._deployment_info, deployment_info)
+        self.assertTrue(node._resource_tracker is tracker)
+
+    def test_configuration_forwarded_after_promotion(self):
+        node = self.record.promote()
+        deployment_info = {'aws': {'keypair': 'beta'}}
+
+        self.record.set_deployment_info(deployment_info)
+
+        self.assertEqual(node._deployment_info, deployment_info)
+
+    def test_full_node_promotes_to_itself(self):
+        node = self.record.promote()
+
+        self.assertTrue(node.promote() is node)
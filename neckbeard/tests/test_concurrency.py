@@ -0,0 +1,52 @@
+import threading
+import unittest2
+
+from neckbeard.concurrency import map_concurrently
+
+
+class TestMapConcurrently(unittest2.TestCase):
+    def test_results_in_order(self):
+        results = map_concurrently(lambda x: x * 2, range(25), max_workers=4)
+
+        self.assertEqual(results, [x * 2 for x in range(25)])
+
+    def test_runs_concurrently(self):
+        # Each call waits for the other to start, so they can only both
+        # finish if they run at the same time
+        started = {'a': threading.Event(), 'b': threading.Event()}
+        other = {'a': 'b', 'b': 'a'}
+
+        def wait_for_other(item):
+            started[item].set()
+            return started[other[item]].wait(5)
+
+        results = map_concurrently(wait_for_other, ['a', 'b'], timeout=10)
+
+        self.assertEqual(results, [True, True])
+
+    def test_timeout_uses_default(self):
+        hang = threading.Event()
+        self.addCleanup(hang.set)
+
+        def maybe_hang(item):
+            if item == 'hung':
+                hang.wait()
+            return item
+
+        results = map_concurrently(
+            maybe_hang,
+            ['fast', 'hung', 'also fast'],
+            timeout=0.2,
+            default='timed out',
+        )
+
+        self.assertEqual(results, ['fast', 'timed out', 'also fast'])
+
+    def test_exceptions_raised(self):
+        def explode(item):
+            raise ValueError(item)
+
+        self.assertRaises(ValueError, map_concurrently, explode, [1])
+
+    def test_no_items(self):
+        self.assertEqual(map_concurrently(lambda x: x, []), [])
@@ -0,0 +1,54 @@
+import mock
+import unittest2
+
+from neckbeard.connections import AWSSettings, ConnectionPool, UnknownAWSRegion
+
+
+class TestConnectionPool(unittest2.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool()
+        patcher = mock.patch('boto.auth.get_auth_handler', autospec=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_connections_reused(self):
+        settings = AWSSettings('FOO', 'FOO', None)
+
+        ec2conn = self.pool.get_connection('ec2', settings)
+
+        self.assertTrue(self.pool.get_connection('ec2', settings) is ec2conn)
+        # The default region is the same as asking for it by name
+        self.assertTrue(
+            self.pool.get_connection(
+                'ec2',
+                AWSSettings('FOO', 'FOO', 'us-east-1'),
+            ) is ec2conn
+        )
+
+    def test_connections_keyed(self):
+        settings = AWSSettings('FOO', 'FOO', None)
+        ec2conn = self.pool.get_connection('ec2', settings)
+
+        other_credentials = self.pool.get_connection(
+            'ec2',
+            AWSSettings('BAR', 'BAR', None),
+        )
+        other_region = self.pool.get_connection(
+            'ec2',
+            AWSSettings('FOO', 'FOO', 'eu-west-1'),
+        )
+        other_service = self.pool.get_connection('elb', settings)
+
+        self.assertFalse(other_credentials is ec2conn)
+        self.assertEqual(other_credentials.access_key, 'BAR')
+        self.assertEqual(other_region.region.name, 'eu-west-1')
+        self.assertFalse(other_service is ec2conn)
+
+    def test_unknown_region(self):
+        self.assertRaises(
+            UnknownAWSRegion,
+            lambda: self.pool.get_connection(
+                'rds',
+                AWSSettings('FOO', 'FOO', 'moon-north-1'),
+            ),
+        )
@@ -1,11 +1,21 @@
+import threading
+
 import mock
 import unittest2
 
+from neckbeard import benchmark
+from neckbeard.connections import ConnectionPool
 from neckbeard.environment_manager import (
+    REPAIR_FAILED,
+    REPAIR_MADE_OPERATIONAL,
+    REPAIR_REQUESTED,
     Deployment,
+    InfrastructureNode,
     MissingAWSCredentials,
     NonUniformAWSCredentials,
+    RollingBudget,
 )
+from neckbeard.fake_aws import FakeAWS
 
 
 class TestConfigValidation(unittest2.TestCase):
@@ -30,11 +40,60 @@ class TestConfigValidation(unittest2.TestCase):
                 },
             },
         }
+        with mock.patch('boto.auth.get_auth_handler', autospec=True):
+            deployment = Deployment(
+                'test',
+                ec2_configs,
+                rds_configs,
+                {},
+                connection_pool=ConnectionPool(),
+            )
+            ec2conn = deployment.get_connection('ec2', 'ec2', 'web0-0')
+            rdsconn = deployment.get_connection('rds', 'rds', 'web1-0')
+
+        self.assertEqual(ec2conn.access_key, 'FOO')
+        self.assertEqual(rdsconn.access_key, 'BAR')
+        # With more than one account, there's no deployment-wide connection
         self.assertRaises(
             NonUniformAWSCredentials,
-            lambda: Deployment('test', ec2_configs, rds_configs, {}),
+            lambda: deployment.ec2conn,
         )
 
+    def test_regions(self):
+        ec2_configs = {
+            'web0-0': {
+                "name": "web0",
+                "unique_id": "web0-0",
+                "aws": {
+                    "access_key_id": "FOO",
+                    "secret_access_key": "FOO",
+                    "region": "us-west-2",
+                },
+            },
+            'web1-0': {
+                "name": "web1",
+                "unique_id": "web1-0",
+                "aws": {
+                    "access_key_id": "FOO",
+                    "secret_access_key": "FOO",
+                },
+            },
+        }
+
+        with mock.patch('boto.auth.get_auth_handler', autospec=True):
+            deployment = Deployment(
+                'test',
+                ec2_configs,
+                {},
+                {},
+                connection_pool=ConnectionPool(),
+            )
+            west_conn = deployment.get_connection('ec2', 'ec2', 'web0-0')
+            east_conn = deployment.get_connection('ec2', 'ec2', 'web1-0')
+
+        self.assertEqual(west_conn.region.name, 'us-west-2')
+        self.assertEqual(east_conn.region.name, 'us-east-1')
+
     def test_aws_credentials_none(self):
         none_configs = {
             'web0-0': {
@@ -118,10 +177,256 @@ class TestConfigValidation(unittest2.TestCase):
         }
 
         with mock.patch('boto.auth.get_auth_handler', autospec=True):
-            deployment = Deployment('test', ec2_configs, rds_configs, {})
+            deployment = Deployment(
+                'test',
+                ec2_configs,
+                rds_configs,
+                {},
+                connection_pool=ConnectionPool(),
+            )
         self.assertNotEqual(deployment.ec2conn, None)
         self.assertNotEqual(deployment.rdsconn, None)
 
         for conn in [deployment.ec2conn, deployment.rdsconn]:
             self.assertEqual(conn.access_key, 'FOO')
             self.assertEqual(conn.secret_key, 'FOO')
+
+
+class TestRepairActiveGeneration(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        deployment_confs = benchmark.build_environment(self.aws, 5)
+        # Take web0, web1 and web2 out of the loadbalancer
+        loadbalancer = self.aws.load_balancers[benchmark.LOADBALANCER_NAME]
+        del loadbalancer.instance_ids[:3]
+        self.deployment = benchmark.build_deployment(
+            self.aws,
+            deployment_confs,
+        )
+
+    def _get_outcomes_by_name(self, outcomes):
+        return dict((node.name, outcome) for node, outcome in outcomes.items())
+
+    def test_concurrent_outcomes(self):
+        outcomes = self.deployment.repair_active_generation_concurrently()
+
+        self.assertEqual(
+            self._get_outcomes_by_name(outcomes),
+            {
+                'web0': REPAIR_MADE_OPERATIONAL,
+                'web1': REPAIR_MADE_OPERATIONAL,
+                'web2': REPAIR_MADE_OPERATIONAL,
+            },
+        )
+        self.assertTrue(self.deployment.active_is_fully_operational())
+
+    def test_concurrent_failure_isolated(self):
+        make_operational = InfrastructureNode.make_operational
+
+        def fail_for_web1(node, **kwargs):
+            if node.name == 'web1':
+                raise Exception("AWS is having a bad day")
+            return make_operational(node, **kwargs)
+
+        with mock.patch.object(
+            InfrastructureNode, 'make_operational', fail_for_web1,
+        ):
+            outcomes = self.deployment.repair_active_generation_concurrently(
+                wait_until_operational=False,
+            )
+
+        self.assertEqual(
+            self._get_outcomes_by_name(outcomes),
+            {
+                'web0': REPAIR_REQUESTED,
+                'web1': REPAIR_FAILED,
+                'web2': REPAIR_REQUESTED,
+            },
+        )
+
+    def test_parallel_returns_repaired_nodes(self):
+        repaired = self.deployment.repair_active_generation(parallel=True)
+
+        self.assertEqual(
+            sorted(node.name for node in repaired),
+            ['web0', 'web1', 'web2'],
+        )
+
+
+class TestVerifyDeploymentState(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        deployment_confs = benchmark.build_environment(self.aws, 5)
+        self.deployment = benchmark.build_deployment(
+            self.aws,
+            deployment_confs,
+        )
+
+    def test_corrections_saved_together(self):
+        old_nodes = self.deployment.get_all_old_nodes(is_running=1)
+        terminated_ids = set()
+        for node in old_nodes[:2]:
+            self.aws.instances[node.aws_id].state = 'terminated'
+            terminated_ids.add(node.aws_id)
+        self.aws.reset_calls()
+
+        with mock.patch.object(
+            self.deployment.resource_tracker,
+            'save_nodes',
+        ) as save_nodes:
+            self.deployment.verify_deployment_state()
+
+        self.assertEqual(save_nodes.call_count, 1)
+        deployment_name, saved_nodes = save_nodes.call_args[0]
+        self.assertEqual(
+            set(node.aws_id for node in saved_nodes),
+            terminated_ids,
+        )
+        self.assertEqual(
+            [node.is_running for node in saved_nodes],
+            [0, 0],
+        )
+        self.assertEqual(self.aws.calls['ec2.DescribeInstances'], 1)
+
+
+class TestGenerationPointer(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        deployment_confs = benchmark.build_environment(self.aws, 5)
+        self.deployment = benchmark.build_deployment(
+            self.aws,
+            deployment_confs,
+        )
+        self.resource_tracker = self.deployment.resource_tracker
+
+    def test_reading_doesnt_write(self):
+        self.assertEqual(self.deployment.active_gen_id, 2)
+
+        self.assertEqual(self.aws.calls['sdb.PutAttributes'], 0)
+        self.assertEqual(self.aws.calls['sdb.CreateDomain'], 0)
+
+    def test_not_recorded_without_record_writes(self):
+        self.deployment.record_generation_pointer()
+
+        self.assertEqual(self.aws.calls['sdb.PutAttributes'], 0)
+        self.assertEqual(
+            self.resource_tracker.get_active_generation_id(
+                benchmark.DEPLOYMENT_NAME,
+            ),
+            None,
+        )
+
+    def test_recorded_with_record_writes(self):
+        self.resource_tracker.write_node_records = True
+
+        self.deployment.record_generation_pointer()
+
+        self.assertEqual(
+            self.resource_tracker.get_active_generation_id(
+                benchmark.DEPLOYMENT_NAME,
+            ),
+            2,
+        )
+
+    def _increment_generation(self):
+        with mock.patch.object(
+            self.deployment, 'pending_is_healthy', return_value=True,
+        ):
+            with mock.patch.object(
+                self.deployment, 'repair_active_generation',
+            ):
+                self.deployment.increment_generation()
+
+    def test_increment_moves_pointer(self):
+        self.resource_tracker.write_node_records = True
+
+        self._increment_generation()
+
+        self.assertEqual(
+            self.resource_tracker.get_active_generation_id(
+                benchmark.DEPLOYMENT_NAME,
+            ),
+            3,
+        )
+        self.assertEqual(
+            self.resource_tracker.filter_nodes(
+                benchmark.DEPLOYMENT_NAME,
+                generation_id=2,
+                is_active_generation=1,
+            ),
+            [],
+        )
+
+    def test_increment_without_record_writes(self):
+        self._increment_generation()
+
+        self.assertEqual(self.aws.calls['sdb.PutAttributes'], 0)
+        self.assertEqual(self.aws.calls['sdb.BatchPutAttributes'], 0)
+
+
+class TestRollingBudget(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        deployment_confs = benchmark.build_environment(self.aws, 5)
+        for node_name in ['web0', 'web1']:
+            deployment_confs['ec2'][node_name]['roles'] = ['memcached']
+        self.deployment = benchmark.build_deployment(
+            self.aws,
+            deployment_confs,
+        )
+        self.nodes = dict(
+            (node.name, node)
+            for node in self.deployment.get_all_active_nodes(is_running=1)
+        )
+
+    def test_redundancy_per_role(self):
+        self.assertTrue(
+            self.deployment.has_required_redundancy(self.nodes['web0']),
+        )
+        self.assertFalse(
+            self.deployment.has_required_redundancy(
+                self.nodes['web0'],
+                unavailable=['web1'],
+            ),
+        )
+        # Nodes without roles count every other EC2 node
+        self.assertTrue(
+            self.deployment.has_required_redundancy(
+                self.nodes['web2'],
+                min_healthy=4,
+            ),
+        )
+        self.assertFalse(
+            self.deployment.has_required_redundancy(
+                self.nodes['web2'],
+                min_healthy=4,
+                unavailable=['web3'],
+            ),
+        )
+
+    def test_waits_for_budget(self):
+        budget = RollingBudget(self.deployment, max_unavailable=2)
+        self.assertTrue(budget.acquire(self.nodes['web2']))
+        self.assertTrue(budget.acquire(self.nodes['web3']))
+
+        acquired = threading.Event()
+
+        def acquire_web4():
+            budget.acquire(self.nodes['web4'])
+            acquired.set()
+
+        waiter = threading.Thread(target=acquire_web4)
+        waiter.start()
+        self.addCleanup(waiter.join)
+        self.assertFalse(acquired.wait(0.2))
+
+        budget.release(self.nodes['web2'])
+
+        self.assertTrue(acquired.wait(5))
+        self.assertEqual(budget.unavailable, set(['web3', 'web4']))
+
+    def test_no_redundancy_counted_anyway(self):
+        budget = RollingBudget(self.deployment, min_healthy=10)
+
+        self.assertFalse(budget.acquire(self.nodes['web2']))
+        self.assertEqual(budget.unavailable, set(['web2']))
@@ -0,0 +1,222 @@
+import sys
+import threading
+from StringIO import StringIO
+
+import mock
+import unittest2
+from fabric import state
+from fabric.api import env, hide, output, settings
+
+from neckbeard.host_scope import (
+    host_scope,
+    is_installed,
+    prompt,
+    run_on_hosts,
+)
+
+
+class TestHostScope(unittest2.TestCase):
+    def setUp(self):
+        self.stdout = sys.stdout
+        self.addCleanup(setattr, sys, 'stdout', self.stdout)
+        self.addCleanup(env.pop, 'neckbeard_test', None)
+
+    def test_changes_discarded(self):
+        env.neckbeard_test = 'global'
+
+        with host_scope('ubuntu@web0.example.com', other='value'):
+            self.assertEqual(env.host_string, 'ubuntu@web0.example.com')
+            self.assertEqual(env.host, 'web0.example.com')
+            self.assertEqual(env.other, 'value')
+            self.assertEqual(env.neckbeard_test, 'global')
+            env.neckbeard_test = 'scoped'
+            with settings(hide('running'), neckbeard_test='nested'):
+                self.assertEqual(env.neckbeard_test, 'nested')
+                self.assertFalse(output.running)
+            self.assertEqual(env.neckbeard_test, 'scoped')
+
+        self.assertEqual(env.neckbeard_test, 'global')
+        self.assertFalse('other' in env)
+        self.assertTrue(output.running)
+
+    def test_threads_isolated(self):
+        # Each thread sets its own value, then waits until all of the others
+        # have done the same before reading it back
+        hosts = ['web0', 'web1', 'web2']
+        ready = dict((host, threading.Event()) for host in hosts)
+        all_ready = threading.Event()
+        seen = {}
+
+        def check_env(host_string):
+            with host_scope(host_string):
+                env.neckbeard_test = host_string
+                ready[host_string].set()
+                all_ready.wait(5)
+                seen[host_string] = (env.host_string, env.neckbeard_test)
+
+        threads = [
+            threading.Thread(target=check_env, args=(host,)) for host in hosts
+        ]
+        for thread in threads:
+            thread.start()
+        for event in ready.values():
+            event.wait(5)
+        all_ready.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(
+            seen,
+            dict((host, (host, host)) for host in hosts),
+        )
+        self.assertFalse('neckbeard_test' in env)
+
+    def test_nested_values_isolated(self):
+        env.neckbeard_test = {'enable_celery_ldap': False, 'endpoints': []}
+        hosts = ['web0', 'web1']
+        ready = dict((host, threading.Event()) for host in hosts)
+        all_ready = threading.Event()
+        seen = {}
+
+        def check_env(host_string):
+            with host_scope(host_string):
+                env.neckbeard_test['enable_celery_ldap'] = host_string
+                env.neckbeard_test['endpoints'].append(host_string)
+                ready[host_string].set()
+                all_ready.wait(5)
+                seen[host_string] = dict(env.neckbeard_test)
+
+        threads = [
+            threading.Thread(target=check_env, args=(host,)) for host in hosts
+        ]
+        for thread in threads:
+            thread.start()
+        for event in ready.values():
+            event.wait(5)
+        all_ready.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(
+            seen,
+            dict(
+                (host, {'enable_celery_ldap': host, 'endpoints': [host]})
+                for host in hosts
+            ),
+        )
+        self.assertEqual(
+            env.neckbeard_test,
+            {'enable_celery_ldap': False, 'endpoints': []},
+        )
+
+    def test_output_buffered(self):
+        sys.stdout = StringIO()
+        stream = sys.stdout
+
+        with host_scope('web0', buffer_output=True):
+            print "first"
+            with host_scope('web1'):
+                print "second"
+            self.assertEqual(stream.getvalue(), '')
+
+        self.assertEqual(
+            stream.getvalue(),
+            '----- web0 -----\nfirst\nsecond\n',
+        )
+
+    def test_run_on_hosts(self):
+        sys.stdout = StringIO()
+
+        results = run_on_hosts(
+            lambda host_string: (env.host_string, env.neckbeard_test),
+            ['web0', 'web1'],
+            neckbeard_test='value',
+        )
+
+        self.assertEqual(
+            results,
+            {'web0': ('web0', 'value'), 'web1': ('web1', 'value')},
+        )
+
+    def test_prompt_not_buffered(self):
+        sys.stdout = StringIO()
+        stream = sys.stdout
+
+        def raw_input(prompt_str):
+            sys.stdout.write(prompt_str)
+            return 'y'
+
+        with mock.patch('__builtin__.raw_input', raw_input):
+            with host_scope('web0', buffer_output=True):
+                print "first"
+                self.assertEqual(prompt("Continue?"), 'y')
+                self.assertEqual(
+                    stream.getvalue(),
+                    '----- web0 -----\nfirst\nContinue? ',
+                )
+                print "second"
+
+        self.assertEqual(
+            stream.getvalue(),
+            '----- web0 -----\nfirst\nContinue? ----- web0 -----\nsecond\n',
+        )
+
+    def test_restored_after_last_scope(self):
+        classes = [type(env), type(output), type(state.connections)]
+        stdout = sys.stdout
+        inner_done = threading.Event()
+
+        def inner():
+            with host_scope('web1'):
+                pass
+            inner_done.set()
+
+        with host_scope('web0'):
+            self.assertTrue(is_installed())
+            self.assertFalse(sys.stdout is stdout)
+            thread = threading.Thread(target=inner)
+            thread.start()
+            inner_done.wait(5)
+            thread.join(5)
+            # Another thread's scope closing leaves ours patched
+            self.assertTrue(is_installed())
+            self.assertEqual(env.host_string, 'web0')
+
+        self.assertFalse(is_installed())
+        self.assertEqual(
+            [type(env), type(output), type(state.connections)],
+            classes,
+        )
+        self.assertTrue(sys.stdout is stdout)
+
+    def test_connections_shared(self):
+        entered = threading.Event()
+        release = threading.Event()
+        connects = []
+
+        def connect(user, host, port, cache, seek_gateway):
+            connects.append(host)
+            entered.set()
+            release.wait(5)
+            return object()
+
+        def get_connection():
+            state.connections['ubuntu@web9']
+
+        self.addCleanup(state.connections.pop, 'ubuntu@web9:22', None)
+        with mock.patch('fabric.network.connect', connect):
+            with host_scope():
+                threads = [
+                    threading.Thread(target=get_connection) for _ in range(2)
+                ]
+                threads[0].start()
+                entered.wait(5)
+                # The second thread waits on the first one's connection
+                # rather than making its own
+                threads[1].start()
+                threads[1].join(0.2)
+                release.set()
+                for thread in threads:
+                    thread.join(5)
+
+        self.assertEqual(connects, ['web9'])
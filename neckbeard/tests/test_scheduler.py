@@ -0,0 +1,114 @@
+import threading
+import unittest2
+
+from neckbeard.scheduler import (
+    DependencyCycle,
+    DeployScheduler,
+    build_dependency_graph,
+)
+
+
+class FakeDeployer(object):
+    def __init__(self, aws_type, node_name, dependencies=()):
+        self.aws_type = aws_type
+        self.node_name = node_name
+        self.dependencies = list(dependencies)
+
+    def get_dependencies(self):
+        return self.dependencies
+
+
+class TestBuildDependencyGraph(unittest2.TestCase):
+    def test_missing_dependencies_ignored(self):
+        deployers = [
+            FakeDeployer('ec2', 'web0', [('rds', 'masterdb')]),
+            FakeDeployer('ec2', 'web1', [('ec2', 'web0')]),
+        ]
+
+        self.assertEqual(
+            build_dependency_graph(deployers),
+            {
+                ('ec2', 'web0'): set(),
+                ('ec2', 'web1'): set([('ec2', 'web0')]),
+            },
+        )
+
+    def test_cycle(self):
+        deployers = [
+            FakeDeployer('ec2', 'a', [('ec2', 'b')]),
+            FakeDeployer('ec2', 'b', [('ec2', 'a')]),
+            FakeDeployer('ec2', 'c', [('ec2', 'a')]),
+            FakeDeployer('ec2', 'd'),
+        ]
+
+        with self.assertRaises(DependencyCycle) as cm:
+            build_dependency_graph(deployers)
+
+        self.assertEqual(
+            cm.exception.keys,
+            [('ec2', 'a'), ('ec2', 'b'), ('ec2', 'c')],
+        )
+
+
+class TestDeployScheduler(unittest2.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.events = []
+
+    def record(self, deployer):
+        with self.lock:
+            self.events.append(deployer.node_name)
+
+    def test_dependencies_first(self):
+        deployers = [
+            FakeDeployer('ec2', 'web0', [('rds', 'masterdb'), ('ec2', 'mc')]),
+            FakeDeployer('ec2', 'mc', [('rds', 'masterdb')]),
+            FakeDeployer('rds', 'masterdb'),
+        ]
+
+        DeployScheduler(deployers).run(self.record)
+
+        self.assertEqual(self.events, ['masterdb', 'mc', 'web0'])
+
+    def test_independent_run_concurrently(self):
+        # Each call waits for the other to start, so they can only both
+        # finish if they run at the same time
+        started = {'a': threading.Event(), 'b': threading.Event()}
+        other = {'a': 'b', 'b': 'a'}
+
+        def wait_for_other(deployer):
+            started[deployer.node_name].set()
+            if not started[other[deployer.node_name]].wait(5):
+                raise AssertionError("Not concurrent")
+
+        scheduler = DeployScheduler(
+            [FakeDeployer('ec2', 'a'), FakeDeployer('ec2', 'b')],
+        )
+        scheduler.run(wait_for_other)
+
+        self.assertEqual(
+            sorted(scheduler.durations),
+            [('ec2', 'a'), ('ec2', 'b')],
+        )
+
+    def test_failure_stops_dependents(self):
+        def deploy(deployer):
+            self.record(deployer)
+            if deployer.node_name == 'masterdb':
+                raise ValueError("RDS failed")
+
+        deployers = [
+            FakeDeployer('rds', 'masterdb'),
+            FakeDeployer('ec2', 'web0', [('rds', 'masterdb')]),
+        ]
+
+        with self.assertRaises(ValueError):
+            DeployScheduler(deployers).run(deploy)
+        self.assertEqual(self.events, ['masterdb'])
+
+    def test_exit_reraised(self):
+        def deploy(deployer):
+            exit(1)
+
+        with self.assertRaises(SystemExit):
+            DeployScheduler([FakeDeployer('rds', 'masterdb')]).run(deploy)
@@ -0,0 +1,124 @@
+import copy
+import json
+import unittest2
+
+from neckbeard import benchmark
+from neckbeard.fake_aws import FakeAWS
+from neckbeard.snapshot import (
+    NODE_ADDED,
+    NODE_CHANGED,
+    NODE_REMOVED,
+    diff_snapshots,
+    format_diff,
+    gather_snapshot,
+)
+
+
+class TestGatherSnapshot(unittest2.TestCase):
+    def setUp(self):
+        self.aws = FakeAWS()
+        deployment_confs = benchmark.build_environment(self.aws, 3)
+        loadbalancer = self.aws.load_balancers[benchmark.LOADBALANCER_NAME]
+        # Take web0 out of the loadbalancer
+        self.web0_id = loadbalancer.instance_ids.pop(0)
+        self.deployment = benchmark.build_deployment(
+            self.aws,
+            deployment_confs,
+        )
+
+    def test_snapshot_contents(self):
+        snapshot = gather_snapshot(self.deployment)
+
+        self.assertEqual(snapshot['deployment_name'], 'benchmark')
+        self.assertEqual(snapshot['active_generation_id'], 2)
+        # Both generations of 3 web nodes and the DB
+        self.assertEqual(len(snapshot['nodes']), 8)
+        web0 = [
+            node
+            for node in snapshot['nodes']
+            if node['aws_id'] == self.web0_id
+        ][0]
+        self.assertEqual(web0['generation'], 'active')
+        self.assertEqual(web0['state'], 'running')
+        self.assertEqual(web0['loadbalancer'], benchmark.LOADBALANCER_NAME)
+        self.assertEqual(web0['loadbalancer_state'], None)
+        self.assertEqual(web0['elastic_ip'], '10.0.0.1')
+        self.assertTrue(web0['elastic_ip_associated'])
+        self.assertTrue(web0['is_healthy'])
+        self.assertFalse(web0['is_operational'])
+        # It can be serialized
+        json.dumps(snapshot)
+
+    def test_batched(self):
+        gather_snapshot(self.deployment)
+
+        self.assertEqual(self.aws.calls['ec2.DescribeInstances'], 1)
+        self.assertEqual(self.aws.calls['rds.DescribeDBInstances'], 1)
+        self.assertEqual(self.aws.calls['ec2.DescribeAddresses'], 1)
+        self.assertEqual(self.aws.calls['elb.DescribeLoadBalancers'], 1)
+
+
+class TestDiffSnapshots(unittest2.TestCase):
+    def setUp(self):
+        self.old = {
+            'active_generation_id': 2,
+            'pending_generation_id': 3,
+            'nodes': [
+                {
+                    'aws_type': 'ec2',
+                    'name': 'web0',
+                    'aws_id': 'i-1',
+                    'is_operational': True,
+                },
+                {
+                    'aws_type': 'ec2',
+                    'name': 'web1',
+                    'aws_id': 'i-2',
+                    'is_operational': True,
+                },
+            ],
+        }
+        self.new = copy.deepcopy(self.old)
+
+    def test_no_changes(self):
+        diff = diff_snapshots(self.old, self.new)
+
+        self.assertEqual(diff, {'deployment': {}, 'nodes': []})
+        self.assertEqual(format_diff(diff), [])
+
+    def test_changes(self):
+        self.new['active_generation_id'] = 3
+        self.new['nodes'][0]['is_operational'] = False
+        del self.new['nodes'][1]
+        self.new['nodes'].append({
+            'aws_type': 'ec2',
+            'name': 'web1',
+            'aws_id': 'i-3',
+            'is_operational': False,
+        })
+
+        diff = diff_snapshots(self.old, self.new)
+
+        self.assertEqual(diff['deployment'], {'active_generation_id': [2, 3]})
+        self.assertEqual(
+            [(change['aws_id'], change['change']) for change in diff['nodes']],
+            [
+                ('i-1', NODE_CHANGED),
+                ('i-2', NODE_REMOVED),
+                ('i-3', NODE_ADDED),
+            ],
+        )
+        self.assertEqual(
+            diff['nodes'][0]['fields'],
+            {'is_operational': [True, False]},
+        )
+        self.assertEqual(
+            format_diff(diff),
+            [
+                'active_generation_id: 2 -> 3',
+                '~ ec2:web0[i-1]',
+                '    is_operational: True -> False',
+                '- ec2:web1[i-2]',
+                '+ ec2:web1[i-3]',
+            ],
+        )
@@ -0,0 +1,102 @@
+import threading
+import unittest2
+
+from neckbeard.ssh import SSHConnectionManager
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnectionCache(dict):
+    def __init__(self, delay=None):
+        super(FakeConnectionCache, self).__init__()
+        self.delay = delay
+        self.connects = []
+
+    def connect(self, key):
+        if self.delay is not None:
+            self.delay.wait(1)
+        self.connects.append(key)
+        self[key] = FakeClient()
+
+
+class TestSSHConnectionManager(unittest2.TestCase):
+    def setUp(self):
+        self.connections = FakeConnectionCache()
+        self.manager = SSHConnectionManager(
+            connections=self.connections,
+            keepalive=15,
+        )
+        self.host = 'ubuntu@web0.example.com:22'
+
+    def test_connection_reused(self):
+        client = self.manager.connect(self.host)
+
+        self.assertTrue(self.manager.connect(self.host) is client)
+        self.assertEqual(self.connections.connects, [self.host])
+        self.assertEqual(client.transport.keepalive, 15)
+        self.assertEqual(self.manager.connect_count, 1)
+        self.assertEqual(self.manager.reuse_count, 1)
+        self.assertEqual(sorted(self.manager.setup_times), [self.host])
+
+    def test_dropped_connection_reopened(self):
+        dropped = self.manager.connect(self.host)
+        dropped.transport.active = False
+
+        client = self.manager.connect(self.host)
+
+        self.assertFalse(client is dropped)
+        self.assertEqual(self.connections.connects, [self.host, self.host])
+
+    def test_concurrent_connects_share_connection(self):
+        self.connections.delay = threading.Event()
+        clients = []
+
+        def connect():
+            clients.append(self.manager.connect(self.host))
+
+        threads = [threading.Thread(target=connect) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        self.connections.delay.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.connections.connects, [self.host])
+        self.assertEqual(len(set(id(client) for client in clients)), 1)
+
+    def test_disconnect_all(self):
+        other_client = FakeClient()
+        self.connections['ubuntu@other.example.com:22'] = other_client
+        client = self.manager.connect(self.host)
+
+        self.manager.disconnect_all()
+
+        self.assertTrue(client.closed)
+        # Connections opened elsewhere are left alone
+        self.assertFalse(other_client.closed)
+        self.assertEqual(
+            sorted(self.connections),
+            ['ubuntu@other.example.com:22'],
+        )
@@ -0,0 +1,155 @@
+import unittest2
+
+from neckbeard.waiters import Backoff, WaitTimedOut, wait_for_all, wait_until
+
+
+class FakeTime(object):
+    """
+    A clock that only moves when something sleeps on it.
+    """
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Volume(object):
+    def __init__(self, id, status):
+        self.id = id
+        self.status = status
+
+
+def no_jitter():
+    return 0.5
+
+
+class TestBackoff(unittest2.TestCase):
+    def test_exponential_up_to_max(self):
+        backoff = Backoff(initial_delay=1, max_delay=10, random=no_jitter)
+        delays = backoff.delays()
+
+        self.assertEqual(
+            [next(delays) for _ in range(6)],
+            [1, 2, 4, 8, 10, 10],
+        )
+
+    def test_jitter(self):
+        backoff = Backoff(initial_delay=10, jitter=0.2, random=lambda: 1.0)
+
+        self.assertAlmostEqual(next(backoff.delays()), 12)
+
+
+class TestWaitUntil(unittest2.TestCase):
+    def setUp(self):
+        self.time = FakeTime()
+        self.backoff = Backoff(initial_delay=1, max_delay=4, random=no_jitter)
+
+    def test_ready_immediately(self):
+        result = wait_until(
+            lambda: 'done',
+            'something',
+            sleep=self.time.sleep,
+            clock=self.time.clock,
+        )
+
+        self.assertEqual(result, 'done')
+        self.assertEqual(self.time.sleeps, [])
+
+    def test_backs_off(self):
+        results = [None, None, None, None, 'done']
+
+        result = wait_until(
+            lambda: results.pop(0),
+            'something',
+            backoff=self.backoff,
+            sleep=self.time.sleep,
+            clock=self.time.clock,
+        )
+
+        self.assertEqual(result, 'done')
+        self.assertEqual(self.time.sleeps, [1, 2, 4, 4])
+
+    def test_timeout(self):
+        with self.assertRaises(WaitTimedOut):
+            wait_until(
+                lambda: False,
+                'something',
+                timeout=10,
+                backoff=self.backoff,
+                sleep=self.time.sleep,
+                clock=self.time.clock,
+            )
+
+        # The last sleep is cut short by the deadline
+        self.assertEqual(self.time.sleeps, [1, 2, 4, 3])
+
+
+class TestWaitForAll(unittest2.TestCase):
+    def setUp(self):
+        self.time = FakeTime()
+        self.backoff = Backoff(initial_delay=1, random=no_jitter)
+        self.volumes = {
+            'vol-1': Volume('vol-1', 'available'),
+            'vol-2': Volume('vol-2', 'in-use'),
+            'vol-3': Volume('vol-3', 'in-use'),
+        }
+        # The checks after which each volume becomes available
+        self.ready_after = {'vol-2': 2, 'vol-3': 3}
+        self.polls = []
+
+    def poll(self, pending):
+        self.polls.append([volume.id for volume in pending])
+        for volume_id, check in self.ready_after.items():
+            if len(self.polls) >= check:
+                self.volumes[volume_id] = Volume(volume_id, 'available')
+
+        return [self.volumes[volume.id] for volume in pending]
+
+    def _wait(self, **kwargs):
+        volumes = [
+            Volume(volume_id, 'in-use') for volume_id in sorted(self.volumes)
+        ]
+        return wait_for_all(
+            volumes,
+            poll=self.poll,
+            is_ready=lambda volume: volume.status == 'available',
+            description='volumes',
+            backoff=self.backoff,
+            sleep=self.time.sleep,
+            clock=self.time.clock,
+            **kwargs
+        )
+
+    def test_polls_pending_together(self):
+        volumes = self._wait()
+
+        self.assertEqual(
+            self.polls,
+            [['vol-1', 'vol-2', 'vol-3'], ['vol-2', 'vol-3'], ['vol-3']],
+        )
+        self.assertEqual(
+            [(volume.id, volume.status) for volume in volumes],
+            [
+                ('vol-1', 'available'),
+                ('vol-2', 'available'),
+                ('vol-3', 'available'),
+            ],
+        )
+        self.assertEqual(self.time.sleeps, [1, 2])
+
+    def test_timeout_reports_pending(self):
+        self.ready_after['vol-3'] = 100
+
+        with self.assertRaises(WaitTimedOut) as cm:
+            self._wait(timeout=5)
+
+        self.assertEqual(
+            [volume.id for volume in cm.exception.pending],
+            ['vol-3'],
+        )
@@ -0,0 +1,205 @@
+"""
+Waiting on cloud resources to reach a desired state.
+
+Rather than sleeping a fixed amount between checks, waits start out checking
+quickly and back off exponentially (with some random jitter, so that many
+waits don't all poll in lockstep) up to a maximum delay. That way fast
+operations are noticed quickly and slow ones don't hammer the APIs.
+
+Every wait can have a deadline, and the time spent on each wait is reported
+to the ``timer`` logger.
+"""
+import logging
+import random
+import time
+
+logger = logging.getLogger('waiters')
+time_logger = logging.getLogger('timer')
+
+DEFAULT_INITIAL_DELAY = 1
+DEFAULT_MAX_DELAY = 30
+DEFAULT_FACTOR = 2
+# Delays are randomly adjusted by up to this fraction in either direction
+DEFAULT_JITTER = 0.2
+
+
+class WaitTimedOut(Exception):
+    """Waiting for an operation to complete timed out"""
+    def __init__(self, message, pending=None):
+        super(WaitTimedOut, self).__init__(message)
+        # For `wait_for_all`, the resources that never became ready
+        self.pending = pending or []
+
+
+class Backoff(object):
+    """
+    Generates the delays between successive checks, starting at
+    ``initial_delay`` seconds and multiplying by ``factor`` each time, up to
+    ``max_delay``. Each delay is adjusted by a random ``jitter`` fraction.
+    """
+    def __init__(
+        self,
+        initial_delay=DEFAULT_INITIAL_DELAY,
+        max_delay=DEFAULT_MAX_DELAY,
+        factor=DEFAULT_FACTOR,
+        jitter=DEFAULT_JITTER,
+        random=random.random,
+    ):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+        self._random = random
+
+    def delays(self):
+        delay = self.initial_delay
+        while True:
+            adjustment = self.jitter * (2 * self._random() - 1)
+            yield max(delay * (1 + adjustment), 0)
+            delay = min(delay * self.factor, self.max_delay)
+
+
+def _log_wait(description, start, checks, clock):
+    duration = clock() - start
+    if checks > 1:
+        time_logger.info(
+            "%.1fs waiting for %s (%s checks)",
+            duration,
+            description,
+            checks,
+        )
+    else:
+        time_logger.debug("No wait for %s", description)
+
+
+def _get_delay(delays, deadline, clock):
+    delay = next(delays)
+    if deadline is not None:
+        delay = min(delay, max(deadline - clock(), 0))
+
+    return delay
+
+
+def wait_until(
+    condition,
+    description,
+    timeout=None,
+    backoff=None,
+    sleep=time.sleep,
+    clock=time.time,
+):
+    """
+    Call ``condition`` until it returns something truthy, backing off between
+    calls, and return that value.
+
+    ``description`` What we're waiting for, for the logs. eg. "volume vol-xxx
+    to become available"
+    ``timeout`` Optionally, the number of seconds after which to give up and
+    raise `WaitTimedOut`.
+    ``backoff`` The `Backoff` to use. Defaults to a `Backoff()`.
+    """
+    if backoff is None:
+        backoff = Backoff()
+    delays = backoff.delays()
+
+    start = clock()
+    deadline = None
+    if timeout is not None:
+        deadline = start + timeout
+
+    checks = 0
+    while True:
+        checks += 1
+        result = condition()
+        if result:
+            _log_wait(description, start, checks, clock)
+            return result
+
+        if deadline is not None and clock() >= deadline:
+            _log_wait(description, start, checks, clock)
+            raise WaitTimedOut(
+                "Timed out after %ss waiting for %s" % (timeout, description),
+            )
+
+        delay = _get_delay(delays, deadline, clock)
+        logger.info("Waiting %.1fs for %s", delay, description)
+        sleep(delay)
+
+
+def wait_for_all(
+    resources,
+    poll,
+    is_ready,
+    description,
+    key=lambda resource: resource.id,
+    timeout=None,
+    backoff=None,
+    sleep=time.sleep,
+    clock=time.time,
+):
+    """
+    Wait until every one of ``resources`` is ready, refreshing all of the
+    pending ones with a single ``poll`` call each time rather than polling
+    them one by one.
+
+    ``poll`` Called with the list of still-pending resources. Returns their
+    refreshed versions, in any order.
+    ``is_ready`` Called with a refreshed resource. Returns True once that
+    resource is ready.
+    ``key`` Identifies a resource, so that refreshed resources can be matched
+    up with the originals.
+
+    Returns the refreshed resources, in the same order as ``resources``. If
+    ``timeout`` seconds pass first, raises `WaitTimedOut` with the resources
+    that aren't ready as its ``pending``.
+    """
+    if backoff is None:
+        backoff = Backoff()
+    delays = backoff.delays()
+
+    start = clock()
+    deadline = None
+    if timeout is not None:
+        deadline = start + timeout
+
+    latest = dict((key(resource), resource) for resource in resources)
+    pending_keys = [key(resource) for resource in resources]
+    checks = 0
+    while pending_keys:
+        checks += 1
+        refreshed = poll([latest[pending_key] for pending_key in pending_keys])
+        for resource in refreshed:
+            latest[key(resource)] = resource
+        pending_keys = [
+            pending_key
+            for pending_key in pending_keys
+            if not is_ready(latest[pending_key])
+        ]
+        if not pending_keys:
+            break
+
+        if deadline is not None and clock() >= deadline:
+            _log_wait(description, start, checks, clock)
+            pending = [latest[pending_key] for pending_key in pending_keys]
+            raise WaitTimedOut(
+                "Timed out after %ss waiting for %s: %s" % (
+                    timeout,
+                    description,
+                    pending,
+                ),
+                pending=pending,
+            )
+
+        delay = _get_delay(delays, deadline, clock)
+        logger.info(
+            "%s of %s still pending. Waiting %.1fs for %s",
+            len(pending_keys),
+            len(latest),
+            delay,
+            description,
+        )
+        sleep(delay)
+
+    _log_wait(description, start, checks, clock)
+
+    return [latest[key(resource)] for resource in resources]